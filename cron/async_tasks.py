@@ -1,9 +1,10 @@
-import smtplib
-
 from email.message import EmailMessage
 
+from cron.config import EMAIL_APP_PASSWORD
+from cron.smtp_pool import smtp_pools
+
 
-def send_verification_email(sender_email, receiver_email, password, verification_code, *args, **kwargs):
+def send_verification_email(sender_email, receiver_email, verification_code, password=None, *args, **kwargs):
     subject = 'Email Verification'
     sender_email = sender_email
     recipient_email = receiver_email
@@ -41,21 +42,18 @@ def send_verification_email(sender_email, receiver_email, password, verification
     msg.set_content(text)
     msg.add_alternative(html, subtype='html')
 
-    with smtplib.SMTP('smtp.zoho.com', 587) as smtp:
-        smtp.starttls()
-        smtp.login(sender_email, password)
-        smtp.send_message(msg)
+    # scheduled and retried jobs come without the password
+    smtp_pools.get(sender_email, password or EMAIL_APP_PASSWORD).send(msg)
 
 
-def send_password_reset_email(sender_email, receiver_email, password, token, reset_url, *args, **kwargs):
+def send_password_reset_email(sender_email, receiver_email, token, reset_url, password=None,
+                              reset_path='create-new-password', *args, **kwargs):
+    # each app links to its own reset page
     msg = EmailMessage()
     msg.set_content(
-        f'To reset your password, visit the following link:\n{reset_url}/create-new-password/{token}')
+        f'To reset your password, visit the following link:\n{reset_url}/{reset_path}/{token}')
     msg['Subject'] = 'Password Reset Request'
     msg['From'] = sender_email
     msg['To'] = receiver_email
-    print('Mailing')
-    with smtplib.SMTP('smtp.zoho.com', 587) as smtp:
-        smtp.starttls()
-        smtp.login(sender_email, password)
-        smtp.send_message(msg)
\ No newline at end of file
+    # scheduled and retried jobs come without the password
+    smtp_pools.get(sender_email, password or EMAIL_APP_PASSWORD).send(msg)
\ No newline at end of file
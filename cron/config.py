@@ -0,0 +1,40 @@
+import os
+from dotenv import load_dotenv
+SERVICE_ROOT = os.path.dirname(__file__)
+ENV_FILE_PATH = os.path.join(SERVICE_ROOT, '.env')
+
+load_dotenv(ENV_FILE_PATH)
+CRON_PORT = int(os.environ.get('CRON_PORT', 8888))
+# coroutines pulling messages off the engine queue
+CRON_WORKERS = int(os.environ.get('CRON_WORKERS', 16))
+# pool running the blocking (sync) plugins, 'thread' or 'process'
+CRON_EXECUTOR = os.environ.get('CRON_EXECUTOR', 'thread')
+CRON_EXECUTOR_WORKERS = int(os.environ.get('CRON_EXECUTOR_WORKERS', 8))
+# defaults for plugins which don't declare their own limits
+CRON_JOB_TIMEOUT = float(os.environ.get('CRON_JOB_TIMEOUT', 60))
+CRON_JOB_CONCURRENCY = int(os.environ.get('CRON_JOB_CONCURRENCY', 4))
+# seconds send_event waits for a connection and for the ack, and how many times it tries
+CRON_SEND_TIMEOUT = float(os.environ.get('CRON_SEND_TIMEOUT', 5))
+CRON_SEND_RETRIES = int(os.environ.get('CRON_SEND_RETRIES', 3))
+
+# sender account of the emails, email jobs coming from the schedule store read its password here
+EMAIL = os.environ.get('EMAIL')
+EMAIL_APP_PASSWORD = os.environ.get('EMAIL_APP_PASSWORD')
+# outgoing mail, point these at a local smtpd/aiosmtpd stand-in to test without TLS
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.zoho.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
+SMTP_USE_TLS = os.environ.get('SMTP_USE_TLS', '1') == '1'
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', 30))
+# authenticated sessions kept open per sender account
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', 2))
+# sessions idle for longer than this are reconnected instead of reused
+SMTP_IDLE_TIMEOUT = float(os.environ.get('SMTP_IDLE_TIMEOUT', 60))
+# messages per second across the pool, 0 disables the limit
+SMTP_RATE_LIMIT = float(os.environ.get('SMTP_RATE_LIMIT', 5))
+
+# delayed and recurring jobs are kept here so they survive restarts
+CRON_SCHEDULE_STORE = os.environ.get('CRON_SCHEDULE_STORE', os.path.join(SERVICE_ROOT, 'schedules.json'))
+# seconds before a failed job is run again, for plugins allowing retries
+CRON_RETRY_DELAY = float(os.environ.get('CRON_RETRY_DELAY', 300))
+# days ahead for which shifts get availability rows
+AVAILABILITY_HORIZON_DAYS = int(os.environ.get('AVAILABILITY_HORIZON_DAYS', 90))
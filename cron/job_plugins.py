@@ -0,0 +1,45 @@
+import asyncio
+
+from cron.config import CRON_JOB_TIMEOUT, CRON_JOB_CONCURRENCY, CRON_RETRY_DELAY
+
+SYNC = 'sync'
+ASYNC = 'async'
+
+
+class JobPlugin(object):
+    """
+    Declaration of a job the cron engine can run for an event.
+
+    ``mode`` tells the engine how to call ``func``: ``async`` plugins are coroutine functions awaited on the engine
+    loop, ``sync`` plugins do blocking work and are run in the executor pool. At most ``concurrency`` jobs of the
+    plugin run at once and each one is given up on after ``timeout`` seconds. A job raising an error is scheduled
+    again after ``retry_delay`` seconds, up to ``retries`` times; timed out jobs are not retried as they may still
+    complete. Params named in ``secrets`` are never written to the schedule store, a delayed or retried job runs
+    without them and ``func`` has to read them from config.
+    """
+
+    def __init__(self, func, mode=None, concurrency=CRON_JOB_CONCURRENCY, timeout=CRON_JOB_TIMEOUT, retries=0,
+                 retry_delay=CRON_RETRY_DELAY, secrets=()):
+        if mode is None:
+            mode = ASYNC if asyncio.iscoroutinefunction(func) else SYNC
+        if mode not in (SYNC, ASYNC):
+            raise ValueError(f'Invalid plugin mode {mode}')
+        self.func = func
+        self.mode = mode
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.secrets = frozenset(secrets)
+
+    @property
+    def is_async(self):
+        return self.mode == ASYNC
+
+    @property
+    def name(self):
+        return self.func.__name__
+
+    def storable(self, params):
+        """``params`` without the secrets, to be scheduled."""
+        return {name: value for name, value in params.items() if name not in self.secrets}
@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import update, delete, insert, select
+
+from cron.config import AVAILABILITY_HORIZON_DAYS
+from utilities.availability_bitmaps import refresh_availability_bitmaps, month_start
+from utilities.db_getter import get_session
+from utilities.schemas.schedule_availability_models import Availability, AvailabilityBitmap, Shift, \
+    VenueFreeDay
+from utilities.schemas.subscription_models import VendorSubscription
+
+SUBSCRIPTION_EXPIRED = 'expired'
+AVAILABLE = 'available'
+
+
+def expire_vendor_subscriptions(*args, **kwargs):
+    """Mark every vendor subscription whose ``end_date`` has passed as expired, in one statement."""
+    session = get_session()
+    try:
+        result = session.execute(
+            update(VendorSubscription)
+            .where(VendorSubscription.end_date <= datetime.utcnow(),
+                   VendorSubscription.active_status != SUBSCRIPTION_EXPIRED)
+            .values(active_status=SUBSCRIPTION_EXPIRED)
+        )
+        session.commit()
+        return result.rowcount
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.remove()
+
+
+def roll_availability_forward(horizon_days=AVAILABILITY_HORIZON_DAYS, *args, **kwargs):
+    """
+    Keep ``horizon_days`` days of availability open for every shift.
+
+    Days past the end of the window get an ``available`` row for each shift which has none yet, and ``available``
+    rows of days gone by are removed; rows in any other status are left alone as they record bookings. The calendar
+    bitmaps and free days of the window are recomputed and past ones dropped.
+    """
+    session = get_session()
+    today = date.today()
+    end = today + timedelta(days=horizon_days)
+    try:
+        shifts = session.execute(select(Shift.id, Shift.vendor_profile_id, Shift.space_id)).all()
+        existing = set(session.execute(
+            select(Availability.shift_id, Availability.date)
+            .where(Availability.date >= today, Availability.date < end)
+        ).all())
+        rows = [
+            {'date': day, 'status': AVAILABLE, 'shift_id': shift.id, 'vendor_profile_id': shift.vendor_profile_id,
+             'space_id': shift.space_id}
+            for shift in shifts
+            for day in (today + timedelta(days=offset) for offset in range(horizon_days))
+            if (shift.id, day) not in existing
+        ]
+        if rows:
+            session.execute(insert(Availability), rows)
+        session.execute(
+            delete(Availability).where(Availability.date < today, Availability.status == AVAILABLE)
+        )
+        refresh_availability_bitmaps(session, today, end)
+        session.execute(delete(AvailabilityBitmap).where(AvailabilityBitmap.month < month_start(today)))
+        session.execute(delete(VenueFreeDay).where(VenueFreeDay.day < today))
+        session.commit()
+        return len(rows)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.remove()
@@ -1,9 +1,14 @@
 import asyncio
-import json
-
 import traceback
-
-from cron.task_maps import plugins
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+from cron.config import CRON_PORT, CRON_WORKERS, CRON_EXECUTOR, CRON_EXECUTOR_WORKERS, CRON_SCHEDULE_STORE, \
+    CRON_SEND_TIMEOUT, CRON_SEND_RETRIES
+from cron.scheduler import Scheduler
+from cron.smtp_pool import smtp_pools
+from cron.task_maps import plugins, schedules
+from utilities.cron_protocol import read_frame, encode_frame, ack, FrameTooLarge, MessageRejected, STATUS_OK
 from utilities.db_getter import get_session
 
 
@@ -11,64 +16,106 @@ class BaseEngine:
     def __init__(self, logger, *args, **kwargs):
         self.logger = logger
         self.messages = asyncio.Queue()
+        self.scheduler = Scheduler(CRON_SCHEDULE_STORE, logger)
 
     @property
     def session(self):
         return get_session()
 
     @staticmethod
-    async def reply(message, writer):
-        try:
-            event = message['event']
-        except KeyError:
-            event = None
+    def is_hello(message):
+        return message.get('event') == 'HELLO'
 
-        hello = event == 'HELLO'
-
-        if hello:
-            writer.write('HI'.encode())
-            await writer.drain()
-
-        return hello
+    @staticmethod
+    def is_scheduled(message):
+        return message.get('run_at') is not None or message.get('delay') is not None
 
-    def _handle_socket_error(self, message, port):
-        count = message.get('__error_count__', 0)
-        if count <= 10:
-            message['__error_count__'] = count + 1
-            asyncio.create_task(self.messages.put(message))
-        else:
-            message.pop('__error_count__', None)
-            json_message = json.dumps(message)
-            self.logger.exception(f'Timed out while sending {json_message} at port {port}')
+    @staticmethod
+    def storable(message):
+        """The message without the params its plugin keeps out of the schedule store."""
+        plugin = plugins.get(message.get('event'))
+        if plugin is None or not isinstance(message.get('params'), dict):
+            return message
+        return dict(message, params=plugin.storable(message['params']))
 
     async def handle(self, reader, writer):
-        data = await reader.read(1024)
-        message = data.decode()
-        self.logger.info('Received new message %s' % message)
-
+        # a connection carries any number of frames, each one is acked in order
         try:
-            json_message = json.loads(message)
-            hello = await self.reply(json_message, writer)
-            if not hello:
-                await self.messages.put(json_message)
-        except Exception:
-            self.logger.exception('Could not process received message %s' % message)
+            while True:
+                try:
+                    message = await read_frame(reader)
+                except FrameTooLarge as e:
+                    self.logger.warning(f'Rejected frame from {writer.get_extra_info("peername")}: {e}')
+                    writer.write(encode_frame(ack(e)))
+                    await writer.drain()
+                    break
+                except asyncio.IncompleteReadError:
+                    self.logger.warning('Connection closed in the middle of a frame')
+                    break
+                except ValueError as e:
+                    # undecodable body, framing is still intact so the connection stays usable
+                    self.logger.exception('Could not decode received message')
+                    writer.write(encode_frame(ack(e)))
+                    await writer.drain()
+                    continue
+                if message is None:
+                    break
+                if not isinstance(message, dict):
+                    # well-formed JSON which is no message, e.g. a list or a string
+                    self.logger.warning(f'Rejected message which is not an object: {message!r}')
+                    writer.write(encode_frame(ack(ValueError('message must be a JSON object'))))
+                    await writer.drain()
+                    continue
+
+                self.logger.info('Received new message %s' % message.get('event'))
+                response = ack()
+                if self.is_hello(message):
+                    response['event'] = 'HI'
+                elif self.is_scheduled(message):
+                    try:
+                        response['job_id'] = self.scheduler.schedule_message(self.storable(message)).id
+                    except ValueError as e:
+                        response = ack(e)
+                else:
+                    await self.messages.put(message)
+                writer.write(encode_frame(response))
+                await writer.drain()
+        except ConnectionError:
+            self.logger.warning('Client connection lost')
         finally:
             writer.close()
 
     async def send_event(self, msg, port, HOST='127.0.0.1'):
-        json_message = json.dumps(msg)
-        try:
-            reader, writer = await asyncio.open_connection(HOST, port)
-            writer.write(json_message.encode('utf-8'))
-            await writer.drain()
-            writer.close()
-        except asyncio.TimeoutError:
-            self._handle_socket_error(msg, port)
-        except ConnectionRefusedError:
-            self.logger.warning(f'Service at host:{HOST} and port: {port} is refusing connections.')
-        except Exception:
-            self.logger.exception(f'Exception while sending message {json_message}.')
+        """
+        Send ``msg`` to the engine listening on ``port`` and return its ack.
+
+        A connection which fails, or an ack not received within ``CRON_SEND_TIMEOUT``, is tried again up to
+        ``CRON_SEND_RETRIES`` times before the error is raised. An error ack raises ``MessageRejected``, sending the
+        same message again would only be rejected again.
+        """
+        frame = encode_frame(msg)
+        for attempt in range(1, CRON_SEND_RETRIES + 1):
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(HOST, port), CRON_SEND_TIMEOUT)
+                writer.write(frame)
+                await writer.drain()
+                response = await asyncio.wait_for(read_frame(reader), CRON_SEND_TIMEOUT)
+                if response is None:
+                    raise ConnectionResetError('connection closed before the message was acked')
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+                if attempt == CRON_SEND_RETRIES:
+                    self.logger.error(f'Could not send {msg.get("event")} to {HOST}:{port}: {e!r}')
+                    raise
+                self.logger.warning(f'Sending {msg.get("event")} to {HOST}:{port} failed, attempt {attempt}: {e!r}')
+                await asyncio.sleep(0.1 * attempt)
+                continue
+            finally:
+                if writer is not None:
+                    writer.close()
+            if response.get('status') != STATUS_OK:
+                raise MessageRejected(response.get('error'))
+            return response
 
     async def _do_work(self, message):
         raise NotImplementedError
@@ -89,10 +136,11 @@ class BaseEngine:
     async def start(self, port, HOST='127.0.0.1'):
         server = await asyncio.start_server(self.handle, HOST, port)
         self.logger.info('Starting engine port=%d' % port)
-        # Create worker tasks
-        workers = [asyncio.create_task(self.worker()) for _ in range(4)]
+        # Create worker tasks, blocking jobs are handed to the executor so these only wait
+        workers = [asyncio.create_task(self.worker()) for _ in range(CRON_WORKERS)]
+        scheduler = asyncio.create_task(self.scheduler.run(self.messages.put))
         async with server:
-            await asyncio.gather(server.serve_forever(), *workers)
+            await asyncio.gather(server.serve_forever(), scheduler, *workers)
 
 
 class CronEngine(BaseEngine):
@@ -100,31 +148,73 @@ class CronEngine(BaseEngine):
 
     def __init__(self, logger, *args, **kwargs):
         super(CronEngine, self).__init__(logger, *args, **kwargs)
+        if CRON_EXECUTOR == 'process':
+            self.executor = ProcessPoolExecutor(max_workers=CRON_EXECUTOR_WORKERS)
+        else:
+            self.executor = ThreadPoolExecutor(max_workers=CRON_EXECUTOR_WORKERS, thread_name_prefix='cron-job')
+        self._limits = dict()
+        for event, trigger in schedules.items():
+            self.scheduler.every(f'periodic:{event}', event, trigger)
 
     async def _do_work(self, message):
         event = message.get('event')
-        if event == 'SEND_VERIFICATION_EMAIL':
-            print('run_cron')
-            await self.run_async_job(event, message['params'])
-        elif event == 'SEND_PASSWORD_RESET_LINK':
-            print('run_cron')
-            await self.run_async_job(event, message['params'])
+        if event in plugins:
+            await self.run_async_job(event, message.get('params', {}), attempt=message.get('attempt', 0))
         else:
             self.logger.warning(f"Invalid event type {event}")
 
-    async def run_async_job(self, event, params):
-        # Simulate an asynchronous job
-        self.logger.info(f"Running async job {event}")
+    def _limit(self, event, plugin):
+        semaphore = self._limits.get(event)
+        if semaphore is None:
+            semaphore = self._limits[event] = asyncio.Semaphore(plugin.concurrency)
+        return semaphore
+
+    async def run_async_job(self, event, params, attempt=0):
+        """
+        Run the plugin registered for the event.
+
+        Sync plugins run in the executor pool so blocking I/O never stalls the engine loop. The plugin's concurrency
+        slot is only released once the job has really finished, a timed out sync job keeps its slot until its
+        thread returns.
+        """
         event_plugin = plugins.get(event)
+        if not event_plugin:
+            self.logger.warning(f"Invalid Plugin {event}")
+            return
+
+        semaphore = self._limit(event, event_plugin)
+        await semaphore.acquire()
+        self.logger.info(f"Running {event_plugin.mode} job {event}")
+        loop = asyncio.get_running_loop()
+        try:
+            if event_plugin.is_async:
+                job = asyncio.ensure_future(event_plugin.func(**params))
+                waiter = job
+            else:
+                job = loop.run_in_executor(self.executor, partial(event_plugin.func, **params))
+                # a thread can't be cancelled, don't let the timeout cancel the future tracking it
+                waiter = asyncio.shield(job)
+        except Exception as e:
+            semaphore.release()
+            self.logger.warning(f"Could not start task {event}: {e}")
+            return
+        job.add_done_callback(lambda _: semaphore.release())
 
-        if event_plugin:
-            try:
-                event_plugin(**params)
-                self.logger("Task Completed")
-            except Exception as e:
-                self.logger.warning(f"Error Occured.{str(e)}")
-        else:
-            self.logger("Invalid Plugin")
+        try:
+            await asyncio.wait_for(waiter, event_plugin.timeout)
+            self.logger.info(f"Task {event} Completed")
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Task {event} timed out after {event_plugin.timeout}s")
+        except Exception as e:
+            self.logger.warning(f"Error Occured.{str(e)}")
+            if attempt < event_plugin.retries:
+                job = self.scheduler.schedule(event, event_plugin.storable(params), delay=event_plugin.retry_delay,
+                                              attempt=attempt + 1)
+                self.logger.info(f"Retrying task {event} in {event_plugin.retry_delay}s as job {job.id}")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        smtp_pools.close()
 
 
 if __name__ == '__main__':
@@ -136,6 +226,8 @@ if __name__ == '__main__':
     cron_engine = CronEngine(logger)
 
     try:
-        asyncio.run(cron_engine.start(port=8888))
+        asyncio.run(cron_engine.start(port=CRON_PORT))
     except KeyboardInterrupt:
         logger.info("Shutting down...")
+    finally:
+        cron_engine.shutdown()
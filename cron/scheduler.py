@@ -0,0 +1,295 @@
+"""
+Delayed and recurring jobs for the cron engine.
+
+Jobs live in a min-heap ordered by their next run time and a single coroutine sleeps until the earliest one is due,
+then puts its message on the engine queue like any message received over the wire. Three kinds of jobs exist:
+
+* one shot jobs, created for messages carrying ``run_at`` (ISO 8601 date or unix timestamp) or ``delay`` (seconds)
+* interval jobs, run every ``n`` seconds
+* cron jobs, run on a five field cron expression (``minute hour day-of-month month day-of-week``) in local time
+
+Every job is written to a JSON file so pending and recurring jobs survive a restart of the engine. Jobs which came
+due while the engine was down are run once as soon as it is back.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+MAX_SLEEP = 60
+
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+}
+
+
+class IntervalTrigger(object):
+    def __init__(self, seconds):
+        if seconds <= 0:
+            raise ValueError('Interval must be a positive number of seconds')
+        self.seconds = seconds
+
+    def next_run(self, after):
+        return after + self.seconds
+
+    def to_dict(self):
+        return {'type': 'interval', 'seconds': self.seconds}
+
+
+class CronTrigger(object):
+    # (lowest, highest) allowed value of each field
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression, expression).split()
+        if len(fields) != 5:
+            raise ValueError(f'Invalid cron expression {expression!r}, expected 5 fields')
+        # sunday can be written as 0 or 7
+        fields[4] = ','.join('0' if part == '7' else part for part in fields[4].split(','))
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, low, high) for field, (low, high) in zip(fields, self.FIELDS))
+        # like cron, when both day fields are restricted a day matching either of them is due
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    @staticmethod
+    def _parse(field, low, high):
+        values = set()
+        for part in field.split(','):
+            step = 1
+            if '/' in part:
+                part, step = part.split('/', 1)
+                step = int(step)
+                if step <= 0:
+                    raise ValueError(f'Invalid step in cron field {field!r}')
+            if part == '*':
+                start, end = low, high
+            elif '-' in part:
+                start, end = (int(value) for value in part.split('-', 1))
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f'Cron field {field!r} out of range {low}-{high}')
+            values.update(range(start, end + 1, step))
+        return frozenset(values)
+
+    def _day_matches(self, day):
+        # python counts weekdays from monday, cron from sunday
+        weekday = (day.weekday() + 1) % 7
+        if self._any_day:
+            return weekday in self.weekdays
+        if self._any_weekday:
+            return day.day in self.days
+        return day.day in self.days or weekday in self.weekdays
+
+    def next_run(self, after):
+        moment = datetime.fromtimestamp(after).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                month = moment.month % 12 + 1
+                moment = moment.replace(year=moment.year + (month == 1), month=month, day=1, hour=0, minute=0)
+                continue
+            if not self._day_matches(moment):
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if moment.hour not in self.hours:
+                moment = (moment + timedelta(hours=1)).replace(minute=0)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment.timestamp()
+        raise ValueError(f'Cron expression {self.expression!r} never fires')
+
+    def to_dict(self):
+        return {'type': 'cron', 'expression': self.expression}
+
+
+def trigger_from_dict(data):
+    if data is None:
+        return None
+    if data['type'] == 'interval':
+        return IntervalTrigger(data['seconds'])
+    if data['type'] == 'cron':
+        return CronTrigger(data['expression'])
+    raise ValueError(f"Unknown trigger type {data['type']}")
+
+
+def parse_run_at(value):
+    """Unix timestamp of a ``run_at`` value, either a number or an ISO 8601 string (naive ones are local time)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+class ScheduledJob(object):
+    def __init__(self, job_id, event, params, next_run, trigger=None, attempt=0):
+        self.id = job_id
+        self.event = event
+        self.params = params
+        self.next_run = next_run
+        self.trigger = trigger
+        self.attempt = attempt
+
+    def message(self):
+        message = {'event': self.event, 'params': self.params}
+        if self.attempt:
+            message['attempt'] = self.attempt
+        return message
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'event': self.event,
+            'params': self.params,
+            'next_run': self.next_run,
+            'trigger': self.trigger.to_dict() if self.trigger else None,
+            'attempt': self.attempt,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['id'], data['event'], data.get('params', {}), data['next_run'],
+                   trigger=trigger_from_dict(data.get('trigger')), attempt=data.get('attempt', 0))
+
+
+class Scheduler(object):
+    """
+    Min-heap of scheduled jobs, persisted to ``store_path``.
+
+    Removing or rescheduling a job leaves its old heap entry behind; stale entries are recognised by their run time
+    no longer matching the job and skipped when they are popped.
+    """
+
+    def __init__(self, store_path, logger=None):
+        self.store_path = store_path
+        self.logger = logger or logging.getLogger('CronEngine')
+        self.jobs = dict()
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = None
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        if not self.store_path or not os.path.exists(self.store_path):
+            return
+        try:
+            with open(self.store_path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            self.logger.exception(f'Could not read schedules from {self.store_path}')
+            return
+        for data in stored:
+            try:
+                self._push(ScheduledJob.from_dict(data))
+            except (KeyError, ValueError):
+                self.logger.warning(f'Skipping invalid stored schedule {data}')
+
+    def save(self):
+        if not self.store_path:
+            return
+        temp_path = f'{self.store_path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump([job.to_dict() for job in self.jobs.values()], f)
+        # replace in one step so a crash never leaves a half written store behind
+        os.replace(temp_path, self.store_path)
+        self._dirty = False
+
+    def _push(self, job):
+        self.jobs[job.id] = job
+        heapq.heappush(self._heap, (job.next_run, next(self._counter), job.id))
+        self._dirty = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def schedule(self, event, params=None, run_at=None, delay=None, job_id=None, attempt=0):
+        """Run ``event`` once at ``run_at`` or after ``delay`` seconds, an existing job with ``job_id`` is replaced."""
+        if run_at is None:
+            run_at = time.time() + (delay or 0)
+        job = ScheduledJob(job_id or uuid.uuid4().hex, event, params or {}, run_at, attempt=attempt)
+        self._push(job)
+        return job
+
+    def schedule_message(self, message):
+        """Schedule a message received with a ``run_at`` or ``delay`` field, raises ValueError when they are invalid."""
+        try:
+            run_at = parse_run_at(message['run_at']) if message.get('run_at') is not None else None
+            delay = float(message.get('delay') or 0)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid run_at/delay in message: {e}')
+        return self.schedule(message.get('event'), message.get('params', {}), run_at=run_at, delay=delay,
+                             job_id=message.get('job_id'))
+
+    def every(self, job_id, event, trigger, params=None):
+        """
+        Register a recurring job. A job already loaded from the store keeps its next run time unless its trigger
+        changed, so restarting the engine does not push recurring jobs back.
+        """
+        existing = self.jobs.get(job_id)
+        if existing is not None and existing.trigger and existing.trigger.to_dict() == trigger.to_dict():
+            existing.params = params or {}
+            return existing
+        job = ScheduledJob(job_id, event, params or {}, trigger.next_run(time.time()), trigger=trigger)
+        self._push(job)
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs.pop(job_id, None)
+        if job is not None:
+            self._dirty = True
+        return job
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            run_at, _, job_id = heapq.heappop(self._heap)
+            job = self.jobs.get(job_id)
+            if job is None or job.next_run != run_at:
+                continue
+            due.append(job)
+            if job.trigger is None:
+                del self.jobs[job_id]
+                self._dirty = True
+            else:
+                # missed runs are not replayed, the job runs once and resumes its schedule from now
+                job.next_run = job.trigger.next_run(now)
+                self._push(job)
+        return due
+
+    async def run(self, dispatch):
+        """Hand the message of every due job to the ``dispatch`` coroutine, until cancelled."""
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                self._wakeup.clear()
+                for job in self._pop_due(time.time()):
+                    self.logger.info(f'Scheduled job {job.id} ({job.event}) is due')
+                    await dispatch(job.message())
+                if self._dirty:
+                    try:
+                        self.save()
+                    except OSError:
+                        self.logger.exception(f'Could not save schedules to {self.store_path}')
+                delay = self._heap[0][0] - time.time() if self._heap else MAX_SLEEP
+                # sleep at most MAX_SLEEP so a changed wall clock is noticed
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(0, min(delay, MAX_SLEEP)))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._dirty:
+                self.save()
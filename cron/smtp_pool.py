@@ -0,0 +1,159 @@
+import logging
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+from cron.config import SMTP_HOST, SMTP_PORT, SMTP_USE_TLS, SMTP_TIMEOUT, SMTP_POOL_SIZE, SMTP_IDLE_TIMEOUT, \
+    SMTP_RATE_LIMIT
+
+# rejections of one message, the session itself stays usable
+MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def is_session_error(error):
+    """Socket level and protocol errors (smtplib errors are OSErrors) after which a session is dropped."""
+    return isinstance(error, OSError) and not isinstance(error, MESSAGE_ERRORS)
+
+
+class RateLimiter(object):
+    """Token bucket shared by the threads sending through one pool."""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class SmtpPool(object):
+    """
+    Keeps up to ``size`` authenticated SMTP sessions open for one sender account.
+
+    Jobs borrow a session, send and hand it back, so a burst of emails pays for the TLS handshake and login once
+    per session instead of once per email. Sessions which error out are dropped and the message is retried once on
+    a fresh session.
+    """
+
+    def __init__(self, username, password, host=SMTP_HOST, port=SMTP_PORT, use_tls=SMTP_USE_TLS, size=SMTP_POOL_SIZE,
+                 idle_timeout=SMTP_IDLE_TIMEOUT, rate_limit=SMTP_RATE_LIMIT, timeout=SMTP_TIMEOUT):
+        self.username = username
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.logger = logging.getLogger('CronEngine')
+        self.rate_limiter = RateLimiter(rate_limit)
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            # local stand-in servers don't offer AUTH
+            if self.username and smtp.has_extn('auth'):
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._discard(smtp)
+            raise
+        return smtp
+
+    @staticmethod
+    def _discard(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _checkout(self):
+        with self._lock:
+            while self._idle:
+                smtp, released_at = self._idle.pop()
+                if time.monotonic() - released_at < self.idle_timeout:
+                    return smtp
+                self._discard(smtp)
+        return self._connect()
+
+    def _checkin(self, smtp):
+        with self._lock:
+            self._idle.append((smtp, time.monotonic()))
+
+    @contextmanager
+    def session(self):
+        self._slots.acquire()
+        smtp = None
+        try:
+            smtp = self._checkout()
+            yield smtp
+        except Exception as e:
+            if smtp is not None and is_session_error(e):
+                self._discard(smtp)
+                smtp = None
+            raise
+        finally:
+            if smtp is not None:
+                self._checkin(smtp)
+            self._slots.release()
+
+    def send(self, msg):
+        self.rate_limiter.wait()
+        for attempt in range(2):
+            try:
+                with self.session() as smtp:
+                    smtp.send_message(msg)
+                return
+            except OSError as e:
+                if attempt or not is_session_error(e):
+                    raise
+                self.logger.warning(f"SMTP session to {self.host} failed, reconnecting: {e}")
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            self._discard(smtp)
+
+
+class SmtpPools(object):
+    """One pool per sender account, created on first use."""
+
+    def __init__(self):
+        self._pools = dict()
+        self._lock = threading.Lock()
+
+    def get(self, username, password):
+        with self._lock:
+            pool = self._pools.get(username)
+            if pool is None or pool.password != password:
+                if pool is not None:
+                    pool.close()
+                pool = self._pools[username] = SmtpPool(username, password)
+            return pool
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), dict()
+        for pool in pools:
+            pool.close()
+
+
+smtp_pools = SmtpPools()
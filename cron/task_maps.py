@@ -1,6 +1,19 @@
 from cron.async_tasks import send_verification_email, send_password_reset_email
+from cron.job_plugins import JobPlugin, SYNC
+from cron.maintenance_tasks import expire_vendor_subscriptions, roll_availability_forward
+from cron.scheduler import CronTrigger
 
 plugins = {
-    'SEND_VERIFICATION_EMAIL': send_verification_email,
-    'SEND_PASSWORD_RESET_LINK': send_password_reset_email
-}
\ No newline at end of file
+    'SEND_VERIFICATION_EMAIL': JobPlugin(send_verification_email, mode=SYNC, concurrency=4, timeout=30, retries=2,
+                                         secrets=('password',)),
+    'SEND_PASSWORD_RESET_LINK': JobPlugin(send_password_reset_email, mode=SYNC, concurrency=4, timeout=30, retries=2,
+                                          secrets=('password',)),
+    'EXPIRE_VENDOR_SUBSCRIPTIONS': JobPlugin(expire_vendor_subscriptions, mode=SYNC, concurrency=1, timeout=300),
+    'ROLL_AVAILABILITY': JobPlugin(roll_availability_forward, mode=SYNC, concurrency=1, timeout=1800),
+}
+
+# recurring jobs, keyed by the event they put on the engine queue
+schedules = {
+    'EXPIRE_VENDOR_SUBSCRIPTIONS': CronTrigger('*/15 * * * *'),
+    'ROLL_AVAILABILITY': CronTrigger('0 1 * * *'),
+}
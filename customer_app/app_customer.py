@@ -7,7 +7,13 @@ from utilities.db_getter import get_session
 from flask_cors import CORS
 
 from utilities.encoders import DobatoEncoder
-from utilities.schemas.models import User
+from utilities.instrumentation import instrumentation
+from utilities.invalidation_bus import invalidation_bus
+from utilities.query_recorder import n_plus_one
+from utilities.reference_data import reference_data
+from utilities.replica_routing import replica_routing
+from utilities.response_cache import response_cache, vendor_tag
+from utilities.user_cache import user_cache
 
 
 app = flask.Flask(__name__)
@@ -17,6 +23,9 @@ jwt_manager = JWTManager(app)
 app.config['JWT_USER_CLAIM'] = 'identity'
 
 CORS(app)
+instrumentation.init_app(app)
+n_plus_one.init_app(app)
+replica_routing.init_app(app)
 session = get_session()
 
 @app.before_request
@@ -35,12 +44,17 @@ def teardown_request(exception=None):
 
 
 def user_loader_callback(jwt_header, jwt_payload):
-    identity = jwt_payload["sub"]
-    user = g.db_session.get(User, identity)
-    return user
+    return user_cache.get(jwt_payload["sub"], g.db_session)
+
+
+def evict_vendor_responses(change):
+    if change.vendor_profile_id is not None:
+        response_cache.invalidate(vendor_tag(change.vendor_profile_id))
 
 
 jwt_manager.user_lookup_loader(user_loader_callback)
+reference_data.warm()
+invalidation_bus.subscribe(evict_vendor_responses)
 
 # jwt_manager.additional_claims_callback(user_claims_callback)
 
@@ -63,6 +77,8 @@ app.add_url_rule('/consumer-api/menu-list/<int:vendor_profile_id>',
                  view_func=vendor_views.VendorMenuList.as_view('vendor-menu'))
 app.add_url_rule('/consumer-api/menu-list/<int:vendor_profile_id>/food-items/<int:menu_id>',
                  view_func=vendor_views.VendorMenuDetail.as_view('vendor-menu-detail'))
+app.add_url_rule('/consumer-api/venue-calendar/<int:venue_id>',
+                 view_func=vendor_views.VendorCalendar.as_view('venue-calendar'))
 
 if __name__ == '__main__':
     app.run(debug=True, port=9002)
\ No newline at end of file
@@ -1,4 +1,3 @@
-import asyncio
 import io
 import logging
 import os
@@ -22,6 +21,7 @@ from customer_app.callbacks.user_validators import LoginSchema, RegisterSchema,
 from customer_app.config import MEDIA_PATH, EMAIL, EMAIL_APP_PASSWORD
 from customer_app.utils.authentication_utils import load_current_user
 from utilities.dobato import DobatoApi
+from utilities.user_cache import user_cache
 from customer_app.utils.email_util_b2c import send_verification_email, send_password_reset_email
 from utilities.responses import success_response, server_error, validation_error
 from utilities.responses import unauthorized_response, bad_request_error, forbidden_error, \
@@ -101,11 +101,11 @@ class Register(DobatoApi):
             self.db.add(new_user)
             self.db.commit()
             # Send verification email
-            asyncio.run(self.send_message({'event': 'SEND_VERIFICATION_EMAIL',
-                                           'params': {'sender_email': EMAIL,
-                                                      'receiver_email': email,
-                                                      'verification_code': verification_code,
-                                                      'password': EMAIL_APP_PASSWORD}}, port=8888))
+            self.send_message({'event': 'SEND_VERIFICATION_EMAIL',
+                               'params': {'sender_email': EMAIL,
+                                          'receiver_email': email,
+                                          'verification_code': verification_code,
+                                          'password': EMAIL_APP_PASSWORD}})
             return success_response(msg='User successfully registered.')
         except Exception as e:
             self.db.rollback()
@@ -171,23 +171,25 @@ class ResendOTP(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        curr_user = load_current_user()
+        user = load_current_user()
+        if user is None:
+            return unauthorized_response(msg="Unauthorized User")
         verification_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
         try:
-            user = self.db.query(User).filter(User.id == curr_user.id).first()
-
             if not self.is_consumer(user.user_type_id):
                 return bad_request_error(msg='User not registered as a consumer.')
             if user.is_verified:
                 return bad_request_error(msg="Email already verified.")
             email = user.email
             # Send verification email
-            asyncio.run(self.send_message({'event': 'SEND_VERIFICATION_EMAIL',
-                                           'params': {'sender_email': EMAIL,
-                                                      'receiver_email': email,
-                                                      'verification_code': verification_code,
-                                                      'password': EMAIL_APP_PASSWORD}}, port=8888))
-            user.verification_code = verification_code
+            self.send_message({'event': 'SEND_VERIFICATION_EMAIL',
+                               'params': {'sender_email': EMAIL,
+                                          'receiver_email': email,
+                                          'verification_code': verification_code,
+                                          'password': EMAIL_APP_PASSWORD}})
+            # the current user is a cached snapshot, the code is written without loading the row
+            self.db.query(User).filter(User.id == user.id).update({User.verification_code: verification_code},
+                                                                  synchronize_session=False)
             self.db.commit()
         except Exception as e:
             return server_error(e)
@@ -271,7 +273,7 @@ class Logout(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = self.db.query(User).filter_by(id=self.user.id).first()
+        user = self.user
         if not user:
             return unauthorized_response(msg={"User not registered"})
 
@@ -312,9 +314,7 @@ class RefreshTokenApi(DobatoApi):
         # db = get_session()
         try:
             _, data = verify_jwt_in_request(refresh=True)
-            user = self.db.query(User) \
-                .filter(User.id == data['sub']) \
-                .first()
+            user = user_cache.get(data['sub'], self.db)
 
             if user is None:
                 return unauthorized_response(msg='User Not Found')
@@ -351,13 +351,13 @@ class ForgotPassword(DobatoApi):
             if not self.is_consumer(user.user_type_id):
                 return bad_request_error(msg='User not registered as a consumer.')
             reset_token = user.generate_reset_token()
-            asyncio.run(self.send_message({'event': 'SEND_PASSWORD_RESET_LINK',
-                                           'params': {'sender_email': EMAIL,
-                                                      'receiver_email': email,
-                                                      'password': EMAIL_APP_PASSWORD,
-                                                      'token': reset_token,
-                                                      'reset_url': reset_url
-                                                      }}, port=8888))
+            self.send_message({'event': 'SEND_PASSWORD_RESET_LINK',
+                               'params': {'sender_email': EMAIL,
+                                          'receiver_email': email,
+                                          'password': EMAIL_APP_PASSWORD,
+                                          'token': reset_token,
+                                          'reset_url': reset_url
+                                          }})
             return success_response(msg='Password reset link sent to your email')
         else:
             return not_found_error(msg='Email not found')
@@ -1,12 +1,17 @@
+from datetime import date, datetime
 
 from flask import request
 from sqlalchemy import func
 
+from utilities.availability_bitmaps import venue_calendar, days_of, month_start, next_month
 from utilities.db_getter import get_session
 from utilities.dobato import DobatoApi
-from utilities.responses import success_response, not_found_error
+from utilities.reference_data import reference_data
+from utilities.response_cache import response_cache, vendor_tags, INDUSTRIES_TAG
+from utilities.responses import success_response, not_found_error, bad_request_error
 from utilities.schemas.models import VendorIndustry, VenueType, Venue, VendorProfile, VenueBooking, VenueSpace, Menu, \
-    MenuItemTable, FoodItem
+    MenuItemTable, FoodItem, VenueCard
+from utilities.venue_search import VenueSearch, InvalidSearch
 
 
 class VendorIndustryList(DobatoApi):
@@ -24,6 +29,9 @@ class VendorIndustryList(DobatoApi):
 
     """
 
+    read_only = True
+    decorators = [response_cache.cached(tags=lambda **kwargs: [INDUSTRIES_TAG])]
+
     def get(self):
         """
         Handle GET requests for vendor industry list.
@@ -33,7 +41,7 @@ class VendorIndustryList(DobatoApi):
         """
         # get list of vendor industries eg: venues, photography etc.
         # TODO: try-catch here
-        rows = self.db.query(VendorIndustry.id, VendorIndustry.industry_name).all()
+        rows = reference_data.industries()
         return self.list_response(rows)
 
 
@@ -52,11 +60,55 @@ class VenueTypeList(DobatoApi):
             JSON response with vendor-industry data and success message.
         """
         # get list of venue types eg: banquet, resort, five star etc.
-        venue_types = self.db.query(VenueType).all()
+        venue_types = reference_data.venue_types()
         return self.list_response(rows=venue_types)
 
 
+def venue_list_query(session):
+    """Listed venue cards, before search and pagination."""
+    # cards of venues without spaces are kept for the vendor views but not listed
+    return (session.query(VenueCard)
+            .filter(VenueCard.space_count > 0)
+            .with_entities(VenueCard.venue_id, VenueCard.location, VenueCard.venue_type, VenueCard.venue_name,
+                           VenueCard.industry_name, VenueCard.parking_capacity, VenueCard.vendor_profile_id,
+                           VenueCard.total_capacity, VenueCard.space_count, VenueCard.min_rate, VenueCard.max_rate))
+
+
+def venue_detail_query(session, vendor_profile_id):
+    """The vendor's venues with their spaces, one row per venue."""
+    return (session.query(VendorProfile)
+            .join(Venue, Venue.vendor_profile_id == VendorProfile.id)
+            .join(VenueSpace, Venue.id == VenueSpace.venue_id)
+            .filter(VendorProfile.id == vendor_profile_id)
+            .group_by(Venue.id)
+            .with_entities(Venue.vendor_profile_id, Venue.id.label('venue_id'), Venue.venue_name,
+                           Venue.venue_type, Venue.location,
+                           func.json_agg(func.json_build_object(
+                               'space_id', VenueSpace.id,
+                               'space_name', VenueSpace.space_name,
+                               'seating_capacity', VenueSpace.seating_capacity,
+                               'floating_capacity', VenueSpace.floating_capacity,
+                               'space_type', VenueSpace.floating_capacity
+                           )).label('Space_info')))
+
+
+def vendor_menu_query(session, vendor_profile_id):
+    return session.query(Menu).filter(Menu.vendor_profile_id == vendor_profile_id)
+
+
+def menu_items_query(session, vendor_profile_id, menu_id):
+    """Food items of the vendor's menu, before pagination."""
+    return (session.query(MenuItemTable)
+            .join(FoodItem, FoodItem.id == MenuItemTable.item_id)
+            .join(Menu, Menu.id == MenuItemTable.menu_id)
+            .filter(MenuItemTable.menu_id == menu_id, Menu.vendor_profile_id == vendor_profile_id)
+            .with_entities(MenuItemTable.id, MenuItemTable.menu_id, FoodItem.item_name, FoodItem.type,
+                           FoodItem.item_price))
+
+
 class VenueList(DobatoApi):
+    read_only = True
+
     def get(self):
         """
         API endpoint for venues list.
@@ -65,39 +117,30 @@ class VenueList(DobatoApi):
             get(): Handle GET requests for venues list.
 
          Usage:
-            Send a GET request to '/consumer-api/venues-list'
+            Send a GET request to '/consumer-api/venues-list', optionally with the search arguments described in
+            ``utilities.venue_search`` e.g. '?location=Kathmandu&min_capacity=300&date=2026-12-05&sort=price'
 
         Returns:
             JSON response with venue-list data and success message.
         """
-        venue_query = (self.db.query(Venue)
-                       .join(VenueSpace, Venue.id == VenueSpace.venue_id)
-                       .join(VendorIndustry, Venue.industry_id == VendorIndustry.id)
-                       .group_by(Venue.id, VendorIndustry.industry_name)
-                       .with_entities(Venue.id.label('venue_id'), Venue.location, Venue.venue_type, Venue.venue_name,
-                                      VendorIndustry.industry_name, Venue.parking_capacity, Venue.vendor_profile_id,
-                                      func.sum(VenueSpace.seating_capacity + VenueSpace.floating_capacity).label('total_capacity')))
-        # venue_query = (self.db.query(VendorProfile)
-        #                .join(VendorIndustry, VendorProfile.industry_id == VendorIndustry.id)
-        #                .join(Venue, VendorProfile.industry_id == Venue.industry_id)
-        #                # .filter(VendorIndustry.industry_name == 'Venues')
-        #                .with_entities(VendorProfile.id, Venue.venue_name, VendorIndustry.industry_name,
-        #                               VendorProfile.profile_image, VendorProfile.location))
-        #
-        location_filter = request.args.get('location')
-        if location_filter:
-            venue_query = venue_query.filter(VendorProfile.location == location_filter)
-
-        # TODO: implement date filter
-        date_filter = request.args.get('date')
-
-        venues_list = venue_query.limit(self.limit()).offset(self.offset()).all()
+        venue_query = venue_list_query(self.db)
+        try:
+            search = VenueSearch(request.args)
+        except InvalidSearch as e:
+            return bad_request_error(msg=str(e))
+        venue_query = search.apply(venue_query)
+
+        venues_list = self.paginate(venue_query, VenueCard.venue_id, search.sort_column, sort_attr=search.sort_attr,
+                                    descending=search.descending)
         # venues_count = venue_query.scalar()
         # pagination_meta = self.pagination_meta(venues_count)
         return self.list_response(rows=venues_list)
 
 
 class VenueDetail(DobatoApi):
+    read_only = True
+    decorators = [response_cache.cached(tags=vendor_tags)]
+
     def get(self, vendor_profile_id):
         """
         API endpoint for venue detail.
@@ -111,22 +154,7 @@ class VenueDetail(DobatoApi):
         Returns:
             JSON response with detail data about venue and its related spaces.
         """
-        venue_detail_query = (self.db.query(VendorProfile)
-                              .join(Venue, Venue.vendor_profile_id == VendorProfile.id)
-                              .join(VenueSpace, Venue.id == VenueSpace.venue_id)
-                              .filter(VendorProfile.id == vendor_profile_id)
-                              .group_by(Venue.id)
-                              .with_entities(Venue.vendor_profile_id, Venue.id.label('venue_id'), Venue.venue_name,
-                                             Venue.venue_type, Venue.location,
-                                             func.json_agg(func.json_build_object(
-                                                 'space_id', VenueSpace.id,
-                                                 'space_name', VenueSpace.space_name,
-                                                 'seating_capacity', VenueSpace.seating_capacity,
-                                                 'floating_capacity', VenueSpace.floating_capacity,
-                                                 'space_type', VenueSpace.floating_capacity
-                                             )).label('Space_info')))
-
-        venue_detail = venue_detail_query.all()
+        venue_detail = venue_detail_query(self.db, vendor_profile_id).all()
         if venue_detail:
             return self.detail_response(venue_detail[0])
         else:
@@ -134,6 +162,9 @@ class VenueDetail(DobatoApi):
 
 
 class VendorMenuList(DobatoApi):
+    read_only = True
+    decorators = [response_cache.cached(tags=vendor_tags)]
+
     def get(self, vendor_profile_id):
         """
         API endpoint for vendor menu list.
@@ -147,14 +178,16 @@ class VendorMenuList(DobatoApi):
         Returns:
             JSON response with list of menus for a vendor.
         """
-        vendor_menu_query = self.db.query(Menu).filter(Menu.vendor_profile_id == vendor_profile_id)
-        vendor_menu = vendor_menu_query.limit(self.limit()).offset(self.offset()).all()
+        vendor_menu = self.paginate(vendor_menu_query(self.db, vendor_profile_id), Menu.id)
 
         return self.list_response(vendor_menu)
 
 
 class VendorMenuDetail(DobatoApi):
-    def get(self, menu_id):
+    read_only = True
+    decorators = [response_cache.cached(tags=vendor_tags)]
+
+    def get(self, vendor_profile_id, menu_id):
         """
         API endpoint for menu food items list.
 
@@ -167,25 +200,45 @@ class VendorMenuDetail(DobatoApi):
         Returns:
             JSON response with list of food-items of a menu.
         """
-        menu_detail_query = (self.db.query(MenuItemTable)
-                             .join(FoodItem, FoodItem.id == MenuItemTable.item_id)
-                             .filter(MenuItemTable.menu_id == menu_id)
-                             .with_entities(MenuItemTable.id, MenuItemTable.menu_id, FoodItem.item_name, FoodItem.type,
-                                            FoodItem.item_price))
-
-        menu_items_list = menu_detail_query.limit(self.limit()).offset(self.offset()).all()
+        menu_items_list = self.paginate(menu_items_query(self.db, vendor_profile_id, menu_id), MenuItemTable.id)
         return self.list_response(menu_items_list)
 
 
 class VendorCalendar(DobatoApi):
-    def get(self, **kwargs):
-        # IN-COMPLETE
-        vendor_id = kwargs['vendor_id']
-        date_from = kwargs['date_from']
-        date_to = kwargs['date_to']
-        venue_bookings = (self.db.query(VenueBooking)
-                          .filter(VenueBooking.booked_date >= date_from)
-                          .filter(VenueBooking.booked_date <= date_to)
-                          .with_entities(VenueBooking.booked_date).all())
-
-        return venue_bookings
\ No newline at end of file
+    read_only = True
+
+    def get(self, venue_id):
+        """
+        API endpoint for the availability calendar of a venue.
+
+        Methods:
+            get(): Handle GET requests for a venue's calendar.
+
+        Usage:
+            Send a GET request to '/consumer-api/venue-calendar/<int:venue_id>' with 'month' (YYYY-MM) or 'year'
+            (YYYY), the current month by default.
+
+        Returns:
+            JSON response with, for every shift of the venue's spaces and month, the free days and the open days
+            which are fully booked.
+        """
+        try:
+            if request.args.get('year'):
+                start = date(int(request.args['year']), 1, 1)
+                end = date(start.year + 1, 1, 1)
+            else:
+                start = datetime.strptime(request.args['month'], '%Y-%m').date() if request.args.get('month') \
+                    else month_start(date.today())
+                end = next_month(start)
+        except ValueError:
+            return bad_request_error(msg="'month' must be YYYY-MM and 'year' YYYY")
+
+        rows = [{
+            'space_id': row.space_id,
+            'shift_id': row.shift_id,
+            'shift_name': row.shift_name,
+            'month': row.month.strftime('%Y-%m'),
+            'free_days': [day.isoformat() for day in days_of(row.available_days & ~row.booked_days, row.month)],
+            'booked_days': [day.isoformat() for day in days_of(row.booked_days, row.month)],
+        } for row in venue_calendar(self.db, venue_id, start, end)]
+        return self.list_response(rows)
@@ -18,4 +18,6 @@ APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 MEDIA_PATH = os.path.join(APP_ROOT, os.environ['MEDIA_DIR'])
 
 DB_URL = "{server}://{username}:{password}@{host}:{port}/{db}" \
-    .format(server=DB_SERVER, username=DB_USERNAME, password=DB_PASSWORD, host=DB_HOST, db=DATABASE, port=DB_PORT)
\ No newline at end of file
+    .format(server=DB_SERVER, username=DB_USERNAME, password=DB_PASSWORD, host=DB_HOST, db=DATABASE, port=DB_PORT)
+# optional read replica, read-only traffic is routed to it when set
+DB_REPLICA_URL = os.environ.get('DB_REPLICA_URL')
\ No newline at end of file
@@ -1,30 +1,20 @@
-import smtplib
-from email.message import EmailMessage
+from utilities.cron_client import cron_client
 from customer_app.config import EMAIL, EMAIL_APP_PASSWORD
 
 
+# emails are rendered and sent by the cron engine over its pooled SMTP sessions
 def send_verification_email(email, verification_code):
-    msg = EmailMessage()
-    msg.set_content(f'Your email verification code for saahitt is {verification_code}')
-    msg['Subject'] = 'Email Verification'
-    msg['From'] = EMAIL
-    msg['To'] = email
-
-    with smtplib.SMTP('smtp.zoho.com', 587) as smtp:
-        smtp.starttls()
-        smtp.login(EMAIL, EMAIL_APP_PASSWORD)
-        smtp.send_message(msg)
+    return cron_client.enqueue({'event': 'SEND_VERIFICATION_EMAIL',
+                                'params': {'sender_email': EMAIL,
+                                           'receiver_email': email,
+                                           'verification_code': verification_code,
+                                           'password': EMAIL_APP_PASSWORD}})
 
 
 def send_password_reset_email(email, token, reset_url):
-    msg = EmailMessage()
-    msg.set_content(
-        f'To reset your password, visit the following link:\n{reset_url}/create-new-password/{token}')
-    msg['Subject'] = 'Password Reset Request'
-    msg['From'] = EMAIL
-    msg['To'] = email
-
-    with smtplib.SMTP('smtp.zoho.com', 587) as smtp:
-        smtp.starttls()
-        smtp.login(EMAIL, EMAIL_APP_PASSWORD)
-        smtp.send_message(msg)
+    return cron_client.enqueue({'event': 'SEND_PASSWORD_RESET_LINK',
+                                'params': {'sender_email': EMAIL,
+                                           'receiver_email': email,
+                                           'password': EMAIL_APP_PASSWORD,
+                                           'token': token,
+                                           'reset_url': reset_url}})
@@ -4,13 +4,18 @@ from flask import g
 from super_admin.callbacks import admin_views, auth_views, form_views
 from super_admin.utils.db_getter import get_session
 from utilities.encoders import DobatoEncoder
-from utilities.schemas.models import User
+from utilities.instrumentation import instrumentation
+from utilities.query_recorder import n_plus_one
+from utilities.reference_data import reference_data
+from utilities.user_cache import user_cache
 
 app = flask.Flask(__name__)
 app.json = DobatoEncoder(app)
 app.config['SECRET_KEY'] = 'sahashahit-consumer'
 jwt_manager = JWTManager(app)
 app.config['JWT_USER_CLAIM'] = 'identity'
+instrumentation.init_app(app)
+n_plus_one.init_app(app)
 
 
 @app.before_request
@@ -30,12 +35,11 @@ def teardown_request(exception=None):
 
 
 def user_loader_callback(jwt_header, jwt_payload):
-    identity = jwt_payload["sub"]
-    user = g.db_session.get(User, identity)
-    return user
+    return user_cache.get(jwt_payload["sub"], g.db_session)
 
 
 jwt_manager.user_lookup_loader(user_loader_callback)
+reference_data.warm()
 
 # jwt_manager.additional_claims_callback(user_claims_callback)
 
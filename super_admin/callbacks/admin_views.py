@@ -5,6 +5,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from super_admin.utils.admin_site import admin_assets
 
 from utilities.dobato import DobatoApi
+from utilities.reference_data import reference_data, REFERENCE_TABLES
 from utilities.responses import *
 from flask import request, jsonify, current_app
 
@@ -46,6 +47,8 @@ class AddItem(DobatoApi):
             sql_object = sql_model(**data)
             self.db.add(sql_object)
             self.db.commit()
+            if table_name in REFERENCE_TABLES:
+                reference_data.invalidate()
         except SQLAlchemyError:
             raise Exception(f"unable to create data for table {table_name}")
 
@@ -82,6 +85,8 @@ class ItemDetail(DobatoApi):
             if hasattr(item, key):
                 setattr(item, key, value)
         self.db.commit()
+        if table_name in REFERENCE_TABLES:
+            reference_data.invalidate()
         return success_response(msg=f"{table_name} item updated successfully")
 
     def delete(self, table_name, item_id):
@@ -92,6 +97,8 @@ class ItemDetail(DobatoApi):
         try:
             self.db.delete(item)
             self.db.commit()
+            if table_name in REFERENCE_TABLES:
+                reference_data.invalidate()
         except SQLAlchemyError as e:
             self.db.rollback()
             return server_error(msg=f"unable to delete item. "
@@ -123,5 +130,5 @@ class VendorIndustryList(DobatoApi):
         """
         # get list of vendor industries eg: venues, photography etc.
         # TODO: try-catch here
-        rows = self.db.query(VendorIndustry.id, VendorIndustry.industry_name).all()
+        rows = reference_data.industries()
         return self.list_response(rows)
\ No newline at end of file
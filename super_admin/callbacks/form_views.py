@@ -4,6 +4,8 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from super_admin.validators.schema_validators import VendorFormSchema
 from utilities.dobato import DobatoApi
+from utilities.reference_data import reference_data
+from utilities.response_cache import response_cache, INDUSTRIES_TAG
 from utilities.responses import success_response
 from utilities.schemas.models import VendorIndustry, VendorDynamicFormTable
 from utilities.vendor_forms import VendorForms
@@ -62,7 +64,7 @@ class AddVendorIndustry(DobatoApi):
 
         vendor_industry_name = validated_industry_data['industry_name']
         try:
-            vendor_industry = self.db.query(VendorIndustry).filter_by(industry_name=vendor_industry_name).first()
+            vendor_industry = reference_data.industry_by_name(vendor_industry_name)
         except SQLAlchemyError as e:
             vendor_industry = None
         if vendor_industry:
@@ -70,7 +72,9 @@ class AddVendorIndustry(DobatoApi):
         try:
             new_industry = VendorIndustry(**validated_industry_data)
             self.db.add(new_industry)
+            response_cache.invalidate_on_commit(self.db, INDUSTRIES_TAG)
             self.db.commit()
+            reference_data.invalidate()
             return success_response('Vendor Industry added successfully')
         except Exception as e:
             self.db.rollback()
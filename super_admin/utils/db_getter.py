@@ -1,10 +1,9 @@
-from sqlalchemy.orm import sessionmaker, scoped_session
-
 from super_admin.config import DB_URL
 from utilities.db_setup import database_factory
 
+# one factory, pool and session registry per database, whichever module asks for it
 Session = database_factory(DB_URL)
-scoped = scoped_session(Session)
+scoped = Session.scoped
 
 def get_session():
     """ Get a scoped session # simply gets the scope session and returns it to the
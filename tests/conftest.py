@@ -0,0 +1,41 @@
+"""
+Shared test setup. The apps read their settings from the environment on import, so placeholders are set here first
+and the database is swapped for a sqlite file, migrated once per test session.
+"""
+import os
+import tempfile
+
+import pytest
+
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(prefix='dobato-tests-'), 'dobato.db')
+
+for name, value in {'DB_SERVER': 'sqlite', 'DATABASE': TEST_DB_PATH, 'DB_HOST': '', 'DB_USERNAME': '',
+                    'DB_PASSWORD': '', 'DB_PORT': '', 'EMAIL': 'dobato@example.com', 'EMAIL_APP_PASSWORD': 'secret',
+                    'MEDIA_DIR': 'media'}.items():
+    os.environ.setdefault(name, value)
+
+import customer_app.config  # noqa: E402
+
+# the url the config builds from the parts needs a host and port, sqlite has neither
+customer_app.config.DB_URL = f'sqlite:///{TEST_DB_PATH}'
+customer_app.config.DB_REPLICA_URL = None
+
+
+@pytest.fixture(scope='session')
+def database():
+    """The migrated test database url, with the user types and industries the apps expect."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    from utilities.db_setup import migrate
+    from utilities.schemas.models import UserType, VendorIndustry
+
+    db_url = customer_app.config.DB_URL
+    migrate(db_url)
+    engine = create_engine(db_url)
+    with Session(engine) as session:
+        session.add_all([UserType(type_name='SuperAdmin'), UserType(type_name='Consumer'),
+                         UserType(type_name='Vendor'), VendorIndustry(industry_name='Venue')])
+        session.commit()
+    engine.dispose()
+    return db_url
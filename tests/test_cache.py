@@ -0,0 +1,161 @@
+"""
+``utilities.cache`` over ``MemoryRedis``; two ``Cache`` objects sharing one ``MemoryRedis`` stand for two processes.
+"""
+import threading
+import time
+
+import redis
+
+from utilities.cache import Cache, RedisTier, MemoryRedis, MISSING
+
+
+class RecordingRedis(MemoryRedis):
+    """Keeps the expiry of every value set, lock keys aside."""
+
+    def __init__(self):
+        super().__init__()
+        self.expiries = []
+
+    def set(self, key, value, px=None, nx=False):
+        if ':lock:' not in key:
+            self.expiries.append(px / 1000)
+        return super().set(key, value, px=px, nx=nx)
+
+
+class FailingRedis(object):
+    """A Redis which can't be reached, counting the commands sent to it."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, command):
+        def fail(*args, **kwargs):
+            self.calls += 1
+            raise redis.ConnectionError('connection refused')
+        return fail
+
+
+class Loader(object):
+    def __init__(self, value='loaded', delay=0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+def run_together(count, target):
+    barrier = threading.Barrier(count)
+    results = []
+
+    def run():
+        barrier.wait()
+        results.append(target())
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return results
+
+
+def test_concurrent_misses_load_once_in_process():
+    cache = Cache(remote=RedisTier(MemoryRedis()))
+    loader = Loader(delay=0.1)
+
+    results = run_together(8, lambda: cache.get_or_load('key', loader, 60))
+
+    assert loader.calls == 1
+    assert results == ['loaded'] * 8
+
+
+def test_concurrent_misses_load_once_across_processes():
+    shared = MemoryRedis()
+    caches = [Cache(remote=RedisTier(shared)) for _ in range(4)]
+    loader = Loader(delay=0.1)
+    turns = iter(caches)
+    lock = threading.Lock()
+
+    def load():
+        with lock:
+            cache = next(turns)
+        return cache.get_or_load('key', loader, 60)
+
+    results = run_together(4, load)
+
+    assert loader.calls == 1
+    assert results == ['loaded'] * 4
+
+
+def test_lock_wait_timing_out_loads_without_releasing_the_other_lock():
+    shared = MemoryRedis()
+    loading = RedisTier(shared)
+    assert loading.lock('key', 60)
+    cache = Cache(remote=RedisTier(shared), load_timeout=0.1)
+    loader = Loader()
+
+    assert cache.get_or_load('key', loader, 60) == 'loaded'
+    assert loader.calls == 1
+    # still held by the process loading it
+    assert not loading.lock('key', 60)
+
+
+def test_ttl_jitter_stays_within_bounds():
+    client = RecordingRedis()
+    cache = Cache(remote=RedisTier(client), jitter=0.2)
+    for n in range(200):
+        cache.set(f'key{n}', n, 100)
+
+    assert all(80 <= ttl <= 100 for ttl in client.expiries)
+    assert len(set(client.expiries)) > 1
+
+
+def test_local_copy_is_capped_when_redis_holds_the_shared_one():
+    shared = MemoryRedis()
+    cache = Cache(remote=RedisTier(shared), local_ttl=0.1)
+    other = Cache(remote=RedisTier(shared), local_ttl=0.1)
+    cache.set('key', 'old', 60)
+    other.set('key', 'new', 60)
+
+    assert cache.get('key') == 'old'
+    time.sleep(0.15)
+    assert cache.get('key') == 'new'
+
+
+def test_local_only_cache_keeps_the_full_ttl():
+    cache = Cache(local_ttl=0.1)
+    cache.set('key', 'value', 60)
+    time.sleep(0.15)
+
+    assert cache.get('key') == 'value'
+
+
+def test_redis_errors_fall_back_to_the_loader():
+    client = FailingRedis()
+    cache = Cache(remote=RedisTier(client, retry_after=60))
+    loader = Loader()
+
+    assert cache.get_or_load('key', loader, 60) == 'loaded'
+    assert loader.calls == 1
+    calls = client.calls
+    assert calls == 1
+
+    # Redis is left alone while it is down, the process keeps its own copy
+    assert cache.get_or_load('key', loader, 60) == 'loaded'
+    assert cache.get_or_load('other', loader, 60) == 'loaded'
+    assert client.calls == calls
+
+
+def test_redis_tier_reads_errors_as_misses():
+    tier = RedisTier(FailingRedis(), retry_after=60)
+
+    assert tier.get('key') is MISSING
+    tier.set('key', 'value', 60)
+    tier.delete('key')
+    assert tier.lock('key', 1)
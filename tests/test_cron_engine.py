@@ -0,0 +1,192 @@
+"""
+``cron.run_cron`` engine, run on a fresh event loop per test with its schedule store in a temporary directory.
+"""
+import asyncio
+
+import pytest
+
+from cron import async_tasks, run_cron
+from utilities.cron_protocol import encode_frame, read_frame, ack, MessageRejected
+
+RESET_PARAMS = {'sender_email': 'dobato@example.com', 'receiver_email': 'user@example.com', 'password': 'secret',
+                'token': 'token', 'reset_url': 'https://example.com'}
+
+
+class Pools(object):
+    """Stands in for ``smtp_pools``, recording the credentials asked for and failing the sends when told to."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.credentials = []
+        self.sent = []
+
+    def get(self, username, password):
+        self.credentials.append((username, password))
+        return self
+
+    def send(self, msg):
+        if self.fail:
+            raise OSError('SMTP server unreachable')
+        self.sent.append(msg)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    import logging
+
+    monkeypatch.setattr(run_cron, 'CRON_SCHEDULE_STORE', str(tmp_path / 'schedules.json'))
+    engine = run_cron.CronEngine(logging.getLogger('CronEngine'))
+    yield engine
+    engine.shutdown()
+
+
+def retries(engine):
+    return [job for job in engine.scheduler.jobs.values() if job.trigger is None]
+
+
+def stored(engine):
+    engine.scheduler.save()
+    with open(engine.scheduler.store_path) as f:
+        return f.read()
+
+
+def test_retried_email_job_is_stored_without_the_password(engine, monkeypatch):
+    monkeypatch.setattr(async_tasks, 'smtp_pools', Pools(fail=True))
+
+    asyncio.run(engine.run_async_job('SEND_PASSWORD_RESET_LINK', dict(RESET_PARAMS)))
+
+    [job] = retries(engine)
+    assert job.attempt == 1
+    assert 'password' not in job.params
+    assert 'secret' not in stored(engine)
+
+
+def test_retried_email_job_reads_the_password_from_config(engine, monkeypatch):
+    monkeypatch.setattr(async_tasks, 'smtp_pools', Pools(fail=True))
+    asyncio.run(engine.run_async_job('SEND_PASSWORD_RESET_LINK', dict(RESET_PARAMS)))
+    [job] = retries(engine)
+
+    pools = Pools()
+    monkeypatch.setattr(async_tasks, 'smtp_pools', pools)
+    monkeypatch.setattr(async_tasks, 'EMAIL_APP_PASSWORD', 'from-config')
+    message = job.message()
+    asyncio.run(engine.run_async_job(message['event'], message['params'], attempt=message['attempt']))
+
+    assert pools.credentials == [('dobato@example.com', 'from-config')]
+    assert len(pools.sent) == 1
+
+
+def exchange(engine, *frames):
+    """Send raw ``frames`` to ``engine.handle`` over a local connection, returns the acks received."""
+    async def run():
+        server = await asyncio.start_server(engine.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b''.join(frames))
+            await writer.drain()
+            acks = []
+            for _ in frames:
+                response = await read_frame(reader)
+                if response is None:
+                    break
+                acks.append(response)
+            writer.close()
+            return acks
+
+    return asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_delayed_message_is_stored_without_the_password(engine):
+    message = {'event': 'SEND_PASSWORD_RESET_LINK', 'params': dict(RESET_PARAMS), 'delay': 60}
+
+    [response] = exchange(engine, encode_frame(message))
+
+    job = engine.scheduler.jobs[response['job_id']]
+    assert 'password' not in job.params
+    assert job.params['token'] == 'token'
+    assert 'secret' not in stored(engine)
+
+
+def test_message_which_is_not_an_object_is_acked_with_an_error(engine):
+    hello = {'event': 'HELLO'}
+
+    responses = exchange(engine, encode_frame([1]), encode_frame('x'), encode_frame(hello))
+
+    assert [response['status'] for response in responses] == ['error', 'error', 'ok']
+    assert 'JSON object' in responses[0]['error']
+    assert responses[2]['event'] == 'HI'
+
+
+def sent_to(engine, message, answer):
+    """Run ``engine.send_event`` against a server answering each frame with ``answer(frame)``, None for no answer.
+    Returns the ack and the number of connections the server saw."""
+    connections = []
+
+    async def serve(reader, writer):
+        connections.append(writer)
+        frame = await read_frame(reader)
+        response = answer(frame)
+        if response is not None:
+            writer.write(encode_frame(response))
+            await writer.drain()
+        await reader.read()
+        writer.close()
+
+    async def run():
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            try:
+                return await engine.send_event(message, port), len(connections)
+            finally:
+                server.close()
+
+    return asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_send_event_returns_the_ack(engine):
+    response, connections = sent_to(engine, {'event': 'HELLO'}, lambda frame: dict(ack(), event='HI'))
+
+    assert response == {'status': 'ok', 'event': 'HI'}
+    assert connections == 1
+
+
+def test_send_event_raises_on_an_error_ack(engine):
+    with pytest.raises(MessageRejected, match='unknown event'):
+        sent_to(engine, {'event': 'NOPE'}, lambda frame: ack(ValueError('unknown event')))
+
+
+def test_send_event_retries_when_no_ack_comes(engine, monkeypatch):
+    monkeypatch.setattr(run_cron, 'CRON_SEND_TIMEOUT', 0.1)
+    monkeypatch.setattr(run_cron, 'CRON_SEND_RETRIES', 2)
+    answers = iter([None, ack()])
+
+    response, connections = sent_to(engine, {'event': 'HELLO'}, lambda frame: next(answers))
+
+    assert response == {'status': 'ok'}
+    assert connections == 2
+
+
+def test_send_event_raises_once_the_retries_are_spent(engine, monkeypatch):
+    monkeypatch.setattr(run_cron, 'CRON_SEND_TIMEOUT', 0.1)
+    monkeypatch.setattr(run_cron, 'CRON_SEND_RETRIES', 2)
+
+    with pytest.raises(asyncio.TimeoutError):
+        sent_to(engine, {'event': 'HELLO'}, lambda frame: None)
+
+
+def test_vendor_reset_email_keeps_the_vendor_link(engine, monkeypatch):
+    from vendor_app.utils import email_util
+
+    enqueued = []
+    monkeypatch.setattr(email_util.cron_client, 'enqueue', enqueued.append)
+    pools = Pools()
+    monkeypatch.setattr(async_tasks, 'smtp_pools', pools)
+
+    email_util.send_password_reset_email('vendor@example.com', 'token', 'https://example.com')
+    [message] = enqueued
+    asyncio.run(engine.run_async_job(message['event'], message['params']))
+
+    [msg] = pools.sent
+    assert 'https://example.com/consumer-api/reset-password/token' in msg.get_content()
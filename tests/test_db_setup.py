@@ -0,0 +1,46 @@
+"""
+``utilities.db_setup.migrate`` on fresh sqlite files.
+"""
+from alembic import command
+from sqlalchemy import create_engine, inspect, text
+
+from utilities.db_setup import migrate, alembic_config, BASELINE_REVISION
+
+
+def revision(db_url):
+    engine = create_engine(db_url)
+    with engine.connect() as connection:
+        current = connection.execute(text('SELECT version_num FROM alembic_version')).scalar()
+    engine.dispose()
+    return current
+
+
+def head():
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config('sqlite://')).get_current_head()
+
+
+def test_migrate_creates_the_schema_once(tmp_path):
+    db_url = f'sqlite:///{tmp_path / "fresh.db"}'
+
+    assert migrate(db_url) is True
+    assert revision(db_url) == head()
+    assert migrate(db_url) is False
+
+
+def test_migrate_stamps_a_database_created_without_alembic(tmp_path):
+    db_url = f'sqlite:///{tmp_path / "legacy.db"}'
+    # the tables of the baseline, as create_all left them: no alembic_version
+    command.upgrade(alembic_config(db_url), BASELINE_REVISION)
+    engine = create_engine(db_url)
+    with engine.begin() as connection:
+        connection.execute(text('DROP TABLE alembic_version'))
+        connection.execute(text("INSERT INTO user_type (type_name) VALUES ('Vendor')"))
+
+    assert migrate(db_url) is True
+    assert revision(db_url) == head()
+    with engine.connect() as connection:
+        assert 'venue_card' in inspect(connection).get_table_names()
+        assert connection.execute(text('SELECT type_name FROM user_type')).scalar() == 'Vendor'
+    engine.dispose()
@@ -0,0 +1,31 @@
+"""
+Access to the ``/metrics`` route of ``Instrumentation``.
+"""
+import flask
+import pytest
+
+from utilities.instrumentation import Instrumentation
+
+
+def client(token):
+    app = flask.Flask(__name__)
+    Instrumentation(enabled=True, token=token).init_app(app)
+    return app.test_client()
+
+
+@pytest.mark.parametrize('headers', [{}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'secret'}])
+def test_metrics_need_the_token(headers):
+    assert client('secret').get('/metrics', headers=headers).status_code == 403
+
+
+def test_metrics_are_served_with_the_token():
+    response = client('secret').get('/metrics', headers={'Authorization': 'Bearer secret'},
+                                    environ_base={'REMOTE_ADDR': '10.0.0.5'})
+
+    assert response.status_code == 200
+    assert '# TYPE dobato_request_duration_seconds summary' in response.text
+
+
+def test_metrics_without_a_token_are_served_to_loopback_only():
+    assert client(None).get('/metrics').status_code == 200
+    assert client(None).get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 403
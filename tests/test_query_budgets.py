@@ -0,0 +1,91 @@
+"""
+Query counts of the vendor catalogue views, a regression past ``VENDOR_QUERY_BUDGET`` fails here.
+
+Each request runs with cold caches, so the user and vendor context loads are counted too.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from utilities.query_recorder import assert_max_queries, QueryBudgetExceeded
+
+
+@pytest.fixture(scope='module')
+def app(database):
+    from vendor_app.app_vendor import app
+
+    return app
+
+
+@pytest.fixture(scope='module')
+def vendor(database):
+    """A verified vendor owning a venue with spaces and menus with food items."""
+    from utilities.schemas.models import User, VendorProfile, VendorIndustry, Venue, VenueSpace, Menu, FoodItem, \
+        MenuItemTable
+
+    engine = create_engine(database)
+    with Session(engine) as session:
+        industry = session.query(VendorIndustry).filter_by(industry_name='Venue').one()
+        user = User(fullname='Budget Vendor', email='budget@example.com', password='x', user_type_id=3,
+                    is_verified=True)
+        session.add(user)
+        session.flush()
+        profile = VendorProfile(user_id=user.id, industry_id=industry.id, is_sa_verified=True)
+        session.add(profile)
+        session.flush()
+        venue = Venue(venue_name='Budget Hall', industry_id=industry.id, vendor_profile_id=profile.id)
+        items = [FoodItem(item_name=f'item {n}', item_price=100 + n, vendor_profile_id=profile.id) for n in range(12)]
+        menus = [Menu(name=f'menu {n}', rate=500, no_of_items=3, vendor_profile_id=profile.id) for n in range(3)]
+        session.add_all([venue, *items, *menus])
+        session.flush()
+        session.add_all([VenueSpace(space_name=f'space {n}', rate=1000, seating_capacity=50, venue_id=venue.id)
+                         for n in range(12)])
+        session.add_all([MenuItemTable(menu_id=menu.id, item_id=item.id) for menu in menus for item in items[:3]])
+        session.commit()
+        ids = {'user_id': user.id, 'venue_id': venue.id, 'menu_id': menus[0].id}
+    engine.dispose()
+    return ids
+
+
+@pytest.fixture
+def client(app, vendor):
+    from flask_jwt_extended import create_access_token
+
+    from utilities.cache import cache
+
+    cache.local.clear()
+    with app.app_context():
+        token = create_access_token(identity=str(vendor['user_id']))
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def budget():
+    from vendor_app.callbacks.venue_views import VENDOR_QUERY_BUDGET
+
+    return VENDOR_QUERY_BUDGET
+
+
+@pytest.mark.parametrize('path', [
+    '/vendor-api/venue',
+    '/vendor-api/venue/{venue_id}',
+    '/vendor-api/venue/{venue_id}/venue-space',
+    '/vendor-api/menu',
+    '/vendor-api/menu/{menu_id}',
+    '/vendor-api/food-items',
+    '/vendor-api/menu/{menu_id}/menu-items',
+])
+def test_vendor_views_stay_within_budget(client, vendor, path):
+    with assert_max_queries(budget()):
+        response = client.get(path.format(**vendor))
+    assert response.status_code == 200
+    assert response.get_json()['data']
+
+
+def test_budget_counts_the_whole_request(client, vendor):
+    with pytest.raises(QueryBudgetExceeded) as exceeded:
+        with assert_max_queries(1):
+            client.get(f"/vendor-api/venue/{vendor['venue_id']}/venue-space")
+    assert exceeded.value.count > 1
+    assert len(exceeded.value.statements) == exceeded.value.count
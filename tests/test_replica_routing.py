@@ -0,0 +1,157 @@
+"""
+Replica routing of ``RoutingSession`` and ``ReplicaRouting`` over two sqlite files, each holding a row telling which
+database answered.
+"""
+import time
+
+import flask
+import pytest
+from sqlalchemy import create_engine, select, update, Column, Integer, String
+from sqlalchemy.orm import declarative_base
+
+from utilities.db_setup import database_factory, USE_REPLICA, WROTE
+from utilities.replica_routing import ReplicaRouting, prefer_replica, STICKY_COOKIE
+
+Base = declarative_base()
+
+
+class Source(Base):
+    __tablename__ = 'source'
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+
+
+def database(path, name):
+    url = f'sqlite:///{path}'
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(Source.__table__.insert().values(id=1, name=name))
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def factory(tmp_path):
+    factory = database_factory(database(tmp_path / 'primary.db', 'primary'),
+                               replica_url=database(tmp_path / 'replica.db', 'replica'))
+    yield factory
+    factory.scoped.remove()
+    factory.engine.dispose()
+    factory.replica.factory.engine.dispose()
+
+
+def answered_by(session):
+    return session.execute(select(Source.name).where(Source.id == 1)).scalar()
+
+
+def test_reads_go_to_the_replica_once_asked(factory):
+    session = factory()
+    assert answered_by(session) == 'primary'
+
+    session.info[USE_REPLICA] = True
+    assert answered_by(session) == 'replica'
+    assert not session.info.get(WROTE)
+    session.close()
+
+
+def test_flush_switches_the_session_to_the_primary(factory):
+    session = factory()
+    session.info[USE_REPLICA] = True
+    session.add(Source(id=2, name='written'))
+    session.flush()
+
+    assert session.info[USE_REPLICA] is False
+    assert session.info[WROTE] is True
+    assert session.execute(select(Source.name).where(Source.id == 2)).scalar() == 'written'
+    session.rollback()
+    session.close()
+
+
+def test_dml_switches_the_session_to_the_primary(factory):
+    session = factory()
+    session.info[USE_REPLICA] = True
+    session.execute(update(Source).where(Source.id == 1).values(name='updated'))
+
+    assert session.info[USE_REPLICA] is False
+    assert session.info[WROTE] is True
+    assert answered_by(session) == 'updated'
+    session.rollback()
+    session.close()
+
+
+def test_replica_marked_down_falls_back_to_the_primary(factory):
+    factory.replica.retry_after = 0.2
+    factory.replica.mark_down()
+    session = factory()
+    session.info[USE_REPLICA] = True
+    assert answered_by(session) == 'primary'
+    session.close()
+
+    time.sleep(0.25)
+    session = factory()
+    session.info[USE_REPLICA] = True
+    assert answered_by(session) == 'replica'
+    session.close()
+
+
+@pytest.fixture
+def client(factory):
+    app = flask.Flask(__name__)
+    ReplicaRouting(factory.scoped, sticky_seconds=10).init_app(app)
+
+    @app.route('/source', methods=['GET', 'POST'])
+    def source():
+        return answered_by(factory.scoped())
+
+    @app.route('/touch')
+    def touch():
+        session = factory.scoped()
+        session.execute(update(Source).where(Source.id == 1).values(name='primary'))
+        session.commit()
+        return 'ok'
+
+    @app.teardown_request
+    def remove_session(exception=None):
+        factory.scoped.remove()
+
+    return app.test_client()
+
+
+def test_get_reads_the_replica_without_sticking(client):
+    response = client.get('/source')
+
+    assert response.text == 'replica'
+    assert client.get_cookie(STICKY_COOKIE) is None
+
+
+def test_write_sticks_the_client_to_the_primary(client):
+    assert client.post('/source').text == 'primary'
+    cookie = client.get_cookie(STICKY_COOKIE)
+    assert cookie is not None
+    assert float(cookie.value) > time.time()
+
+    assert client.get('/source').text == 'primary'
+
+
+def test_read_which_wrote_sticks_the_client_to_the_primary(client):
+    client.get('/touch')
+
+    assert client.get_cookie(STICKY_COOKIE) is not None
+    assert client.get('/source').text == 'primary'
+
+
+def test_expired_cookie_reads_the_replica_again(client):
+    client.set_cookie(STICKY_COOKIE, str(int(time.time()) - 1))
+
+    assert client.get('/source').text == 'replica'
+
+
+def test_prefer_replica_leaves_sticky_requests_on_the_primary(factory):
+    app = flask.Flask(__name__)
+    with app.test_request_context():
+        flask.g.stick_to_primary = True
+        session = factory()
+        prefer_replica(session)
+        assert not session.info.get(USE_REPLICA)
+        session.close()
@@ -0,0 +1,144 @@
+"""
+``cron.smtp_pool`` against an in-process aiosmtpd server.
+"""
+import smtplib
+import socket
+import time
+from email.message import EmailMessage
+
+import pytest
+
+pytest.importorskip('aiosmtpd')
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from cron.smtp_pool import SmtpPool, RateLimiter  # noqa: E402
+
+
+class Recorder(object):
+    """Keeps the messages it accepts with the client port they came from, rejects recipients on ``reject``."""
+
+    def __init__(self):
+        self.received = []
+        self.reject = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reject.intersection(envelope.rcpt_tos):
+            return '554 Message rejected'
+        self.received.append((session.peer[1], envelope.rcpt_tos[0]))
+        return '250 OK'
+
+    @property
+    def connections(self):
+        return {port for port, _ in self.received}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server(object):
+    """A ``Recorder`` served on a fixed local port, restartable (an aiosmtpd controller is not)."""
+
+    def __init__(self):
+        self.handler = Recorder()
+        self.hostname = '127.0.0.1'
+        self.port = free_port()
+        self.controller = None
+
+    def start(self):
+        self.controller = Controller(self.handler, hostname=self.hostname, port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        self.controller.stop()
+
+
+@pytest.fixture
+def server():
+    server = Server()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def pool(server):
+    pool = SmtpPool('', '', host=server.hostname, port=server.port, use_tls=False, size=1, rate_limit=0, timeout=5)
+    yield pool
+    pool.close()
+
+
+def message(to):
+    msg = EmailMessage()
+    msg['From'] = 'dobato@example.com'
+    msg['To'] = to
+    msg['Subject'] = 'test'
+    msg.set_content('hello')
+    return msg
+
+
+def test_sends_reuse_one_session(server, pool):
+    for n in range(3):
+        pool.send(message(f'user{n}@example.com'))
+
+    assert [to for _, to in server.handler.received] == [f'user{n}@example.com' for n in range(3)]
+    assert len(server.handler.connections) == 1
+
+
+def test_rejected_message_keeps_the_session(server, pool):
+    server.handler.reject.add('bounce@example.com')
+
+    with pytest.raises(smtplib.SMTPDataError):
+        pool.send(message('bounce@example.com'))
+    pool.send(message('user@example.com'))
+    pool.send(message('other@example.com'))
+
+    assert len(server.handler.connections) == 1
+
+
+def test_broken_session_is_discarded_and_the_send_retried(server, pool, monkeypatch):
+    discarded = []
+    discard = SmtpPool._discard
+    monkeypatch.setattr(SmtpPool, '_discard', staticmethod(lambda smtp: (discarded.append(smtp), discard(smtp))))
+    pool.send(message('first@example.com'))
+    # the pooled session outlives the server it was opened to
+    server.stop()
+    server.start()
+
+    pool.send(message('second@example.com'))
+
+    assert len(discarded) == 1
+    assert [to for _, to in server.handler.received] == ['first@example.com', 'second@example.com']
+    assert len(server.handler.connections) == 2
+
+
+def test_rate_limit_lets_a_burst_through_then_spaces_sends():
+    limiter = RateLimiter(20)
+    started = time.monotonic()
+    for _ in range(20):
+        limiter.wait()
+    burst = time.monotonic() - started
+    for _ in range(10):
+        limiter.wait()
+    spaced = time.monotonic() - started - burst
+
+    assert burst < 0.1
+    assert 0.4 < spaced < 1
+
+
+def test_pool_sends_at_the_rate_limit(server):
+    pool = SmtpPool('', '', host=server.hostname, port=server.port, use_tls=False, size=1, rate_limit=10,
+                    timeout=5)
+    started = time.monotonic()
+    try:
+        for n in range(15):
+            pool.send(message(f'user{n}@example.com'))
+    finally:
+        pool.close()
+
+    # 10 go out at once, the other 5 one every 0.1s
+    assert time.monotonic() - started >= 0.45
+    assert len(server.handler.received) == 15
@@ -0,0 +1,59 @@
+"""
+``refresh_venue_card`` on the test database.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from utilities.schemas.models import User, VendorProfile, VendorIndustry, Venue, VenueSpace, VenueCard
+from utilities.venue_cards import refresh_venue_card
+
+
+@pytest.fixture
+def session(database):
+    engine = create_engine(database)
+    with Session(engine) as session:
+        yield session
+        session.rollback()
+    engine.dispose()
+
+
+@pytest.fixture
+def venue(session):
+    industry = session.query(VendorIndustry).filter_by(industry_name='Venue').one()
+    user = User(fullname='Card Vendor', email='cards@example.com', password='x', user_type_id=3)
+    session.add(user)
+    session.flush()
+    profile = VendorProfile(user_id=user.id, industry_id=industry.id)
+    session.add(profile)
+    session.flush()
+    venue = Venue(venue_name='Card Hall', industry_id=industry.id, vendor_profile_id=profile.id)
+    session.add(venue)
+    session.flush()
+    return venue
+
+
+def test_refresh_creates_then_updates_the_card(session, venue):
+    refresh_venue_card(session, venue.id)
+    card = session.get(VenueCard, venue.id)
+    assert (card.venue_name, card.space_count, card.industry_name) == ('Card Hall', 0, 'Venue')
+
+    venue.venue_name = 'Renamed Hall'
+    session.add_all([VenueSpace(rate=100, seating_capacity=40, venue_id=venue.id),
+                     VenueSpace(rate=300, seating_capacity=60, floating_capacity=20, venue_id=venue.id)])
+    refresh_venue_card(session, venue.id)
+    session.expire_all()
+
+    card = session.get(VenueCard, venue.id)
+    assert (card.venue_name, card.space_count, card.total_capacity) == ('Renamed Hall', 2, 120)
+    assert (card.min_rate, card.max_rate) == (100, 300)
+    assert session.query(VenueCard).filter_by(venue_id=venue.id).count() == 1
+
+
+def test_venue_gone_loses_its_card(session, venue):
+    refresh_venue_card(session, venue.id)
+    session.delete(venue)
+    refresh_venue_card(session, venue.id)
+    session.expire_all()
+
+    assert session.get(VenueCard, venue.id) is None
@@ -0,0 +1,61 @@
+"""Index hot foreign keys
+
+Revision ID: b41c9d2e7f10
+Revises: 7a8e73063c48
+Create Date: 2026-10-18 10:12:40.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41c9d2e7f10'
+down_revision: Union[str, None] = '7a8e73063c48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_album_user_id', 'album', ['user_id']),
+    ('ix_availability_shift_id_date', 'availability', ['shift_id', 'date']),
+    ('ix_availability_space_id_date', 'availability', ['space_id', 'date']),
+    ('ix_availability_vendor_profile_id', 'availability', ['vendor_profile_id']),
+    ('ix_food_items_vendor_profile_id', 'food_items', ['vendor_profile_id']),
+    ('ix_image_album_id', 'image', ['album_id']),
+    ('ix_image_user_id', 'image', ['user_id']),
+    ('ix_menu_vendor_profile_id', 'menu', ['vendor_profile_id']),
+    ('ix_menu_food_items_item_id', 'menu_food_items', ['item_id']),
+    ('ix_menu_food_items_menu_id_item_id', 'menu_food_items', ['menu_id', 'item_id']),
+    ('ix_schedule_space_id', 'schedule', ['space_id']),
+    ('ix_schedule_vendor_profile_id', 'schedule', ['vendor_profile_id']),
+    ('ix_shifts_space_id', 'shifts', ['space_id']),
+    ('ix_shifts_vendor_profile_id', 'shifts', ['vendor_profile_id']),
+    ('ix_spaces_venue_id', 'spaces', ['venue_id']),
+    ('ix_users_phone_number', 'users', ['phone_number']),
+    ('ix_users_user_type_id', 'users', ['user_type_id']),
+    ('ix_vendor_dynamic_form_vendor_id', 'vendor_dynamic_form', ['vendor_id']),
+    ('ix_vendor_subscription_end_date', 'vendor_subscription', ['end_date']),
+    ('ix_venue_bookings_booked_date', 'venue_bookings', ['booked_date']),
+    ('ix_venue_bookings_menu_id', 'venue_bookings', ['menu_id']),
+    ('ix_venue_bookings_space_id_booked_date', 'venue_bookings', ['space_id', 'booked_date']),
+    ('ix_venue_bookings_user_id', 'venue_bookings', ['user_id']),
+    ('ix_venues_industry_id', 'venues', ['industry_id']),
+    ('ix_venues_vendor_profile_id', 'venues', ['vendor_profile_id']),
+]
+
+
+def upgrade() -> None:
+    # built concurrently on postgresql so the tables stay writable, which can't happen inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True,
+                            postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
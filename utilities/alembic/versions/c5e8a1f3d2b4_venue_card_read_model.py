@@ -0,0 +1,60 @@
+"""Venue card read model
+
+Revision ID: c5e8a1f3d2b4
+Revises: b41c9d2e7f10
+Create Date: 2026-10-18 11:02:17.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a1f3d2b4'
+down_revision: Union[str, None] = 'b41c9d2e7f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('venue_card',
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('vendor_profile_id', sa.Integer(), nullable=False),
+    sa.Column('venue_name', sa.String(), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('venue_type', sa.String(), nullable=True),
+    sa.Column('parking_capacity', sa.Integer(), nullable=True),
+    sa.Column('industry_id', sa.Integer(), nullable=False),
+    sa.Column('industry_name', sa.String(), nullable=True),
+    sa.Column('total_capacity', sa.Integer(), nullable=False),
+    sa.Column('space_count', sa.Integer(), nullable=False),
+    sa.Column('min_rate', sa.Numeric(), nullable=True),
+    sa.Column('max_rate', sa.Numeric(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('venue_id')
+    )
+    op.create_index(op.f('ix_venue_card_location'), 'venue_card', ['location'], unique=False)
+    op.create_index(op.f('ix_venue_card_vendor_profile_id'), 'venue_card', ['vendor_profile_id'], unique=False)
+    # backfill, same computation as utilities.venue_cards.card_select
+    op.execute("""
+        INSERT INTO venue_card (venue_id, vendor_profile_id, venue_name, location, venue_type, parking_capacity,
+                                industry_id, industry_name, total_capacity, space_count, min_rate, max_rate,
+                                updated_at)
+        SELECT venues.id, venues.vendor_profile_id, venues.venue_name, venues.location, venues.venue_type,
+               venues.parking_capacity, venues.industry_id, vendor_industry.industry_name,
+               coalesce(sum(coalesce(spaces.seating_capacity, 0) + coalesce(spaces.floating_capacity, 0)), 0),
+               count(spaces.id), min(spaces.rate), max(spaces.rate), CURRENT_TIMESTAMP
+        FROM venues
+        JOIN vendor_industry ON venues.industry_id = vendor_industry.id
+        LEFT OUTER JOIN spaces ON venues.id = spaces.venue_id
+        GROUP BY venues.id, vendor_industry.industry_name
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_venue_card_vendor_profile_id'), table_name='venue_card')
+    op.drop_index(op.f('ix_venue_card_location'), table_name='venue_card')
+    op.drop_table('venue_card')
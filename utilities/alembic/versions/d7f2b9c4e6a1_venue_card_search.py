@@ -0,0 +1,56 @@
+"""Venue card search
+
+Revision ID: d7f2b9c4e6a1
+Revises: c5e8a1f3d2b4
+Create Date: 2026-10-18 12:26:51.204377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f2b9c4e6a1'
+down_revision: Union[str, None] = 'c5e8a1f3d2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# columns the search sorts on, each indexed with venue_id
+SORT_COLUMNS = ['venue_name', 'total_capacity', 'parking_capacity', 'min_rate']
+SEARCH_VECTOR = ("setweight(to_tsvector('simple', coalesce(venue_name, '')), 'A') || "
+                 "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+                 "setweight(to_tsvector('simple', coalesce(venue_type, '')), 'C')")
+
+
+def upgrade() -> None:
+    op.execute("UPDATE venue_card SET venue_name = coalesce(venue_name, ''), "
+               "parking_capacity = coalesce(parking_capacity, 0), min_rate = coalesce(min_rate, 0), "
+               "max_rate = coalesce(max_rate, 0)")
+    # text search needs postgresql, sqlite gets a plain column; batch mode recreates the table on sqlite, which
+    # can't alter columns, and runs plain ALTERs on postgresql
+    if op.get_bind().dialect.name == 'postgresql':
+        search_vector = sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(SEARCH_VECTOR, persisted=True),
+                                  nullable=True)
+    else:
+        search_vector = sa.Column('search_vector', sa.Text(), nullable=True)
+    with op.batch_alter_table('venue_card') as batch_op:
+        for column in ('venue_name', 'parking_capacity', 'min_rate', 'max_rate'):
+            batch_op.alter_column(column, nullable=False)
+        batch_op.add_column(search_vector)
+    op.create_index('ix_venue_card_search_vector', 'venue_card', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+    for column in SORT_COLUMNS:
+        op.create_index(f'ix_venue_card_{column}_venue_id', 'venue_card', [column, 'venue_id'], unique=False)
+
+
+def downgrade() -> None:
+    for column in reversed(SORT_COLUMNS):
+        op.drop_index(f'ix_venue_card_{column}_venue_id', table_name='venue_card')
+    op.drop_index('ix_venue_card_search_vector', table_name='venue_card')
+    with op.batch_alter_table('venue_card') as batch_op:
+        batch_op.drop_column('search_vector')
+        for column in ('venue_name', 'parking_capacity', 'min_rate', 'max_rate'):
+            batch_op.alter_column(column, nullable=True)
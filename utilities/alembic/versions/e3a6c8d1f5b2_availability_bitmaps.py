@@ -0,0 +1,40 @@
+"""Availability bitmaps
+
+Revision ID: e3a6c8d1f5b2
+Revises: d7f2b9c4e6a1
+Create Date: 2026-10-18 13:48:05.671290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a6c8d1f5b2'
+down_revision: Union[str, None] = 'd7f2b9c4e6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # filled by `python -m utilities.availability_bitmaps rebuild` or the nightly availability roll forward
+    op.create_table('availability_bitmap',
+    sa.Column('space_id', sa.Integer(), nullable=False),
+    sa.Column('shift_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('available_days', sa.Integer(), nullable=False),
+    sa.Column('booked_days', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['shift_id'], ['shifts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['space_id'], ['spaces.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('space_id', 'shift_id', 'month')
+    )
+    op.create_index('ix_availability_bitmap_venue_id_month', 'availability_bitmap', ['venue_id', 'month'],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_availability_bitmap_venue_id_month', table_name='availability_bitmap')
+    op.drop_table('availability_bitmap')
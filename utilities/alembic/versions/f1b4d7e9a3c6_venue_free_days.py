@@ -0,0 +1,33 @@
+"""Venue free days
+
+Revision ID: f1b4d7e9a3c6
+Revises: e3a6c8d1f5b2
+Create Date: 2026-10-18 15:10:42.093815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b4d7e9a3c6'
+down_revision: Union[str, None] = 'e3a6c8d1f5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # filled with the availability bitmaps, `python -m utilities.availability_bitmaps rebuild`
+    op.create_table('venue_free_day',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('venue_id', sa.Integer(), nullable=False),
+    sa.Column('free_spaces', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['venue_id'], ['venues.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('day', 'venue_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('venue_free_day')
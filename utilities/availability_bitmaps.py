@@ -0,0 +1,218 @@
+"""
+Availability bitmaps, one per space, shift and month, behind the venue calendar.
+
+A bitmap row has one bit per day of its month for the days the shift is open (``Availability`` rows with status
+``available``) and one for the open days already fully booked, when the space's bookings of that day reach the
+shift's ``booking_capacity``. Bookings aren't tied to a shift, so a booking counts against every shift of its space.
+A year of a venue's calendar is then a few dozen rows read with one index range scan. The bitmaps are expanded into
+``venue_free_day``, the venues with a free shift per day, which the venue listing joins to answer "free on".
+
+Rows are recomputed a whole month at a time, set based, by ``refresh_availability_bitmaps``. In the apps writing
+availability, bookings or shifts, ``bitmap_tracking.init_app(app)`` makes sessions track the ``Availability``,
+``VenueBooking`` and ``Shift`` rows they flush and refresh the months those touch just before committing, in the same
+transaction. Bulk statements, like the nightly availability roll forward, have to call
+``refresh_availability_bitmaps`` themselves. For backfills::
+
+    python -m utilities.availability_bitmaps rebuild
+"""
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, insert, delete, func, case, cast, extract, literal, literal_column, and_, event, \
+    inspect, Integer, Date
+from sqlalchemy.orm import Session
+
+from utilities.schemas.models import VenueBooking, VenueSpace
+from utilities.schemas.schedule_availability_models import Availability, AvailabilityBitmap, Shift, VenueFreeDay
+
+AVAILABLE = 'available'
+CANCELLED = 'cancelled'
+# months refreshed when a shift changes, from the current one on
+SHIFT_CHANGE_MONTHS = 13
+# session.info key of the (space_id, month) pairs to refresh before the commit, a None space_id means every space
+PENDING = 'availability_bitmaps'
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (month_start(day) + timedelta(days=32)).replace(day=1)
+
+
+def add_months(day, months):
+    for _ in range(months):
+        day = next_month(day)
+    return day
+
+
+def days_of(bitmap, month):
+    """The dates whose bits are set in ``bitmap``."""
+    return [month + timedelta(days=bit) for bit in range(31) if bitmap >> bit & 1]
+
+
+def bitmap_select(start, stop, space_ids=None):
+    """SELECT computing the bitmaps of the days from ``start`` up to ``stop``, both first days of a month."""
+    day_bit = literal(1).bitwise_lshift(cast(extract('day', Availability.date), Integer) - 1)
+    booked_day = cast(VenueBooking.booked_date, Date)
+    bookings = (select(VenueBooking.space_id, booked_day.label('day'), func.count().label('booked'))
+                .where(VenueBooking.booked_date >= start, VenueBooking.booked_date < stop,
+                       func.coalesce(VenueBooking.status, '') != CANCELLED)
+                .group_by(VenueBooking.space_id, booked_day))
+    if space_ids is not None:
+        bookings = bookings.where(VenueBooking.space_id.in_(space_ids))
+    bookings = bookings.subquery()
+
+    month = cast(func.date_trunc(literal_column("'month'"), Availability.date), Date)
+    is_open = Availability.status == AVAILABLE
+    is_full = and_(is_open, func.coalesce(bookings.c.booked, 0) >= func.coalesce(Shift.booking_capacity, 1))
+    statement = (select(Shift.space_id, Availability.shift_id, month, VenueSpace.venue_id,
+                        func.bit_or(case((is_open, day_bit), else_=0)),
+                        func.bit_or(case((is_full, day_bit), else_=0)))
+                 .join(Shift, Shift.id == Availability.shift_id)
+                 .join(VenueSpace, VenueSpace.id == Shift.space_id)
+                 .outerjoin(bookings, and_(bookings.c.space_id == Shift.space_id, bookings.c.day == Availability.date))
+                 .where(Availability.date >= start, Availability.date < stop)
+                 .group_by(Shift.space_id, Availability.shift_id, month, VenueSpace.venue_id))
+    if space_ids is not None:
+        statement = statement.where(Shift.space_id.in_(space_ids))
+    return statement
+
+
+def free_day_select(start, stop, venue_ids=None):
+    """SELECT expanding the bitmaps of the months from ``start`` up to ``stop`` into (day, venue_id, free spaces)."""
+    days = select(cast(func.generate_series(start, stop - timedelta(days=1), timedelta(days=1)), Date)
+                  .label('day')).subquery()
+    day_bit = literal(1).bitwise_lshift(cast(extract('day', days.c.day), Integer) - 1)
+    free_days = AvailabilityBitmap.available_days.bitwise_and(AvailabilityBitmap.booked_days.bitwise_not())
+    free_spaces = func.count(func.distinct(AvailabilityBitmap.space_id))
+    statement = (select(days.c.day, AvailabilityBitmap.venue_id, free_spaces)
+                 .join(AvailabilityBitmap,
+                       AvailabilityBitmap.month == cast(func.date_trunc(literal_column("'month'"), days.c.day), Date))
+                 .where(AvailabilityBitmap.month >= start, AvailabilityBitmap.month < stop,
+                        free_days.bitwise_and(day_bit) != 0)
+                 .group_by(days.c.day, AvailabilityBitmap.venue_id))
+    if venue_ids is not None:
+        statement = statement.where(AvailabilityBitmap.venue_id.in_(venue_ids))
+    return statement
+
+
+def refresh_availability_bitmaps(session, start, end, space_ids=None):
+    """
+    Recompute the bitmaps of the months from ``start``'s to ``end``'s, both included, and the free days of their
+    venues inside the session's transaction. ``space_ids`` limits the refresh to those spaces.
+    """
+    start, stop = month_start(start), next_month(end)
+    stale = delete(AvailabilityBitmap).where(AvailabilityBitmap.month >= start, AvailabilityBitmap.month < stop)
+    stale_days = delete(VenueFreeDay).where(VenueFreeDay.day >= start, VenueFreeDay.day < stop)
+    venue_ids = None
+    if space_ids is not None:
+        space_ids = list(space_ids)
+        venue_ids = select(VenueSpace.venue_id).where(VenueSpace.id.in_(space_ids)).scalar_subquery()
+        stale = stale.where(AvailabilityBitmap.space_id.in_(space_ids))
+        stale_days = stale_days.where(VenueFreeDay.venue_id.in_(venue_ids))
+    session.execute(stale)
+    session.execute(insert(AvailabilityBitmap).from_select(
+        ('space_id', 'shift_id', 'month', 'venue_id', 'available_days', 'booked_days'),
+        bitmap_select(start, stop, space_ids)))
+    session.execute(stale_days)
+    session.execute(insert(VenueFreeDay).from_select(('day', 'venue_id', 'free_spaces'),
+                                                     free_day_select(start, stop, venue_ids)))
+
+
+def calendar_select(venue_id, start, end):
+    """SELECT of the bitmap rows of a venue's shifts for the months from ``start``'s up to ``end``'s, excluded."""
+    return (select(AvailabilityBitmap.space_id, AvailabilityBitmap.shift_id, Shift.shift_name, AvailabilityBitmap.month,
+                   AvailabilityBitmap.available_days, AvailabilityBitmap.booked_days)
+            .join(Shift, Shift.id == AvailabilityBitmap.shift_id)
+            .where(AvailabilityBitmap.venue_id == venue_id, AvailabilityBitmap.month >= month_start(start),
+                   AvailabilityBitmap.month < month_start(end))
+            .order_by(AvailabilityBitmap.month, AvailabilityBitmap.space_id, AvailabilityBitmap.shift_id))
+
+
+def venue_calendar(session, venue_id, start, end):
+    """Bitmap rows of a venue's shifts for the months from ``start``'s up to ``end``'s, excluded."""
+    return session.execute(calendar_select(venue_id, start, end)).all()
+
+
+def _history(obj, attr):
+    """Current and, for changed rows, previous values of an attribute, None excluded."""
+    history = inspect(obj).attrs[attr].history
+    return {value for value in (*history.unchanged, *history.added, *history.deleted) if value is not None}
+
+
+def _touched(obj):
+    if isinstance(obj, Availability):
+        spaces = _history(obj, 'space_id') or {None}
+        return {(space_id, month_start(day)) for space_id in spaces for day in _history(obj, 'date')}
+    if isinstance(obj, VenueBooking):
+        return {(space_id, month_start(booked.date() if isinstance(booked, datetime) else booked))
+                for space_id in _history(obj, 'space_id') for booked in _history(obj, 'booked_date')}
+    if isinstance(obj, Shift):
+        first = month_start(date.today())
+        months = [add_months(first, offset) for offset in range(SHIFT_CHANGE_MONTHS)]
+        return {(space_id, month) for space_id in _history(obj, 'space_id') for month in months}
+    return set()
+
+
+def _collect(session, flush_context):
+    touched = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        touched.update(_touched(obj))
+    if touched:
+        session.info.setdefault(PENDING, set()).update(touched)
+
+
+def _refresh_pending(session):
+    # the commit flushes after this hook, flush now so the refresh sees every change
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    pending = session.info.pop(PENDING, None)
+    if not pending:
+        return
+    spaces_by_month = dict()
+    for space_id, month in pending:
+        spaces_by_month.setdefault(month, set()).add(space_id)
+    for month, space_ids in spaces_by_month.items():
+        refresh_availability_bitmaps(session, month, month, None if None in space_ids else space_ids)
+
+
+def _forget_pending(session):
+    session.info.pop(PENDING, None)
+
+
+class BitmapTracking(object):
+    LISTENERS = (('after_flush', _collect), ('before_commit', _refresh_pending), ('after_rollback', _forget_pending))
+
+    def init_app(self, app):
+        self.register(Session)
+
+    def register(self, target):
+        """Refresh the bitmaps on the commits of ``target``, a session class or sessionmaker."""
+        for name, listener in self.LISTENERS:
+            if not event.contains(target, name, listener):
+                event.listen(target, name, listener)
+
+
+bitmap_tracking = BitmapTracking()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Availability bitmaps of the venue calendar')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    rebuild_parser = subcommands.add_parser('rebuild', help='recompute the bitmaps of a range of months')
+    rebuild_parser.add_argument('--months', type=int, default=SHIFT_CHANGE_MONTHS,
+                                help='months to recompute, from the current one on')
+    args = parser.parse_args()
+
+    from utilities.db_getter import get_session
+
+    session = get_session()
+    try:
+        first = month_start(date.today())
+        refresh_availability_bitmaps(session, first, add_months(first, args.months - 1))
+        session.commit()
+        print(f'Rebuilt the availability bitmaps of {args.months} months')
+    finally:
+        session.remove()
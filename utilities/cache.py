@@ -0,0 +1,265 @@
+"""
+Two tier cache shared by the apps: an in-process LRU in front of an optional Redis.
+
+``CACHE_REDIS_URL`` points at the Redis of docker-compose (``redis://redis:6379/0``); without it the cache is the
+in-process tier alone. ``memory://`` swaps Redis for ``MemoryRedis``, a pure python stand-in, so the Redis code path
+runs without a server.
+
+``cache.get_or_load(key, loader, ttl)`` is the usual entry point. Concurrent misses of a key run ``loader`` once:
+within a process the other threads wait for the first one, across processes a short lived Redis lock makes the
+others wait for the value to show up in Redis. Expiries are shortened by a random part of up to ``CACHE_JITTER`` of
+the ttl, so entries loaded together don't expire together. With Redis, entries are kept in process for at most
+``CACHE_LOCAL_TTL`` seconds, which bounds how long a process can miss a change made by another one.
+
+Redis errors never fail a lookup: the value is loaded as if it was missing and Redis is left alone for
+``CACHE_REDIS_RETRY_AFTER`` seconds.
+"""
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import redis
+
+# unset for an in-process cache only, memory:// for the pure python stand-in
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+CACHE_PREFIX = os.environ.get('CACHE_PREFIX', 'dobato:')
+# entries kept in process, the least recently used go first
+CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get('CACHE_LOCAL_MAX_ENTRIES', 4096))
+# upper bound of an entry's life in process when Redis holds the shared copy
+CACHE_LOCAL_TTL = float(os.environ.get('CACHE_LOCAL_TTL', 5))
+# largest share of a ttl taken off at random
+CACHE_JITTER = float(os.environ.get('CACHE_JITTER', 0.1))
+# seconds a loader may hold a key's lock before others load it as well
+CACHE_LOAD_TIMEOUT = float(os.environ.get('CACHE_LOAD_TIMEOUT', 5))
+CACHE_REDIS_RETRY_AFTER = float(os.environ.get('CACHE_REDIS_RETRY_AFTER', 10))
+
+MISSING = object()
+
+
+class LocalCache(object):
+    """Size bounded LRU with per entry expiry, safe to share between threads."""
+
+    def __init__(self, max_entries=CACHE_LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class MemoryRedis(object):
+    """The few Redis commands the cache uses, kept in a dict; a stand-in for tests and local runs."""
+
+    def __init__(self):
+        self._values = dict()
+        self._lock = threading.Lock()
+
+    def _alive(self, key):
+        entry = self._values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._values[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._alive(key)
+            return entry[0] if entry is not None else None
+
+    def set(self, key, value, px=None, nx=False):
+        with self._lock:
+            if nx and self._alive(key) is not None:
+                return None
+            self._values[key] = (value, time.monotonic() + px / 1000 if px else None)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._values.pop(key, None) is not None for key in keys)
+
+    def flushdb(self):
+        with self._lock:
+            self._values.clear()
+
+
+class RedisTier(object):
+    """Pickled values in Redis under ``prefix``, errors are logged and read as misses."""
+
+    def __init__(self, client, prefix=CACHE_PREFIX, retry_after=CACHE_REDIS_RETRY_AFTER):
+        self.client = client
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self.logger = logging.getLogger('DOBATO_LOGGER')
+        self._down_until = 0.0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        if url.startswith('memory://'):
+            return cls(MemoryRedis(), **kwargs)
+        return cls(redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1), **kwargs)
+
+    def _call(self, command, *args, **kwargs):
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            return getattr(self.client, command)(*args, **kwargs)
+        except redis.RedisError as e:
+            self.logger.error(f"Redis {command} failed, leaving Redis alone for {self.retry_after:g}s: {e}")
+            self._down_until = time.monotonic() + self.retry_after
+            return None
+
+    def get(self, key):
+        data = self._call('get', self.prefix + key)
+        return MISSING if data is None else pickle.loads(data)
+
+    def set(self, key, value, ttl):
+        self._call('set', self.prefix + key, pickle.dumps(value), px=max(int(ttl * 1000), 1))
+
+    def delete(self, *keys):
+        if keys:
+            self._call('delete', *[self.prefix + key for key in keys])
+
+    def lock(self, key, timeout):
+        """Take ``key``'s load lock, True when taken or when Redis can't tell."""
+        taken = self._call('set', f'{self.prefix}lock:{key}', b'1', px=int(timeout * 1000), nx=True)
+        return taken is not None or time.monotonic() < self._down_until
+
+    def unlock(self, key):
+        self._call('delete', f'{self.prefix}lock:{key}')
+
+    def publish(self, channel, message):
+        self._call('publish', channel, message)
+
+
+class _Flight(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = MISSING
+        self.error = None
+
+
+class Cache(object):
+    def __init__(self, remote=None, local=None, local_ttl=CACHE_LOCAL_TTL, jitter=CACHE_JITTER,
+                 load_timeout=CACHE_LOAD_TIMEOUT):
+        self.remote = remote
+        self.local = local if local is not None else LocalCache()
+        self.local_ttl = local_ttl
+        self.jitter = jitter
+        self.load_timeout = load_timeout
+        self._flights = dict()
+        self._flights_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(remote=RedisTier.from_url(CACHE_REDIS_URL) if CACHE_REDIS_URL else None)
+
+    def _jittered(self, ttl):
+        return ttl * (1 - random.random() * self.jitter)
+
+    def _set_local(self, key, value, ttl):
+        self.local.set(key, value, min(ttl, self.local_ttl) if self.remote is not None else ttl)
+
+    def get(self, key, default=None):
+        value = self.local.get(key)
+        if value is MISSING and self.remote is not None:
+            value = self.remote.get(key)
+            if value is not MISSING:
+                self._set_local(key, value, self.local_ttl)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl):
+        ttl = self._jittered(ttl)
+        if self.remote is not None:
+            self.remote.set(key, value, ttl)
+        self._set_local(key, value, ttl)
+
+    def delete(self, *keys):
+        self.local.delete(*keys)
+        if self.remote is not None:
+            self.remote.delete(*keys)
+
+    def get_or_load(self, key, loader, ttl):
+        """The cached value of ``key``, calling ``loader()`` and caching its result for ``ttl`` seconds on a miss."""
+        value = self.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leading = flight is None
+            if leading:
+                flight = self._flights[key] = _Flight()
+        if not leading:
+            if flight.done.wait(self.load_timeout) and flight.error is None:
+                return flight.value
+            if flight.error is not None:
+                raise flight.error
+            return loader()
+
+        try:
+            flight.value = self._load(key, loader, ttl)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _load(self, key, loader, ttl):
+        if self.remote is None:
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+        locked = self.remote.lock(key, self.load_timeout)
+        if not locked:
+            # another process is loading it, wait for its value before loading it here as well
+            deadline = time.monotonic() + self.load_timeout
+            while time.monotonic() < deadline:
+                time.sleep(0.02)
+                value = self.remote.get(key)
+                if value is not MISSING:
+                    self._set_local(key, value, self.local_ttl)
+                    return value
+        try:
+            value = loader()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            # the lock of a process which is slow to load stays its own
+            if locked:
+                self.remote.unlock(key)
+
+
+cache = Cache.from_env()
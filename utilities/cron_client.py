@@ -0,0 +1,154 @@
+import asyncio
+import atexit
+import logging
+import os
+import queue
+import threading
+
+from utilities.cron_protocol import encode_frame, read_frame, FrameTooLarge, STATUS_OK
+
+CRON_HOST = os.environ.get('CRON_HOST', 'localhost')
+CRON_PORT = int(os.environ.get('CRON_PORT', 8888))
+# persistent connections kept open to the cron engine
+CRON_POOL_SIZE = int(os.environ.get('CRON_POOL_SIZE', 2))
+# messages waiting to be sent, enqueue() refuses new messages beyond this
+CRON_BUFFER_SIZE = int(os.environ.get('CRON_BUFFER_SIZE', 1000))
+# messages written back to back on one connection before draining
+CRON_BATCH_SIZE = int(os.environ.get('CRON_BATCH_SIZE', 100))
+CRON_MAX_RETRIES = 3
+
+
+class CronClient(object):
+    """
+    Fire-and-forget client for the cron engine.
+
+    Web requests call ``enqueue()`` which only puts the message on a bounded, thread safe buffer. A background
+    thread runs its own event loop with ``pool_size`` sender tasks, each owning a persistent connection to the
+    engine; a sender drains whatever is buffered and pipelines the messages on its connection, reconnecting when
+    the engine has closed it. Frames the engine has not acknowledged are sent again.
+    """
+
+    def __init__(self, host=CRON_HOST, port=CRON_PORT, pool_size=CRON_POOL_SIZE, buffer_size=CRON_BUFFER_SIZE,
+                 batch_size=CRON_BATCH_SIZE):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.logger = logging.getLogger('DOBATO_LOGGER')
+        self.messages = queue.Queue(maxsize=buffer_size)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._wakeup = None
+        self._stopping = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            started = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(started,), name='cron-client', daemon=True)
+            self._thread.start()
+            started.wait()
+
+    def _run(self, started):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        started.set()
+        try:
+            self._loop.run_until_complete(self._serve())
+        finally:
+            self._loop.close()
+
+    async def _serve(self):
+        senders = [asyncio.create_task(self._sender()) for _ in range(self.pool_size)]
+        await self._stopping.wait()
+        # senders exit once the buffer has been flushed
+        self._wakeup.set()
+        await asyncio.gather(*senders, return_exceptions=True)
+
+    def enqueue(self, message):
+        """Queue a message for the cron engine, returns False when it is too large or the local buffer is full."""
+        try:
+            frame = encode_frame(message)
+        except FrameTooLarge as e:
+            self.logger.error(f"Not sending event {message.get('event')} to cron engine: {e}")
+            return False
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        try:
+            self.messages.put_nowait((message.get('event'), frame))
+        except queue.Full:
+            self.logger.warning(f"Cron client buffer full, dropping event {message.get('event')}")
+            return False
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    def _take_batch(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.messages.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    async def _sender(self):
+        reader = writer = None
+        batch = []
+        while True:
+            if not batch:
+                batch = self._take_batch()
+            if not batch:
+                if self._stopping.is_set():
+                    break
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            for attempt in range(CRON_MAX_RETRIES):
+                acked = 0
+                try:
+                    if writer is None or writer.is_closing() or reader.at_eof():
+                        if writer is not None:
+                            writer.close()
+                        reader, writer = await asyncio.open_connection(self.host, self.port)
+                    # pipeline the whole batch, then collect one ack per frame
+                    writer.write(b''.join(frame for _, frame in batch))
+                    await writer.drain()
+                    for event, _ in batch:
+                        response = await read_frame(reader)
+                        if response is None:
+                            raise ConnectionResetError('cron engine closed the connection')
+                        acked += 1
+                        if response.get('status') != STATUS_OK:
+                            self.logger.error(f"Cron engine rejected event {event}: {response.get('error')}")
+                    batch = []
+                    break
+                except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                    self.logger.warning(f"Failed to send {len(batch) - acked} messages to cron engine: {e}")
+                    # only the frames which were not acknowledged are sent again
+                    batch = batch[acked:]
+                    if writer is not None:
+                        writer.close()
+                    reader = writer = None
+                    await asyncio.sleep(0.1 * (attempt + 1))
+            else:
+                self.logger.error(f"Dropping {len(batch)} messages, cron engine at "
+                                  f"{self.host}:{self.port} is unreachable")
+                batch = []
+        if writer is not None:
+            writer.close()
+
+    def stop(self, timeout=5):
+        """Flush buffered messages and stop the background loop."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join(timeout)
+
+
+cron_client = CronClient()
+atexit.register(cron_client.stop)
@@ -0,0 +1,61 @@
+"""
+Wire format spoken between the web apps and the cron engine.
+
+Every message is a frame: a 4 byte big-endian length followed by that many bytes of UTF-8 JSON. A connection carries
+any number of frames in both directions; the engine answers each received frame with one ack frame, in order::
+
+    {"status": "ok"}
+    {"status": "error", "error": "..."}
+
+Frames larger than ``MAX_FRAME_SIZE`` are rejected with an error ack and the connection is closed, since the rest
+of the stream can no longer be trusted.
+"""
+import asyncio
+import json
+import os
+import struct
+
+MAX_FRAME_SIZE = int(os.environ.get('CRON_MAX_FRAME_SIZE', 1024 * 1024))
+HEADER = struct.Struct('!I')
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+
+
+class FrameTooLarge(Exception):
+    def __init__(self, size, max_size=MAX_FRAME_SIZE):
+        self.size = size
+        self.max_size = max_size
+        super().__init__(f'Frame of {size} bytes exceeds the {max_size} bytes limit')
+
+
+class MessageRejected(Exception):
+    """The peer answered a frame with an error ack."""
+
+
+def encode_frame(message, max_size=MAX_FRAME_SIZE):
+    body = json.dumps(message).encode()
+    if len(body) > max_size:
+        raise FrameTooLarge(len(body), max_size)
+    return HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader, max_size=MAX_FRAME_SIZE):
+    """Read one frame and return the decoded message, or None once the peer has closed the connection."""
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            return None
+        raise
+    (size,) = HEADER.unpack(header)
+    if size > max_size:
+        raise FrameTooLarge(size, max_size)
+    body = await reader.readexactly(size)
+    return json.loads(body)
+
+
+def ack(error=None):
+    if error is None:
+        return {'status': STATUS_OK}
+    return {'status': STATUS_ERROR, 'error': str(error)}
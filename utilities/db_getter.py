@@ -1,10 +1,9 @@
-from sqlalchemy.orm import sessionmaker, scoped_session
-
-from customer_app.config import DB_URL
+from customer_app.config import DB_URL, DB_REPLICA_URL
 from utilities.db_setup import database_factory
 
-Session = database_factory(DB_URL)
-scoped = scoped_session(Session)
+# one factory, pool and session registry per database, whichever module asks for it
+Session = database_factory(DB_URL, replica_url=DB_REPLICA_URL)
+scoped = Session.scoped
 
 def get_session():
     """ Get a scoped session # simply gets the scope session and returns it to the
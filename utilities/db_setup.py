@@ -1,8 +1,17 @@
+import argparse
+import hashlib
 import os
+import threading
+import time
+from datetime import datetime
 
 from alembic.util import CommandError
-from sqlalchemy import create_engine, MetaData
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, inspect, MetaData, Table, Column, Integer, String, DateTime, select, \
+    insert, delete, text
+from sqlalchemy.orm import sessionmaker, scoped_session, Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError, SQLAlchemyError
+from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.schema import CreateTable, CreateIndex
 from alembic import command
 from alembic.config import Config
 
@@ -11,54 +20,354 @@ from utilities.schemas.models import Base
 
 # importing path of alembic.ini file may neeed changes
 ALEMBIC_INI_PATH = os.path.join(os.path.dirname(__file__), "alembic.ini")
+ALEMBIC_SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "alembic")
+# revision matching the tables the apps created with create_all when they were imported, before migrate existed
+BASELINE_REVISION = '7a8e73063c48'
 
+# fingerprint of the models the database schema was last brought up to date with, outside the models' metadata so
+# alembic autogenerate leaves it alone
+SCHEMA_STATE_TABLE = 'schema_state'
+schema_state = Table(
+    SCHEMA_STATE_TABLE, MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('fingerprint', String(64), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
 
-def database_factory(DB_URL):
-    # Create the engine
-    engine = create_engine(DB_URL)
 
-    # Reflect the changes in models to the database metadata
-    metadata = MetaData()
-    metadata.reflect(bind=engine)
+def pool_options():
+    """
+    Engine pool settings, read from the environment when the engine is created so each app's .env applies.
 
-    # Bind the metadata to the engine
-    Base.metadata.bind = engine
+    DB_POOL_SIZE            connections kept open
+    DB_MAX_OVERFLOW         extra connections opened under load, closed again when returned
+    DB_POOL_TIMEOUT         seconds to wait for a free connection before giving up
+    DB_POOL_PRE_PING        1 to test connections on checkout, dropping the ones the server closed
+    DB_POOL_RECYCLE         seconds after which a connection is replaced, -1 to keep them forever
+    DB_STATEMENT_TIMEOUT_MS server side limit for one statement (postgresql), 0 for none
+    """
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'statement_timeout': int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0)),
+    }
 
-    # Create all tables that don't exist in the database
-    for base in all_bases:
-        Base.metadata.create_all(engine, checkfirst=True)
 
-    # Create a session maker
-    Session = sessionmaker(autoflush=False, bind=engine)
-    return Session
+class PoolStats(object):
+    def __init__(self):
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
 
 
-# def run_migrations():
-#     """ Run Alembic migrations """
-#     # Path to the alembic.ini file
-#
-#     # Run migration commands
-#     config = Config(ALEMBIC_INI_PATH)
-#     command.revision(config, autogenerate=True, message="Automatic migration")
-#     command.upgrade(config, "head")
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool counting the checkouts which had to wait for a connection to be returned, and for how long."""
 
-def run_migrations():
-    """ Run Alembic migrations """
-    # Run migration commands
+    stats = None
+
+    def _do_get(self):
+        # same test QueuePool uses to decide it has to block
+        if self._max_overflow > -1 and self._overflow >= self._max_overflow and self._pool.empty():
+            started = time.perf_counter()
+            self.stats.waits += 1
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                self.stats.timeouts += 1
+                raise
+            finally:
+                self.stats.wait_time += time.perf_counter() - started
+        return super()._do_get()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+# session.info keys used by the replica routing
+USE_REPLICA = 'use_replica'
+WROTE = 'wrote'
+
+
+class Replica(object):
+    """
+    Read replica of a database, with a health state.
+
+    The replica is checked at most every ``check_interval`` seconds when sessions ask for it, and any disconnect
+    seen on its engine marks it down; while it is down, for ``retry_after`` seconds, reads go to the primary.
+    """
+
+    def __init__(self, factory, check_interval=None, retry_after=None):
+        self.factory = factory
+        self.check_interval = check_interval if check_interval is not None else \
+            float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 10))
+        self.retry_after = retry_after if retry_after is not None else \
+            float(os.environ.get('DB_REPLICA_RETRY_AFTER', 30))
+        self._checked_at = None
+        self._down_until = 0.0
+        self._check_lock = threading.Lock()
+        self._listening = False
+
+    @property
+    def engine(self):
+        engine = self.factory.engine
+        if not self._listening:
+            self._listening = True
+            event.listen(engine, 'handle_error', self._on_error)
+        return engine
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            self.mark_down()
+
+    def mark_down(self):
+        self._down_until = time.monotonic() + self.retry_after
+
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except SQLAlchemyError:
+            self.mark_down()
+        self._checked_at = time.monotonic()
+
+    def available(self):
+        now = time.monotonic()
+        if now < self._down_until:
+            return False
+        if self._checked_at is None or now - self._checked_at > self.check_interval:
+            # one thread checks, the others go on with the last known state
+            if self._check_lock.acquire(blocking=False):
+                try:
+                    self.check()
+                finally:
+                    self._check_lock.release()
+        return time.monotonic() >= self._down_until
+
+
+class RoutingSession(Session):
+    """
+    Session sending reads to the replica once ``session.info[USE_REPLICA]`` is set.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary and switch the session back to it, so a
+    session reads its own writes. Without a healthy replica everything goes to the primary.
+    """
+
+    def __init__(self, *args, factory=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.factory = factory
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replica = self.factory.replica if self.factory is not None else None
+        if replica is not None and self.info.get(USE_REPLICA):
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info[USE_REPLICA] = False
+                self.info[WROTE] = True
+            elif replica.available():
+                return replica.engine
+        elif self._flushing or getattr(clause, 'is_dml', False):
+            self.info[WROTE] = True
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+class SessionFactory(object):
+    """
+    Session factory which only creates its engine the first time a session is asked for.
+
+    Importing a module holding one costs nothing and never touches the database; the schema is not inspected on this
+    path at all, see ``migrate`` for that.
+    """
+
+    def __init__(self, db_url, **session_options):
+        self.db_url = db_url
+        self.session_options = session_options
+        self.pool_stats = PoolStats()
+        self.replica = None
+        self._engine = None
+        self._sessionmaker = None
+        self._scoped = None
+        self._lock = threading.Lock()
+
+    def _create_engine(self):
+        options = pool_options()
+        statement_timeout = options.pop('statement_timeout')
+        connect_args = dict()
+        if statement_timeout and self.db_url.startswith('postgresql'):
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+        engine = create_engine(self.db_url, poolclass=InstrumentedQueuePool, connect_args=connect_args, **options)
+        engine.pool.stats = self.pool_stats
+        return engine
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = self._create_engine()
+                    self._sessionmaker = sessionmaker(bind=engine, class_=RoutingSession, factory=self,
+                                                      **self.session_options)
+                    self._engine = engine
+        return self._engine
+
+    @property
+    def scoped(self):
+        """The thread local session registry over this factory, shared by every module of the app."""
+        if self._scoped is None:
+            with self._lock:
+                if self._scoped is None:
+                    self._scoped = scoped_session(self)
+        return self._scoped
+
+    def __call__(self, **kwargs):
+        if self._sessionmaker is None:
+            self.engine
+        return self._sessionmaker(**kwargs)
+
+    def stats(self):
+        """Live figures of the connection pool, None until the engine exists."""
+        if self._engine is None:
+            return None
+        pool = self._engine.pool
+        return {
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'waits': self.pool_stats.waits,
+            'wait_time': self.pool_stats.wait_time,
+            'timeouts': self.pool_stats.timeouts,
+        }
+
+
+_factories = dict()
+_factories_lock = threading.Lock()
+
+
+def database_factory(DB_URL, replica_url=None):
+    """
+    The session factory of ``DB_URL``. Every module asking for the same database gets the same factory, so a
+    process opens a single pool per database. The engine is created lazily, on the first session.
+
+    ``replica_url`` attaches a read replica the factory's sessions can be routed to, see ``RoutingSession``.
+    """
+    with _factories_lock:
+        factory = _factories.get(DB_URL)
+        if factory is None:
+            factory = _factories[DB_URL] = SessionFactory(DB_URL, autoflush=False)
+    if replica_url and factory.replica is None and replica_url != DB_URL:
+        factory.replica = Replica(database_factory(replica_url))
+    return factory
+
+
+def pool_stats():
+    """Pool figures of every engine created in this process, keyed by host/database."""
+    with _factories_lock:
+        factories = list(_factories.values())
+    stats = dict()
+    for factory in factories:
+        figures = factory.stats()
+        if figures is not None:
+            url = factory.engine.url
+            stats[f'{url.host or ""}/{url.database or ""}'] = figures
+    return stats
+
+
+def schema_fingerprint(metadata, dialect):
+    """Hash of the DDL the models compile to, changes whenever a table, column, constraint or index does."""
+    digest = hashlib.sha256()
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        digest.update(str(CreateTable(table).compile(dialect=dialect)).encode())
+        for index in sorted(table.indexes, key=lambda i: i.name or ''):
+            digest.update(str(CreateIndex(index).compile(dialect=dialect)).encode())
+    return digest.hexdigest()
+
+
+def alembic_config(db_url):
     config = Config(ALEMBIC_INI_PATH)
+    config.set_main_option('script_location', ALEMBIC_SCRIPT_PATH)
+    config.set_main_option('sqlalchemy.url', db_url.replace('%', '%%'))
+    return config
+
+
+def stored_fingerprint(connection):
+    if not connection.dialect.has_table(connection, SCHEMA_STATE_TABLE):
+        return None
+    return connection.execute(select(schema_state.c.fingerprint)).scalar()
+
+
+def unversioned(connection):
+    """True for a database holding the models' tables without an alembic version, created by create_all."""
+    tables = set(inspect(connection).get_table_names())
+    return 'alembic_version' not in tables and bool(tables.intersection(Base.metadata.tables))
+
+
+def migrate(db_url, force=False):
+    """
+    Bring the database schema up to date with the models.
+
+    Applies the alembic revisions and creates the tables no revision covers yet, then stores the models'
+    fingerprint. When the stored fingerprint already matches nothing is done, unless ``force`` is set. A database
+    the apps created with create_all has no alembic version yet, it is stamped with ``BASELINE_REVISION`` first so
+    the revisions creating its tables are not replayed. Returns True when the schema was updated.
+    """
+    engine = create_engine(db_url, poolclass=NullPool)
     try:
-        command.revision(config, autogenerate=True, message="Automatic migration")
+        fingerprint = schema_fingerprint(Base.metadata, engine.dialect)
+        with engine.connect() as connection:
+            if not force and stored_fingerprint(connection) == fingerprint:
+                print("Schema is up to date")
+                return False
+            baseline = unversioned(connection)
+
+        config = alembic_config(db_url)
+        if baseline:
+            print(f"Tables exist without an alembic version, stamping revision {BASELINE_REVISION}")
+            command.stamp(config, BASELINE_REVISION)
         command.upgrade(config, "head")
+        for base in all_bases:
+            base.metadata.create_all(engine, checkfirst=True)
+
+        with engine.begin() as connection:
+            schema_state.create(connection, checkfirst=True)
+            connection.execute(delete(schema_state))
+            connection.execute(insert(schema_state).values(id=1, fingerprint=fingerprint,
+                                                           applied_at=datetime.utcnow()))
+        print(f"Schema updated, fingerprint {fingerprint[:12]}")
+        return True
+    finally:
+        engine.dispose()
+
+
+def make_revision(db_url, message):
+    """Autogenerate a revision from the difference between the models and the database, for review."""
+    try:
+        command.revision(alembic_config(db_url), autogenerate=True, message=message)
     except CommandError as e:
-        print(f"Error occurred during migration: {e}")
-        try:
-            # Generate a new migration script reflecting the deletion
-            command.revision(config, autogenerate=True, message="Reflect deletion of record")
-            # Apply the new migration script
-            command.upgrade(config, "head")
-        except CommandError as e:
-            print(f"Error occurred during migration: {e}")
+        print(f"Error occurred while generating revision: {e}")
+
+
+def run_migrations():
+    """ Run Alembic migrations """
+    from customer_app.config import DB_URL
+    migrate(DB_URL)
 
 
 if __name__ == "__main__":
-    run_migrations()
+    parser = argparse.ArgumentParser(description="Database schema management")
+    subcommands = parser.add_subparsers(dest="command")
+    migrate_parser = subcommands.add_parser("migrate", help="apply revisions and create missing tables")
+    migrate_parser.add_argument("--force", action="store_true", help="run even when the fingerprint matches")
+    revision_parser = subcommands.add_parser("revision", help="autogenerate a new revision")
+    revision_parser.add_argument("-m", "--message", required=True)
+    args = parser.parse_args()
+
+    from customer_app.config import DB_URL
+
+    if args.command == "revision":
+        make_revision(DB_URL, args.message)
+    else:
+        migrate(DB_URL, force=getattr(args, "force", False))
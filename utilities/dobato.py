@@ -1,20 +1,40 @@
-import asyncio
+import base64
+import binascii
 import json
 import logging
 import math
+import os
 
 from flask import g, request, jsonify
 from flask.views import MethodView
 from flask_jwt_extended import verify_jwt_in_request, get_current_user
 from flask_jwt_extended.exceptions import NoAuthorizationError
+from sqlalchemy import tuple_
 from sqlalchemy.exc import SQLAlchemyError
 
+# imported for the hooks publishing catalogue changes to the other apps' caches, vendor contexts included
+import utilities.invalidation_bus  # noqa: F401
+import utilities.vendor_context  # noqa: F401
+from utilities.cron_client import cron_client
 from utilities.db_getter import Session, get_session
 from utilities.log_utils import setup_logger
+from utilities.reference_data import reference_data
+from utilities.replica_routing import prefer_replica
 from utilities.responses import bad_request_error
-from utilities.schemas.models import UserType, VendorProfile
+from utilities.serializers import serializers
+from utilities.schemas.models import VendorProfile
 from utilities.schemas.log_models import ConsumerActivityLog, VendorActivityLog
 
+DEFAULT_PER_PAGE = 100
+# upper bound for per_page, protects list endpoints from unbounded reads
+MAX_PER_PAGE = int(os.environ.get('MAX_PER_PAGE', 500))
+CURSOR_NEXT = 'next'
+CURSOR_PREV = 'prev'
+
+# activity loggers are process wide, their handlers are attached once at import time
+consumer_logger = setup_logger(logger_name="CONSUMER_LOGGER", log_model=ConsumerActivityLog)
+vendor_logger = setup_logger(logger_name="VENDOR_LOGGER", log_model=VendorActivityLog)
+
 
 def load_current_user():
     try:
@@ -28,16 +48,42 @@ def load_current_user():
         return None
 
 
+def encode_cursor(direction, id_value, sort_value=None):
+    """Build the opaque cursor handed to clients, it points just after (or before) the given row."""
+    payload = json.dumps([direction, sort_value, id_value], default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (direction, sort_value, id_value) or None for an empty or tampered cursor."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, sort_value, id_value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREV):
+        return None
+    return direction, sort_value, id_value
+
+
 class DobatoApi(MethodView):
     _page = None
     _per_page = None
     _user = None
+    _next_cursor = None
+    _prev_cursor = None
+    # views which only read, their queries may go to the read replica whatever the http method
+    read_only = False
 
     def __init__(self, auth=None):
         self._user = None
         self.db_session = g.db_session()
-        self.consumer_logger = setup_logger(logger_name="CONSUMER_LOGGER", log_model=ConsumerActivityLog)
-        self.vendor_logger = setup_logger(logger_name="VENDOR_LOGGER", log_model=VendorActivityLog)
+        if self.read_only:
+            prefer_replica(self.db_session)
+        self.consumer_logger = consumer_logger
+        self.vendor_logger = vendor_logger
         self.general_logger = logging.getLogger("DOBATO_LOGGER")
 
     @property
@@ -52,11 +98,9 @@ class DobatoApi(MethodView):
 
     def get_type_id(self, type_name):
         try:
-            user_type = self.db_session.query(UserType).filter(UserType.type_name == type_name).first()
-            if user_type:
-                return user_type.id
+            return reference_data.user_type_id(type_name)
         except SQLAlchemyError as e:
-            self.logger.error(f"Database error while fetching {type_name} type ID: {e}")
+            self.general_logger.error(f"Database error while fetching {type_name} type ID: {e}")
             return None
 
     # def get_vendor_status(self, user_id):
@@ -94,31 +138,13 @@ class DobatoApi(MethodView):
         return status
 
     @staticmethod
-    def make_obj_serializable(rows):
-        if isinstance(rows, list):
-            dict_rows = []
-            for row in rows:
-                dict_row = row.__dict__
-                dict_row.pop('_sa_instance_state')
-                dict_rows.append(dict_row)
-            return dict_rows
-        else:
-            dict_row = rows.__dict__
-            dict_row.pop('_sa_instance_state')
-            return dict_row
+    def make_obj_serializable(rows, fields=None):
+        return serializers.serialize(rows, fields=fields)
 
-    async def send_message(self, msg, port):
-        # Open connection and send message
-        try:
-            json_msg = json.dumps(msg)  # serialize before sending message
-            reader, writer = await asyncio.open_connection('localhost', port)
-            writer.write(json_msg.encode())  # Encode JSON string before sending
-            await writer.drain()  # Ensure the message is written before closing
-        except Exception as e:
-            print(f"Failed to send message: {e}")
-        finally:
-            if 'writer' in locals() and not writer.is_closing():
-                writer.close()
+    @staticmethod
+    def send_message(msg):
+        """Hand a message to the cron engine without waiting for it to be delivered."""
+        return cron_client.enqueue(msg)
 
     def commit(self):
         try:
@@ -135,7 +161,7 @@ class DobatoApi(MethodView):
             page = int(page)
         except ValueError:
             page = 1
-        if page < 0:
+        if page < 1:
             page = 1
         self._page = page
         return self._page
@@ -143,20 +169,90 @@ class DobatoApi(MethodView):
     def limit(self):
         if self._per_page is not None:
             return self._per_page
-        per_page = request.args.get('per_page', 100)
+        per_page = request.args.get('per_page', DEFAULT_PER_PAGE)
         try:
             per_page = int(per_page)
         except ValueError:
-            per_page = 100
-        if per_page < 0:
-            per_page = 100
-        self._per_page = per_page
+            per_page = DEFAULT_PER_PAGE
+        if per_page <= 0:
+            per_page = DEFAULT_PER_PAGE
+        self._per_page = min(per_page, MAX_PER_PAGE)
         return self._per_page
 
     def offset(self):
         previous_page = self.page() - 1
         return previous_page * self.limit()
 
+    def is_cursor_request(self):
+        return 'cursor' in request.args
+
+    def paginate(self, query, id_column, sort_column=None, id_attr=None, sort_attr=None, descending=False):
+        """
+        Apply keyset pagination to the query and return the rows of the requested page.
+
+        Rows are ordered on (sort_column, id_column) so the order is stable even when sort values repeat. A request
+        carrying ``cursor`` seeks straight to the next or previous page with an indexed range condition instead of
+        OFFSET, so every page costs the same. Requests using ``page`` keep the OFFSET behaviour. In both cases the
+        cursors of the neighbouring pages are stored for ``list_response``.
+
+        ``id_attr``/``sort_attr`` name the attributes holding the values on the returned rows, they default to the
+        column keys and only need setting when the columns are selected under a label. ``descending`` reverses the
+        order of both columns.
+        """
+        id_attr = id_attr or id_column.key
+        if sort_column is not None:
+            sort_attr = sort_attr or sort_column.key
+            key = tuple_(sort_column, id_column)
+            order = [sort_column, id_column]
+        else:
+            key = id_column
+            order = [id_column]
+        forward = [column.desc() for column in order] if descending else order
+        backward = order if descending else [column.desc() for column in order]
+
+        def row_cursor(direction, row):
+            sort_value = getattr(row, sort_attr) if sort_column is not None else None
+            return encode_cursor(direction, getattr(row, id_attr), sort_value)
+
+        limit = self.limit()
+        cursor = decode_cursor(request.args.get('cursor')) if self.is_cursor_request() else None
+        if cursor is None:
+            direction = CURSOR_NEXT
+            query = query.order_by(*forward)
+            if not self.is_cursor_request():
+                query = query.offset(self.offset())
+        else:
+            direction, sort_value, id_value = cursor
+            position = (sort_value, id_value) if sort_column is not None else id_value
+            if sort_column is not None:
+                position = tuple_(*position)
+            if (direction == CURSOR_NEXT) != descending:
+                query = query.filter(key > position)
+            else:
+                query = query.filter(key < position)
+            query = query.order_by(*(forward if direction == CURSOR_NEXT else backward))
+
+        # one extra row tells whether there is another page in the direction we are moving
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if direction == CURSOR_PREV:
+            rows.reverse()
+
+        self._next_cursor = None
+        self._prev_cursor = None
+        if rows:
+            if direction == CURSOR_NEXT:
+                if has_more:
+                    self._next_cursor = row_cursor(CURSOR_NEXT, rows[-1])
+                if cursor is not None or (not self.is_cursor_request() and self.page() > 1):
+                    self._prev_cursor = row_cursor(CURSOR_PREV, rows[0])
+            else:
+                self._next_cursor = row_cursor(CURSOR_NEXT, rows[-1])
+                if has_more:
+                    self._prev_cursor = row_cursor(CURSOR_PREV, rows[0])
+        return rows
+
     def pagination_meta(self, count, limit=None):
         if limit is None:
             limit = self.limit()
@@ -173,6 +269,8 @@ class DobatoApi(MethodView):
             count = len(rows)
         meta = self.pagination_meta(count, limit)
         meta['data_count'] = len(rows)
+        meta['next_cursor'] = self._next_cursor
+        meta['prev_cursor'] = self._prev_cursor
         response = {
             'data': {
                 'rows': rows
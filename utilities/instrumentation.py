@@ -0,0 +1,203 @@
+"""
+Per request timing and SQL accounting shared by the three flask apps.
+
+``instrumentation.init_app(app)`` times every request, counts the statements it runs and the time spent in the
+database (through SQLAlchemy's cursor execute events), and serves the figures on ``/metrics`` in the Prometheus
+text format, along with the connection pool figures of every engine. Latency quantiles are computed over the last
+``METRICS_WINDOW`` requests of each endpoint; counts and sums are totals since the process started. Every worker
+process keeps its own figures.
+
+``/metrics`` is served on the app's own port, so it answers only requests carrying ``Authorization: Bearer
+<METRICS_TOKEN>``; without a ``METRICS_TOKEN`` configured it answers only requests from the loopback address.
+"""
+import contextvars
+import hmac
+import os
+import threading
+import time
+from collections import deque
+
+from flask import Response, request, g, abort
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from utilities.db_setup import pool_stats
+
+# latest requests per endpoint the quantiles are computed over
+METRICS_WINDOW = int(os.environ.get('METRICS_WINDOW', 1024))
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+# bearer token the scraper sends, unset limits /metrics to requests from the loopback address
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+METRICS_PREFIX = 'dobato'
+QUANTILES = (0.5, 0.95, 0.99)
+POOL_METRICS = (
+    ('size', 'size', 'gauge', 'Connections the pool keeps open'),
+    ('checked_out', 'checked_out', 'gauge', 'Connections in use'),
+    ('checked_in', 'checked_in', 'gauge', 'Idle connections'),
+    ('overflow', 'overflow', 'gauge', 'Connections open beyond the pool size'),
+    ('waits', 'waits_total', 'counter', 'Checkouts which had to wait for a connection'),
+    ('wait_time', 'wait_seconds_total', 'counter', 'Seconds spent waiting for a connection'),
+    ('timeouts', 'timeouts_total', 'counter', 'Checkouts which gave up waiting'),
+)
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats(object):
+    """Figures of the request being served, collected by the cursor execute listeners."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+
+    def record_query(self, statement, duration):
+        self.queries += 1
+        self.db_time += duration
+
+
+def current_stats():
+    return _current.get()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('query_started_at', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get('query_started_at')
+    if stats is None or not started:
+        return
+    stats.record_query(statement, time.perf_counter() - started.pop())
+
+
+class RollingSummary(object):
+    """Count and sum since start plus the latest ``window`` observations for quantiles."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+    def quantiles(self, quantiles=QUANTILES):
+        ordered = sorted(self.samples)
+        return [(q, ordered[min(len(ordered) - 1, int(q * len(ordered)))]) for q in quantiles]
+
+
+class EndpointMetrics(object):
+    def __init__(self, window=METRICS_WINDOW):
+        self.duration = RollingSummary(window)
+        self.db_time = RollingSummary(window)
+        self.queries = 0
+        self.errors = 0
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Instrumentation(object):
+    def __init__(self, window=METRICS_WINDOW, enabled=METRICS_ENABLED, token=METRICS_TOKEN):
+        self.window = window
+        self.enabled = enabled
+        self.token = token
+        self.endpoints = dict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app, path='/metrics'):
+        if not self.enabled:
+            return
+        # registered ahead of the app's own hooks, the session commit in their teardown is still timed
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+        app.add_url_rule(path, view_func=self.metrics_view, endpoint='metrics')
+
+    @staticmethod
+    def _start():
+        g.request_stats_token = _current.set(RequestStats())
+
+    def _finish(self, exception=None):
+        stats = _current.get()
+        token = g.pop('request_stats_token', None)
+        if stats is None or token is None:
+            return
+        _current.reset(token)
+        if request.endpoint == 'metrics':
+            return
+        duration = time.perf_counter() - stats.started_at
+        self.observe(request.endpoint or 'unmatched', request.method, duration, stats, exception is not None)
+
+    def observe(self, endpoint, method, duration, stats, failed=False):
+        key = (endpoint, method)
+        with self._lock:
+            metrics = self.endpoints.get(key)
+            if metrics is None:
+                metrics = self.endpoints[key] = EndpointMetrics(self.window)
+            metrics.duration.observe(duration)
+            metrics.db_time.observe(stats.db_time)
+            metrics.queries += stats.queries
+            if failed:
+                metrics.errors += 1
+
+    def render(self):
+        """Current figures in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            lines = []
+            for name, kind, help_text in (
+                    ('request_duration_seconds', 'summary', 'Wall time of requests'),
+                    ('request_db_seconds', 'summary', 'Time spent executing SQL per request'),
+                    ('request_queries_total', 'counter', 'SQL statements executed'),
+                    ('request_errors_total', 'counter', 'Requests which ended with an unhandled error')):
+                metric = f'{METRICS_PREFIX}_{name}'
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} {kind}')
+                for (endpoint, method), metrics in items:
+                    labels = f'endpoint="{_label(endpoint)}",method="{method}"'
+                    if kind == 'counter':
+                        value = metrics.queries if name == 'request_queries_total' else metrics.errors
+                        lines.append(f'{metric}{{{labels}}} {value}')
+                        continue
+                    summary = metrics.duration if name == 'request_duration_seconds' else metrics.db_time
+                    for quantile, value in summary.quantiles():
+                        lines.append(f'{metric}{{{labels},quantile="{quantile}"}} {value:.6f}')
+                    lines.append(f'{metric}_sum{{{labels}}} {summary.total:.6f}')
+                    lines.append(f'{metric}_count{{{labels}}} {summary.count}')
+        lines.extend(self.render_pools())
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def render_pools():
+        pools = sorted(pool_stats().items())
+        lines = []
+        for key, name, kind, help_text in POOL_METRICS:
+            metric = f'{METRICS_PREFIX}_db_pool_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} {kind}')
+            for database, figures in pools:
+                lines.append(f'{metric}{{database="{_label(database)}"}} {figures[key]}')
+        return lines
+
+    def authorized(self):
+        if not self.token:
+            return request.remote_addr in LOOPBACK_ADDRESSES
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(token.encode(), self.token.encode())
+
+    def metrics_view(self):
+        if not self.authorized():
+            abort(403)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+instrumentation = Instrumentation()
@@ -0,0 +1,156 @@
+"""
+Change events of the vendor catalogue, published once the writing transaction commits.
+
+Sessions collect a ``Change`` (entity, id, vendor_profile_id) for every vendor profile, venue, space, menu, food item
+and menu item row they flush. Bulk statements bypass the flush and call ``record_change`` themselves. The changes are
+published after the commit, on a Redis channel shared by the apps, and a rolled back transaction publishes nothing.
+Publishing goes through a ``RedisTier``, whose short timeouts and backoff keep a Redis which hangs from holding up
+commits; changes it can't publish are lost, the cache ttls bound how long they stay unseen. An app caching catalogue
+data subscribes a handler evicting what a change touches::
+
+    invalidation_bus.subscribe(lambda change: ...)
+
+Handlers run on the bus' listener thread. Without Redis (``CACHE_REDIS_URL`` unset or ``memory://``) changes are
+delivered to the handlers of the publishing process only. Handlers registered with ``on_commit`` run in the
+committing process, right after its commit and before its next request can read the stale entries.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utilities.cache import CACHE_REDIS_URL, RedisTier
+from utilities.schemas.models import VendorProfile, Venue, VenueSpace, Menu, FoodItem, MenuItemTable
+
+INVALIDATION_CHANNEL = os.environ.get('INVALIDATION_CHANNEL', 'dobato:changes')
+# seconds between attempts to subscribe again once Redis went away
+INVALIDATION_RETRY_AFTER = float(os.environ.get('INVALIDATION_RETRY_AFTER', 5))
+# session.info key of the changes to publish once the session commits
+PENDING_CHANGES = 'invalidation_changes'
+
+VENDOR_PROFILE = 'vendor_profile'
+VENUE = 'venue'
+SPACE = 'space'
+MENU = 'menu'
+FOOD_ITEM = 'food_item'
+MENU_ITEM = 'menu_item'
+
+Change = namedtuple('Change', ['entity', 'id', 'vendor_profile_id'])
+
+
+def record_change(session, entity, entity_id, vendor_profile_id):
+    """Publish a change of ``entity`` once ``session`` commits."""
+    session.info.setdefault(PENDING_CHANGES, set()).add(Change(entity, entity_id, vendor_profile_id))
+
+
+def _owner(session, owners, model, owner_id):
+    # the identity map holds its objects weakly, ``owners`` keeps them for the rest of the flush
+    if (model, owner_id) not in owners:
+        owners[model, owner_id] = session.get(model, owner_id)
+    return owners[model, owner_id]
+
+
+def _change_of(session, obj, owners):
+    if isinstance(obj, VendorProfile):
+        return Change(VENDOR_PROFILE, obj.id, obj.id)
+    if isinstance(obj, Venue):
+        return Change(VENUE, obj.id, obj.vendor_profile_id)
+    if isinstance(obj, (Menu, FoodItem)):
+        return Change(MENU if isinstance(obj, Menu) else FOOD_ITEM, obj.id, obj.vendor_profile_id)
+    # the owner usually sits in the identity map already, the view loaded it to check ownership
+    if isinstance(obj, VenueSpace):
+        venue = _owner(session, owners, Venue, obj.venue_id)
+        return Change(SPACE, obj.id, venue.vendor_profile_id if venue is not None else None)
+    if isinstance(obj, MenuItemTable):
+        menu = _owner(session, owners, Menu, obj.menu_id)
+        return Change(MENU_ITEM, obj.id, menu.vendor_profile_id if menu is not None else None)
+
+
+class InvalidationBus(object):
+    def __init__(self, url=CACHE_REDIS_URL, channel=INVALIDATION_CHANNEL, retry_after=INVALIDATION_RETRY_AFTER):
+        shared = bool(url) and not url.startswith('memory://')
+        self.remote = RedisTier.from_url(url, prefix='') if shared else None
+        # the subscription blocks reading until a change comes, its connection has no read timeout
+        self.subscriber = redis.Redis.from_url(url, socket_connect_timeout=1, health_check_interval=30) \
+            if shared else None
+        self.channel = channel
+        self.retry_after = retry_after
+        self.logger = logging.getLogger('DOBATO_LOGGER')
+        self.handlers = []
+        self.commit_handlers = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, handler):
+        """Call ``handler(change)`` for every change published from now on, by any app."""
+        self.handlers.append(handler)
+        if self.subscriber is not None:
+            self._start()
+
+    def on_commit(self, handler):
+        """Call ``handler(change)`` for every change committed by this process, as part of the commit."""
+        self.commit_handlers.append(handler)
+
+    def publish(self, changes):
+        self._deliver(changes, self.commit_handlers)
+        if self.remote is None:
+            self._deliver(changes, self.handlers)
+            return
+        self.remote.publish(self.channel, json.dumps([change._asdict() for change in changes]))
+
+    def _deliver(self, changes, handlers):
+        for change in changes:
+            for handler in handlers:
+                try:
+                    handler(change)
+                except Exception as e:
+                    self.logger.exception(f"Invalidation handler failed for {change}: {e}")
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._listen, name='invalidation-bus', daemon=True)
+            self._thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.subscriber.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    self._deliver([Change(**change) for change in json.loads(message['data'])], self.handlers)
+            except redis.RedisError as e:
+                # changes published meanwhile are lost, the cache ttls bound how long they stay unseen
+                self.logger.error(f"Invalidation bus lost its subscription, retrying: {e}")
+                time.sleep(self.retry_after)
+
+
+invalidation_bus = InvalidationBus()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect(session, flush_context):
+    owners = {}
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        change = _change_of(session, obj, owners)
+        if change is not None:
+            session.info.setdefault(PENDING_CHANGES, set()).add(change)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed(session):
+    changes = session.info.pop(PENDING_CHANGES, None)
+    if changes:
+        invalidation_bus.publish(list(changes))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_pending(session):
+    session.info.pop(PENDING_CHANGES, None)
@@ -1,6 +1,25 @@
+import atexit
 import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
 
-from utilities.db_getter import get_session
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from utilities.db_getter import Session
+
+# writer thread flushes whenever either limit is reached first
+LOG_FLUSH_INTERVAL_MS = int(os.environ.get('LOG_FLUSH_INTERVAL_MS', 500))
+LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', 200))
+# bounded buffer, records beyond this are dropped according to the overflow policy
+LOG_BUFFER_SIZE = int(os.environ.get('LOG_BUFFER_SIZE', 10000))
+DROP_NEWEST = 'drop_newest'
+DROP_OLDEST = 'drop_oldest'
+LOG_OVERFLOW_POLICY = os.environ.get('LOG_OVERFLOW_POLICY', DROP_OLDEST)
 
 
 class DynamicUserFilter(logging.Filter):
@@ -12,23 +31,137 @@ class DynamicUserFilter(logging.Filter):
         return True
 
 
+class DbLogWriter(object):
+    """
+    Buffers activity log rows in memory and bulk inserts them from a single background thread.
+
+    Request threads only pay for a ``queue.put``; the writer thread drains the buffer every
+    ``flush_interval_ms`` or every ``batch_size`` rows, whichever comes first, and issues one
+    INSERT per log model for the whole batch.
+    """
+
+    def __init__(self, session_factory, flush_interval_ms=LOG_FLUSH_INTERVAL_MS, batch_size=LOG_BATCH_SIZE,
+                 buffer_size=LOG_BUFFER_SIZE, overflow_policy=LOG_OVERFLOW_POLICY):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.batch_size = batch_size
+        self.overflow_policy = overflow_policy
+        self.records = queue.Queue(maxsize=buffer_size)
+        self.dropped = 0
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='db-log-writer', daemon=True)
+            self._thread.start()
+
+    def put(self, log_model, row):
+        if self._thread is None:
+            self.start()
+        item = (log_model, row)
+        try:
+            self.records.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            if self.overflow_policy == DROP_OLDEST:
+                try:
+                    self.records.get_nowait()
+                    self.records.put_nowait(item)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _collect_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.records.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.records.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect_batch()
+            if batch:
+                self.write(batch)
+        self.write(self._drain())
+
+    def write(self, batch):
+        if not batch:
+            return
+        rows_by_model = dict()
+        for log_model, row in batch:
+            rows_by_model.setdefault(log_model, []).append(row)
+        session = self.session_factory()
+        try:
+            for log_model, rows in rows_by_model.items():
+                session.execute(insert(log_model), rows)
+            session.commit()
+        except SQLAlchemyError as e:
+            session.rollback()
+            # the DB handler can't log its own failure, fall back to stderr
+            print(f"Failed to write {len(batch)} activity log rows: {e}", file=sys.stderr)
+        finally:
+            session.close()
+
+    def flush(self):
+        self.write(self._drain())
+
+    def stop(self, timeout=5):
+        """Stop the writer thread, flushing everything still buffered."""
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+        else:
+            self.flush()
+
+
+# one writer per process, shared by every logger that has a DbHandler
+log_writer = DbLogWriter(Session)
+atexit.register(log_writer.stop)
+
+
 class DbHandler(logging.Handler):
-    def __init__(self, session, log_model, user=None):
+    def __init__(self, log_model, user=None, writer=None):
         logging.Handler.__init__(self)
-        self.session = session
         self.log_model = log_model
+        self.writer = writer or log_writer
         if user:
             self.user_id = user.id
         else:
             self.user_id = 0 # 0 is for the anonymous user
 
     def emit(self, record):
-        log_entry = self.format(record)
-        log = self.log_model(level=record.levelname,
-                             message=log_entry,
-                             user_id=self.user_id)
-        self.session.add(log)
-        self.session.commit()
+        try:
+            log_entry = self.format(record)
+            user_id = getattr(record, 'user_id', None)
+            self.writer.put(self.log_model, {'level': record.levelname,
+                                             'message': log_entry,
+                                             'user_id': user_id if user_id is not None else self.user_id,
+                                             'created_at': datetime.fromtimestamp(record.created)})
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.writer.flush()
 
 
 def setup_logger(logger_name, log_model, log_level=None):
@@ -37,8 +170,10 @@ def setup_logger(logger_name, log_model, log_level=None):
         logger.setLevel(logging.DEBUG)
     else:
         logger.setLevel(log_level)
-    session = get_session()
-    db_handler = DbHandler(session, log_model)
+    # loggers are process wide, only attach the handler and filter once
+    if any(isinstance(handler, DbHandler) for handler in logger.handlers):
+        return logger
+    db_handler = DbHandler(log_model)
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     db_handler.setFormatter(formatter)
     logger.addHandler(db_handler)
@@ -5,6 +5,7 @@ from flask import redirect, url_for, request
 from flask_jwt_extended import current_user, verify_jwt_in_request
 
 from utilities.responses import unauthorized_response
+from utilities.vendor_context import vendor_contexts
 
 
 class VendorLoginRequiredMixin(object):
@@ -29,3 +30,16 @@ class VendorLoginRequiredMixin(object):
             return f(*args, **kwargs)
         return decorated_function
 
+
+class VendorContextMixin(object):
+    """For ``DobatoApi`` views of a vendor's own catalogue, ``self.vendor`` is the current user's ``VendorContext``."""
+    _vendor = None
+
+    @property
+    def vendor(self):
+        if self._vendor is None:
+            user = self.user
+            if user is None:
+                return None
+            self._vendor = vendor_contexts.get(user.id, self.db)
+        return self._vendor
@@ -0,0 +1,53 @@
+"""
+Single statement writes of the rows a vendor owns.
+
+``update_owned`` and ``delete_owned`` put the ownership check in the statement itself,
+``UPDATE ... WHERE id = :id AND vendor_profile_id = :vp RETURNING id`` and ``DELETE ... RETURNING id``, so a write
+costs one round trip and a row the vendor doesn't own is never touched. Both return the id of the written row, None
+when nothing matched; views answer that with their not found response. The statements bypass the session's flush,
+callers ``record_change`` the rows they write for the invalidation bus. ``owned_update`` and ``owned_delete`` build
+the statements without running them, ``tests/query_plans.py`` checks their plans.
+"""
+from sqlalchemy import select, update, delete
+
+from utilities.schemas.models import Venue, VenueSpace, Menu, MenuItemTable
+
+
+def owned_by(model, vendor_profile_id):
+    """
+    Criterion matching the rows of ``model`` owned by the vendor profile, spaces are owned through their venue and
+    menu items through their menu.
+    """
+    if model is VenueSpace:
+        return VenueSpace.venue_id.in_(select(Venue.id).where(Venue.vendor_profile_id == vendor_profile_id))
+    if model is MenuItemTable:
+        return MenuItemTable.menu_id.in_(select(Menu.id).where(Menu.vendor_profile_id == vendor_profile_id))
+    return model.vendor_profile_id == vendor_profile_id
+
+
+def owned_update(model, row_id, vendor_profile_id, values, *criteria):
+    """
+    UPDATE of the owned row returning its id; without ``values`` an UPDATE has nothing to set and the row is only
+    selected.
+    """
+    where = (model.id == row_id, owned_by(model, vendor_profile_id), *criteria)
+    if not values:
+        return select(model.id).where(*where)
+    return (update(model).where(*where).values(**values).returning(model.id)
+            .execution_options(synchronize_session='fetch'))
+
+
+def owned_delete(model, row_id, vendor_profile_id, *criteria):
+    """DELETE of the owned row returning its id."""
+    return (delete(model).where(model.id == row_id, owned_by(model, vendor_profile_id), *criteria)
+            .returning(model.id).execution_options(synchronize_session='fetch'))
+
+
+def update_owned(session, model, row_id, vendor_profile_id, values, *criteria):
+    """Set ``values`` on the owned row, columns missing from ``values`` keep theirs (PATCH semantics)."""
+    return session.execute(owned_update(model, row_id, vendor_profile_id, values, *criteria)).scalar()
+
+
+def delete_owned(session, model, row_id, vendor_profile_id, *criteria):
+    """Delete the owned row."""
+    return session.execute(owned_delete(model, row_id, vendor_profile_id, *criteria)).scalar()
@@ -0,0 +1,150 @@
+"""
+Records the SQL statements run while it is active, to keep the query count of endpoints in check.
+
+* ``QueryRecorder`` is a context manager collecting every statement executed inside it, on any engine.
+* ``max_queries(n)`` decorates a view (or goes in a MethodView's ``decorators``) and reports the view when it runs
+  more than ``n`` statements: a warning by default, ``QueryBudgetExceeded`` when ``QUERY_BUDGET_STRICT=1`` so a test
+  run fails on a regression.
+* ``assert_max_queries(n)`` is the same check as a ``with`` block for tests.
+* ``n_plus_one.init_app(app)`` records every request of a development app (``QUERY_DEBUG=1`` or ``app.debug``) and
+  logs statements which ran ``N_PLUS_ONE_THRESHOLD`` times or more, the usual sign of a query issued once per row
+  of an earlier result.
+"""
+import contextvars
+import functools
+import logging
+import os
+import re
+from collections import Counter
+
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '0') == '1'
+QUERY_DEBUG = os.environ.get('QUERY_DEBUG', '0') == '1'
+# a statement repeated this many times within one request is reported
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 3))
+
+logger = logging.getLogger('DOBATO_LOGGER')
+
+_recorders = contextvars.ContextVar('query_recorders', default=())
+
+_FINGERPRINT_RULES = (
+    (re.compile(r'--[^\n]*|/\*.*?\*/', re.S), ' '),
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%\(\w+\)s|:\w+\b|\$\d+|__\[POSTCOMPILE_\w+\]|%s'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(?)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(statement):
+    """The statement with literals and bound parameters replaced by ``?``, same shaped queries share it."""
+    for pattern, replacement in _FINGERPRINT_RULES:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for recorder in _recorders.get():
+        recorder.statements.append(statement)
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, name, count, limit, statements):
+        self.name = name
+        self.count = count
+        self.limit = limit
+        self.statements = statements
+        super().__init__(f'{name} ran {count} queries, budget is {limit}:\n' + '\n'.join(statements))
+
+
+class QueryRecorder(object):
+    def __init__(self):
+        self.statements = []
+        self._token = None
+
+    def __enter__(self):
+        self._token = _recorders.set(_recorders.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _recorders.reset(self._token)
+        self._token = None
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Fingerprints run at least ``threshold`` times, most frequent first."""
+        counts = Counter(fingerprint(statement) for statement in self.statements)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+
+def _over_budget(name, recorder, limit, strict):
+    if recorder.count <= limit:
+        return
+    if strict:
+        raise QueryBudgetExceeded(name, recorder.count, limit, recorder.statements)
+    logger.warning(f'{name} ran {recorder.count} queries, budget is {limit}')
+
+
+def max_queries(limit, strict=None):
+    """Report the decorated view when one call runs more than ``limit`` statements."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with QueryRecorder() as recorder:
+                response = view(*args, **kwargs)
+            name = request.endpoint if has_request_context() else view.__qualname__
+            _over_budget(name, recorder, limit, QUERY_BUDGET_STRICT if strict is None else strict)
+            return response
+        return wrapper
+    return decorator
+
+
+class assert_max_queries(QueryRecorder):
+    """``with assert_max_queries(3): client.get(...)`` raises ``QueryBudgetExceeded`` past 3 statements."""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def __exit__(self, exc_type, *exc_info):
+        super().__exit__(exc_type, *exc_info)
+        if exc_type is None:
+            _over_budget('block', self, self.limit, strict=True)
+
+
+class NPlusOneDetector(object):
+    def __init__(self, threshold=N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.teardown_request(self._finish)
+
+    @staticmethod
+    def _start():
+        # app.debug is only known once the app runs, not when init_app is called
+        if not (QUERY_DEBUG or current_app.debug):
+            return
+        recorder = QueryRecorder()
+        recorder.__enter__()
+        g.query_recorder = recorder
+
+    def _finish(self, exception=None):
+        recorder = g.pop('query_recorder', None)
+        if recorder is None:
+            return
+        recorder.__exit__(None, None, None)
+        for sql, count in recorder.repeated(self.threshold):
+            logger.warning(f'Possible N+1 on {request.method} {request.path}: {count}x {sql}')
+
+
+n_plus_one = NPlusOneDetector()
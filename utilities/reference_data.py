@@ -0,0 +1,93 @@
+import logging
+import os
+from collections import namedtuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from utilities.cache import cache
+from utilities.db_getter import Session
+from utilities.schemas import tables
+from utilities.schemas.models import UserType, VendorIndustry, VenueType
+
+# reference tables are edited from super_admin only, a stale read is bounded by this ttl
+REFERENCE_DATA_TTL = int(os.environ.get('REFERENCE_DATA_TTL', 300))
+REFERENCE_TABLES = (tables.USER_TYPE, tables.VENDOR_INDUSTRY, tables.VENUE_TYPES)
+REFERENCE_DATA_KEY = 'reference_data'
+
+UserTypeRow = namedtuple('UserTypeRow', ['id', 'type_name'])
+VendorIndustryRow = namedtuple('VendorIndustryRow', ['id', 'industry_name', 'additional_fields'])
+VenueTypeRow = namedtuple('VenueTypeRow', ['id', 'name'])
+
+
+class ReferenceDataCache(object):
+    """
+    Copy of the small lookup tables (user types, vendor industries and venue types) kept in the shared cache.
+
+    The tables are loaded in one go and served by id and by name without touching the database. The copy is
+    reloaded once ``ttl`` seconds have passed or after ``invalidate()`` has been called, by one process at a time
+    when the cache has Redis behind it.
+    """
+
+    def __init__(self, session_factory, ttl=REFERENCE_DATA_TTL, cache=cache):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.cache = cache
+        self.logger = logging.getLogger('DOBATO_LOGGER')
+
+    def load(self):
+        session = self.session_factory()
+        try:
+            user_types = [UserTypeRow(row.id, row.type_name)
+                          for row in session.query(UserType.id, UserType.type_name).all()]
+            industries = [VendorIndustryRow(row.id, row.industry_name, row.additional_fields)
+                          for row in session.query(VendorIndustry.id, VendorIndustry.industry_name,
+                                                   VendorIndustry.additional_fields).all()]
+            venue_types = [VenueTypeRow(row.id, row.name)
+                           for row in session.query(VenueType.id, VenueType.name).all()]
+        finally:
+            session.close()
+
+        return {
+            'user_types': {row.id: row for row in user_types},
+            'user_types_by_name': {row.type_name: row for row in user_types},
+            'industries': {row.id: row for row in industries},
+            'industries_by_name': {row.industry_name: row for row in industries},
+            'venue_types': {row.id: row for row in venue_types},
+        }
+
+    def warm(self):
+        """Load the tables at startup, a failure here is retried on first lookup."""
+        try:
+            self._snapshot()
+        except SQLAlchemyError as e:
+            self.logger.error(f"Could not load reference data: {e}")
+
+    def invalidate(self):
+        self.cache.delete(REFERENCE_DATA_KEY)
+
+    def _snapshot(self):
+        return self.cache.get_or_load(REFERENCE_DATA_KEY, self.load, self.ttl)
+
+    def user_type(self, type_id):
+        return self._snapshot()['user_types'].get(type_id)
+
+    def user_type_id(self, type_name):
+        user_type = self._snapshot()['user_types_by_name'].get(type_name)
+        if user_type:
+            return user_type.id
+
+    def industry(self, industry_id):
+        return self._snapshot()['industries'].get(industry_id)
+
+    def industry_by_name(self, industry_name):
+        return self._snapshot()['industries_by_name'].get(industry_name)
+
+    def industries(self):
+        return [{'id': row.id, 'industry_name': row.industry_name}
+                for row in self._snapshot()['industries'].values()]
+
+    def venue_types(self):
+        return [row._asdict() for row in self._snapshot()['venue_types'].values()]
+
+
+reference_data = ReferenceDataCache(Session)
@@ -0,0 +1,59 @@
+"""
+Routes the reads of an app's requests to the read replica configured with ``DB_REPLICA_URL``.
+
+GET/HEAD/OPTIONS requests, and views declaring ``read_only = True``, read from the replica. Any other request, and a
+read which ended up writing, answers with a cookie keeping the client's following requests on the primary for
+``DB_REPLICA_STICKY_SECONDS``, so clients always see their own writes even when the replica lags behind.
+"""
+import os
+import time
+
+from flask import g, request
+
+from utilities.db_getter import scoped
+from utilities.db_setup import USE_REPLICA, WROTE
+
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
+STICKY_COOKIE = 'db_primary_until'
+
+
+def prefer_replica(session):
+    """Let the session read from the replica, unless the client has to see its own recent writes."""
+    if g.get('stick_to_primary'):
+        return
+    session.info[USE_REPLICA] = True
+
+
+class ReplicaRouting(object):
+    def __init__(self, registry, sticky_seconds=DB_REPLICA_STICKY_SECONDS):
+        self.registry = registry
+        self.sticky_seconds = sticky_seconds
+
+    def init_app(self, app):
+        app.before_request(self._route)
+        app.after_request(self._remember_writes)
+
+    def _route(self):
+        try:
+            primary_until = float(request.cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        g.stick_to_primary = primary_until > time.time()
+        if request.method in READ_METHODS:
+            prefer_replica(self.registry())
+
+    def _wrote(self):
+        # raw SQL writes can't be told apart from reads, any request which isn't a read counts as writing
+        if request.method not in READ_METHODS:
+            return True
+        return self.registry.registry.has() and self.registry().info.get(WROTE, False)
+
+    def _remember_writes(self, response):
+        if self._wrote():
+            response.set_cookie(STICKY_COOKIE, str(int(time.time()) + self.sticky_seconds),
+                                max_age=self.sticky_seconds, httponly=True)
+        return response
+
+
+replica_routing = ReplicaRouting(scoped)
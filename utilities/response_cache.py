@@ -0,0 +1,150 @@
+"""
+Response cache for the GET views of the catalogue, with ETag/Last-Modified revalidation.
+
+A view opts in through its ``decorators``::
+
+    decorators = [response_cache.cached(tags=vendor_tags)]
+
+Responses are keyed on the path, the sorted query arguments and, for ``per_user`` views, the JWT identity. A hit is
+answered without building the view, so without touching the database, and a request whose ``If-None-Match`` or
+``If-Modified-Since`` matches gets a 304. Entries expire after ``RESPONSE_CACHE_TTL`` seconds and are dropped sooner
+by tag: write endpoints call ``invalidate_on_commit(session, *tags)`` and the entries go once the session commits.
+
+Entries live in the shared cache, in a local tier of their own so large bodies don't push out other entries. A tag
+has a version token stored next to the entries, entries remember the versions of their tags and invalidating a tag
+gives it a new version, which retires its entries in every process sharing the Redis of ``utilities.cache``.
+The consumer app also subscribes to ``utilities.invalidation_bus``, so vendor writes retire their vendor's entries
+there right away and ``RESPONSE_CACHE_TTL`` can be long.
+"""
+import hashlib
+import os
+import time
+import uuid
+from functools import wraps
+
+from flask import request, make_response
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from utilities.cache import cache, Cache, LocalCache
+
+# seconds a response stays cached, tag invalidation usually drops it sooner
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+# responses kept per process, the least recently used go first
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1000))
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+# a tag's version outlives the entries tagged with it, an expired version only retires entries early
+RESPONSE_TAG_TTL = 24 * 60 * 60
+INDUSTRIES_TAG = 'industries'
+# session.info key of the tags to invalidate once the session commits
+PENDING_TAGS = 'response_cache_tags'
+
+
+def vendor_tag(vendor_profile_id):
+    """Tag of the responses showing a vendor's venue, spaces, menus or food items."""
+    return f'vendor:{vendor_profile_id}'
+
+
+def vendor_tags(vendor_profile_id, **kwargs):
+    """``tags`` of the views routed on a ``vendor_profile_id``."""
+    return [vendor_tag(vendor_profile_id)]
+
+
+class CachedResponse(object):
+    def __init__(self, body, status, mimetype, versions):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.versions = versions
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = time.time()
+
+
+class ResponseCache(object):
+    def __init__(self, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 enabled=RESPONSE_CACHE_ENABLED, remote=cache.remote):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.cache = Cache(remote=remote, local=LocalCache(max_entries))
+
+    def version(self, tag):
+        return self.cache.get_or_load(f'response_tag:{tag}', lambda: uuid.uuid4().hex, RESPONSE_TAG_TTL)
+
+    def get(self, key):
+        entry = self.cache.get(f'response:{key}')
+        if entry is None or any(self.version(tag) != version for tag, version in entry.versions.items()):
+            return None
+        return entry
+
+    def put(self, key, entry, ttl):
+        self.cache.set(f'response:{key}', entry, ttl)
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.cache.set(f'response_tag:{tag}', uuid.uuid4().hex, RESPONSE_TAG_TTL)
+
+    @staticmethod
+    def invalidate_on_commit(session, *tags):
+        """Invalidate ``tags`` once ``session`` commits, nothing happens if it rolls back."""
+        session.info.setdefault(PENDING_TAGS, set()).update(tags)
+
+    @staticmethod
+    def key(per_user):
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        scope = ''
+        if per_user:
+            verify_jwt_in_request(optional=True)
+            scope = get_jwt_identity() or ''
+        return f'{request.path}?{args}#{scope}'
+
+    def cached(self, tags=None, ttl=None, per_user=False):
+        """
+        View decorator caching the 200 responses of GET requests.
+
+        ``tags`` is called with the view arguments and returns the tags of the response; ``per_user`` keeps a
+        separate entry per JWT identity for views whose response depends on the user.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method not in ('GET', 'HEAD'):
+                    return view(*args, **kwargs)
+                key = self.key(per_user)
+                entry = self.get(key)
+                if entry is None:
+                    # versions are read before the view runs, a write committed meanwhile retires this entry
+                    versions = {tag: self.version(tag) for tag in (tags(**kwargs) if tags else ())}
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.direct_passthrough:
+                        return response
+                    entry = CachedResponse(response.get_data(), response.status_code, response.mimetype, versions)
+                    self.put(key, entry, self.ttl if ttl is None else ttl)
+                    response.headers['X-Cache'] = 'MISS'
+                else:
+                    response = make_response(entry.body, entry.status)
+                    response.mimetype = entry.mimetype
+                    response.headers['X-Cache'] = 'HIT'
+                response.set_etag(entry.etag)
+                response.last_modified = entry.last_modified
+                response.cache_control.no_cache = True
+                if per_user:
+                    response.cache_control.private = True
+                return response.make_conditional(request)
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    tags = session.info.pop(PENDING_TAGS, None)
+    if tags:
+        response_cache.invalidate(*tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_pending(session):
+    session.info.pop(PENDING_TAGS, None)
@@ -2,7 +2,10 @@ import datetime
 
 from flask import current_app
 
-from sqlalchemy import Column, Integer, String, Boolean, Text, Date, Time, DateTime, Numeric, ForeignKey, DECIMAL, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Text, Date, Time, DateTime, Numeric, ForeignKey, DECIMAL, JSON, \
+    Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
 from werkzeug.security import generate_password_hash, check_password_hash
 from itsdangerous import URLSafeTimedSerializer as Serializer
@@ -10,6 +13,20 @@ from utilities.schemas import tables
 from utilities.schemas.base import Base
 
 
+class PostgresqlComputed(Computed):
+    """A generated column on postgresql, a plain nullable column on the sqlite databases used for local runs."""
+
+
+@compiles(PostgresqlComputed)
+def _plain_column(element, compiler, **kw):
+    return ''
+
+
+@compiles(PostgresqlComputed, 'postgresql')
+def _generated_column(element, compiler, **kw):
+    return compiler.visit_computed_column(element, **kw)
+
+
 # TODO: Check Relationships
 class User(Base):
     __tablename__ = tables.USERS
@@ -18,13 +35,13 @@ class User(Base):
     fullname = Column(String, nullable=False)
     email = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False)
-    phone_number = Column(String)
+    phone_number = Column(String, index=True)
     # logged_in_at = Column(DateTime)
     # logged_out_at = Column(DateTime)
     is_verified = Column(Boolean)
     verification_code = Column(String)
     created_at = Column(DateTime)
-    user_type_id = Column(Integer, ForeignKey('user_type.id'), nullable=False)
+    user_type_id = Column(Integer, ForeignKey('user_type.id'), nullable=False, index=True)
 
 
     def set_password(self, password):
@@ -116,8 +133,8 @@ class Venue(Base):
     mandatory_catering = Column(Boolean)
     venue_type = Column(String)
     parking_capacity = Column(Integer)
-    industry_id = Column(Integer, ForeignKey('vendor_industry.id'), nullable=False)
-    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False)
+    industry_id = Column(Integer, ForeignKey('vendor_industry.id'), nullable=False, index=True)
+    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False, index=True)
     vendor_industry = relationship("VendorIndustry", back_populates=tables.VENUES)
     spaces = relationship("VenueSpace", back_populates=tables.VENUES, cascade="all, delete")
     # menu = relationship("Menu", back_populates=tables.VENUES, cascade="all, delete")
@@ -131,7 +148,7 @@ class Menu(Base):
     description = Column(String)
     rate = Column(Numeric)
     no_of_items = Column(Numeric)
-    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False)
+    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False, index=True)
 
     # venues = relationship("Venue", back_populates=tables.MENU)
     # food_items = relationship("FoodItem", secondary=tables.MENU, cascade="all, delete")
@@ -144,13 +161,15 @@ class FoodItem(Base):
     item_price = Column(Numeric)
     item_description = Column(String)
     type = Column(String)
-    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False)
+    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False, index=True)
 
 
 class MenuItemTable(Base):
     __tablename__ = tables.MENU_FOOD_ITEMS
+    # menu listings filter on menu_id, item_id alone serves deletes of food items
+    __table_args__ = (Index('ix_menu_food_items_menu_id_item_id', 'menu_id', 'item_id'),)
     id = Column(Integer, primary_key=True, autoincrement=True)
-    item_id = Column(Integer, ForeignKey('food_items.id'), nullable=False)
+    item_id = Column(Integer, ForeignKey('food_items.id'), nullable=False, index=True)
     menu_id = Column(Integer, ForeignKey('menu.id'), nullable=False)
 
 
@@ -165,12 +184,51 @@ class VenueSpace(Base):
     type_of_charge = Column(String)  # hourly, fixed, period_of_time which is the charge based on
     seating_capacity = Column(Integer)
     floating_capacity = Column(Integer)
-    venue_id = Column(Integer, ForeignKey('venues.id'), nullable=False)
+    venue_id = Column(Integer, ForeignKey('venues.id'), nullable=False, index=True)
 
     venues = relationship("Venue", back_populates=tables.SPACES)
     # schedule = relationship("Schedule", back_populates="spaces", cascade="all, delete")
 
 
+class VenueCard(Base):
+    """
+    Listing row of a venue, derived from the venue, its spaces and its industry by ``utilities.venue_cards``.
+
+    Never written directly: the vendor views refresh a venue's card whenever they change the venue or its spaces.
+    The columns the search sorts on are never NULL, keyset pagination can't step over NULLs.
+    """
+    __tablename__ = tables.VENUE_CARD
+    # (sort column, venue_id) pairs serve the sorts and range filters of utilities.venue_search
+    __table_args__ = (
+        Index('ix_venue_card_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_venue_card_venue_name_venue_id', 'venue_name', 'venue_id'),
+        Index('ix_venue_card_total_capacity_venue_id', 'total_capacity', 'venue_id'),
+        Index('ix_venue_card_parking_capacity_venue_id', 'parking_capacity', 'venue_id'),
+        Index('ix_venue_card_min_rate_venue_id', 'min_rate', 'venue_id'),
+    )
+
+    venue_id = Column(Integer, ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True)
+    vendor_profile_id = Column(Integer, nullable=False, index=True)
+    venue_name = Column(String, nullable=False, default='')
+    location = Column(String, index=True)
+    venue_type = Column(String)
+    parking_capacity = Column(Integer, nullable=False, default=0)
+    industry_id = Column(Integer, nullable=False)
+    industry_name = Column(String)
+    total_capacity = Column(Integer, nullable=False, default=0)
+    space_count = Column(Integer, nullable=False, default=0)
+    # 0 when no space has a rate
+    min_rate = Column(Numeric, nullable=False, default=0)
+    max_rate = Column(Numeric, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
+    # words of the name, location and venue type, weighted in that order for ranking; text search needs postgresql,
+    # on sqlite the column stays empty
+    search_vector = Column(TSVECTOR().with_variant(Text, 'sqlite'), PostgresqlComputed(
+        "setweight(to_tsvector('simple', coalesce(venue_name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(venue_type, '')), 'C')", persisted=True))
+
+
 # class Schedule(Base):
 #     __tablename__ = tables.SCHEDULE
 #
@@ -194,14 +252,16 @@ class CateringPackage(Base):
 
 class VenueBooking(Base):
     __tablename__ = tables.VENUE_BOOKINGS
+    # bookings of a space over a date range, the calendar's query
+    __table_args__ = (Index('ix_venue_bookings_space_id_booked_date', 'space_id', 'booked_date'),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    booked_date = Column(DateTime)
+    booked_date = Column(DateTime, index=True)
     booked_quantity = Column(Integer)
     status = Column(String)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     space_id = Column(Integer, ForeignKey('spaces.id'), nullable=False)
-    menu_id = Column(Integer, ForeignKey('menu.id'), nullable=False)
+    menu_id = Column(Integer, ForeignKey('menu.id'), nullable=False, index=True)
 
     # users = relationship("User", back_populates=tables.VENUE_BOOKINGS)
 
@@ -243,5 +303,5 @@ class VendorDynamicFormTable(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     form_name = Column(String)
     schema = Column(JSON)
-    vendor_id = Column(Integer, ForeignKey(User.id), nullable=False)
+    vendor_id = Column(Integer, ForeignKey(User.id), nullable=False, index=True)
 
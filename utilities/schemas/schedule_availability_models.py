@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Date, Time, ForeignKey, Numeric, JSON, String
+from sqlalchemy import Column, Integer, Date, Time, ForeignKey, Numeric, JSON, String, Index
 from sqlalchemy.orm import relationship
 
 from utilities.schemas import tables
@@ -11,23 +11,63 @@ class Shift(Base):
     shift_name = Column(String)
     shift_time = Column(Time)
     booking_capacity = Column(Integer, default=1)
-    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False)
-    space_id = Column(Integer, ForeignKey('spaces.id'), nullable=True)
+    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False, index=True)
+    space_id = Column(Integer, ForeignKey('spaces.id'), nullable=True, index=True)
 
 
 class Schedule(Base):
     __tablename__ = tables.SCHEDULE
     id = Column(Integer, primary_key=True, autoincrement=True)
     schedule = Column(JSON)
-    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False)
-    space_id = Column(Integer, ForeignKey('spaces.id'), nullable=True)
+    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False, index=True)
+    space_id = Column(Integer, ForeignKey('spaces.id'), nullable=True, index=True)
 
 
 class Availability(Base):
     __tablename__ = tables.AVAILABILITY
+    __table_args__ = (
+        Index('ix_availability_space_id_date', 'space_id', 'date'),
+        # the nightly roll forward looks rows up per shift and date
+        Index('ix_availability_shift_id_date', 'shift_id', 'date'),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     date = Column(Date)
     status = Column(String)
     shift_id = Column(Integer, ForeignKey('shifts.id'), nullable=False)
-    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False)
+    vendor_profile_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False, index=True)
     space_id = Column(Integer, ForeignKey('spaces.id'), nullable=True)
+
+
+class AvailabilityBitmap(Base):
+    """
+    Availability of a shift over one month, bit ``day - 1`` standing for each day of the month.
+
+    Derived from ``Availability``, ``Shift.booking_capacity`` and ``VenueBooking`` by
+    ``utilities.availability_bitmaps``, never written directly.
+    """
+    __tablename__ = tables.AVAILABILITY_BITMAP
+    # the calendar reads a venue's months in one range scan
+    __table_args__ = (Index('ix_availability_bitmap_venue_id_month', 'venue_id', 'month'),)
+
+    space_id = Column(Integer, ForeignKey('spaces.id', ondelete='CASCADE'), primary_key=True)
+    shift_id = Column(Integer, ForeignKey('shifts.id', ondelete='CASCADE'), primary_key=True)
+    # first day of the month
+    month = Column(Date, primary_key=True)
+    venue_id = Column(Integer, nullable=False)
+    # days the shift is open for bookings
+    available_days = Column(Integer, nullable=False, default=0)
+    # open days whose bookings already fill the shift's booking capacity
+    booked_days = Column(Integer, nullable=False, default=0)
+
+
+class VenueFreeDay(Base):
+    """
+    Days on which a venue has at least one space with a free shift, derived from the availability bitmaps.
+
+    Keyed on (day, venue_id) so the venue listing joins the free venues of a date in venue_id order.
+    """
+    __tablename__ = tables.VENUE_FREE_DAY
+
+    day = Column(Date, primary_key=True)
+    venue_id = Column(Integer, ForeignKey('venues.id', ondelete='CASCADE'), primary_key=True)
+    free_spaces = Column(Integer, nullable=False)
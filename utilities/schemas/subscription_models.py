@@ -15,7 +15,7 @@ class Album(Base):
     album_name = Column(String, nullable=False)
     num_image = Column(Integer)
     album_type = Column(String)  # profile album, wedding1, venue-space-1
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
 
 
 #Image Model for all image storage
@@ -24,8 +24,8 @@ class Image(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     url = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow())
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    album_id = Column(Integer, ForeignKey('album.id'), nullable=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
+    album_id = Column(Integer, ForeignKey('album.id'), nullable=True, index=True)
     image_type = Column(String, nullable=False)  # e.g., 'profile', 'gallery'
 
 
@@ -51,7 +51,7 @@ class VendorSubscription(Base):
     vendor_id = Column(Integer, ForeignKey('vendor_profile.id'), nullable=False, index=True)
 
     start_date = Column(DateTime, nullable=False)
-    end_date = Column(DateTime, nullable=False)
+    end_date = Column(DateTime, nullable=False, index=True)
     billing_status = Column(String, nullable=False)
     active_status = Column(String, nullable=False)
     exceptions = Column(JSON)
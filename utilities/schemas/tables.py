@@ -22,6 +22,7 @@ CONSUMER_ACTIVITY_LOG = 'consumer_activity_log'
 VENDOR_ACTIVITY_LOG = 'vendor_activity_log'
 CRON_LOG = 'cron_log'
 VENDOR_DYNAMIC_FORM = 'vendor_dynamic_form'
+VENUE_CARD = 'venue_card'
 
 # Subscriptions, albums models
 
@@ -32,3 +33,5 @@ VENDOR_SUBSCRIPTION = 'vendor_subscription'
 SHIFTS = 'shifts'
 SCHEDULE = 'schedule'
 AVAILABILITY = 'availability'
+AVAILABILITY_BITMAP = 'availability_bitmap'
+VENUE_FREE_DAY = 'venue_free_day'
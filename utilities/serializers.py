@@ -0,0 +1,105 @@
+import datetime
+import decimal
+import threading
+from operator import attrgetter
+
+from sqlalchemy import inspect
+from werkzeug.http import http_date
+
+from utilities.schemas.models import User, Venue, VenueSpace, Menu, FoodItem, MenuItemTable, VendorProfile
+
+# never sent to clients, whatever endpoint serializes the row
+SENSITIVE_FIELDS = {
+    User: ('password', 'verification_code'),
+}
+
+
+def _decimal(value):
+    return str(value)
+
+
+def _date(value):
+    # same representation flask's json provider uses, responses keep their format
+    return http_date(value)
+
+
+def _converter_for(column_type):
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        return None
+    if issubclass(python_type, decimal.Decimal):
+        return _decimal
+    if issubclass(python_type, (datetime.date, datetime.datetime)):
+        return _date
+    return None
+
+
+def build_serializer(model, fields=None, exclude=None):
+    """
+    Compile a function turning a ``model`` instance into a dict of its column values.
+
+    The column list and the per column converters are resolved once here, the returned function only reads
+    attributes. ``fields`` restricts the output to the given column keys, ``exclude`` drops column keys.
+    """
+    exclude = set(exclude or ()) | set(SENSITIVE_FIELDS.get(model, ()))
+    plan = []
+    for prop in inspect(model).column_attrs:
+        if fields is not None and prop.key not in fields:
+            continue
+        if prop.key in exclude:
+            continue
+        plan.append((prop.key, attrgetter(prop.key), _converter_for(prop.columns[0].type)))
+
+    def serialize(obj):
+        row = dict()
+        for key, getter, converter in plan:
+            value = getter(obj)
+            if converter is not None and value is not None:
+                value = converter(value)
+            row[key] = value
+        return row
+
+    return serialize
+
+
+class SerializerRegistry(object):
+    def __init__(self):
+        self._serializers = dict()
+        self._unmapped = set()
+        self._lock = threading.Lock()
+
+    def register(self, model, fields=None, exclude=None):
+        """Build and store the serializer for ``model``, replacing the default one built on first use."""
+        key = (model, tuple(fields) if fields is not None else None)
+        serializer = build_serializer(model, fields=fields, exclude=exclude)
+        with self._lock:
+            self._serializers[key] = serializer
+        return serializer
+
+    def get(self, model, fields=None):
+        key = (model, tuple(fields) if fields is not None else None)
+        serializer = self._serializers.get(key)
+        if serializer is None:
+            if model in self._unmapped:
+                return None
+            if inspect(model, raiseerr=False) is None:
+                self._unmapped.add(model)
+                return None
+            serializer = self.register(model, fields=fields)
+        return serializer
+
+    def serialize(self, rows, fields=None):
+        if isinstance(rows, list):
+            if not rows:
+                return []
+            serializer = self.get(type(rows[0]), fields)
+            return [serializer(row) for row in rows]
+        return self.get(type(rows), fields)(rows)
+
+
+serializers = SerializerRegistry()
+
+# models returned by the hot list endpoints are compiled at import time
+for _model in (Venue, VenueSpace, Menu, FoodItem, MenuItemTable, VendorProfile, User):
+    serializers.register(_model)
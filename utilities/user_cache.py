@@ -0,0 +1,71 @@
+"""
+Snapshots of the users behind JWT identities, kept in the shared cache.
+
+The apps' ``user_lookup_loader`` returns a ``UserSnapshot`` (id, user_type_id, is_verified, email) from
+``user_cache.get(sub, session)`` instead of loading the ``User`` row on every authenticated request. A snapshot is
+read only; views changing a user load the row themselves. Sessions drop the snapshots of the users they flush once
+they commit, and a snapshot is otherwise kept for at most ``USER_CACHE_TTL`` seconds.
+"""
+import os
+from collections import namedtuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from utilities.cache import cache
+from utilities.schemas.models import User
+
+# seconds a snapshot is served, changes made outside a session (raw SQL, another database client) show up after it
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+# session.info key of the users whose snapshots go once the session commits
+PENDING_USERS = 'user_cache_users'
+
+UserSnapshot = namedtuple('UserSnapshot', ['id', 'user_type_id', 'is_verified', 'email'])
+
+
+def user_key(user_id):
+    return f'user:{user_id}'
+
+
+class UserCache(object):
+    def __init__(self, ttl=USER_CACHE_TTL, cache=cache):
+        self.ttl = ttl
+        self.cache = cache
+
+    @staticmethod
+    def statement(user_id):
+        return select(User.id, User.user_type_id, User.is_verified, User.email).where(User.id == user_id)
+
+    @classmethod
+    def load(cls, session, user_id):
+        row = session.execute(cls.statement(user_id)).first()
+        return UserSnapshot(*row) if row is not None else None
+
+    def get(self, user_id, session):
+        """Snapshot of the user, None for an unknown id."""
+        return self.cache.get_or_load(user_key(user_id), lambda: self.load(session, user_id), self.ttl)
+
+    def invalidate(self, *user_ids):
+        self.cache.delete(*[user_key(user_id) for user_id in user_ids])
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect(session, flush_context):
+    users = {obj.id for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, User)}
+    if users:
+        session.info.setdefault(PENDING_USERS, set()).update(users)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    users = session.info.pop(PENDING_USERS, None)
+    if users:
+        user_cache.invalidate(*users)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_pending(session):
+    session.info.pop(PENDING_USERS, None)
@@ -0,0 +1,143 @@
+"""
+The vendor behind a request: its profile, verification and the ids of what it owns.
+
+A ``VendorContext`` is loaded with one statement and kept in the shared cache, so the vendor endpoints check
+ownership of a venue, space, menu or food item with a set lookup instead of joining back to ``vendor_profile``.
+Views get it through ``VendorContextMixin.vendor``. Commits changing a vendor's profile or catalogue drop its
+context (see ``utilities.invalidation_bus``); a context loaded while such a commit was in flight is served for at most
+``VENDOR_CONTEXT_TTL`` seconds.
+"""
+import os
+from collections import namedtuple
+
+from sqlalchemy import select, JSON
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+from utilities.cache import cache
+from utilities.invalidation_bus import invalidation_bus
+from utilities.schemas.models import VendorProfile, Venue, VenueSpace, Menu, FoodItem
+
+VENDOR_CONTEXT_TTL = int(os.environ.get('VENDOR_CONTEXT_TTL', 300))
+# a profile never changes user, the user to profile mapping only goes when it expires
+VENDOR_USER_TTL = 24 * 60 * 60
+
+
+class VendorContext(namedtuple('VendorContext', ['vendor_profile_id', 'industry_id', 'is_verified', 'venue_ids',
+                                                 'spaces', 'menu_ids', 'food_item_ids'])):
+    """Read only; ``spaces`` holds (venue_id, space_id) pairs, the other ids are frozensets."""
+    __slots__ = ()
+
+    def owns_venue(self, venue_id):
+        return venue_id in self.venue_ids
+
+    def owns_space(self, venue_id, space_id):
+        return (venue_id, space_id) in self.spaces
+
+    def owns_menu(self, menu_id):
+        return menu_id in self.menu_ids
+
+    def owns_food_item(self, item_id):
+        return item_id in self.food_item_ids
+
+
+def context_key(vendor_profile_id):
+    return f'vendor_context:{vendor_profile_id}'
+
+
+def user_key(user_id):
+    return f'vendor_user:{user_id}'
+
+
+class json_list(FunctionElement):
+    """Aggregate of the values into a JSON array, ``json_agg`` on postgresql and ``json_group_array`` on sqlite."""
+    type = JSON()
+    name = 'json_list'
+    inherit_cache = True
+
+
+class json_pair(FunctionElement):
+    """JSON array of its two arguments, to aggregate pairs with ``json_list``."""
+    type = JSON()
+    name = 'json_pair'
+    inherit_cache = True
+
+
+@compiles(json_list)
+def _json_list(element, compiler, **kw):
+    return f'json_group_array({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(json_list, 'postgresql')
+def _json_list_postgresql(element, compiler, **kw):
+    return f'json_agg({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(json_pair)
+def _json_pair(element, compiler, **kw):
+    return f'json_array({compiler.process(element.clauses, **kw)})'
+
+
+@compiles(json_pair, 'postgresql')
+def _json_pair_postgresql(element, compiler, **kw):
+    return f'json_build_array({compiler.process(element.clauses, **kw)})'
+
+
+def _owned(column, owner):
+    return select(json_list(column)).where(owner == VendorProfile.id).scalar_subquery()
+
+
+class VendorContexts(object):
+    def __init__(self, ttl=VENDOR_CONTEXT_TTL, cache=cache):
+        self.ttl = ttl
+        self.cache = cache
+
+    @staticmethod
+    def statement(*criteria):
+        """SELECT of the contexts of the vendor profiles matching ``criteria``."""
+        spaces = (select(json_list(json_pair(VenueSpace.venue_id, VenueSpace.id)))
+                  .select_from(VenueSpace)
+                  .join(Venue, Venue.id == VenueSpace.venue_id)
+                  .where(Venue.vendor_profile_id == VendorProfile.id)
+                  .scalar_subquery())
+        return (select(VendorProfile.id, VendorProfile.industry_id, VendorProfile.is_sa_verified,
+                       _owned(Venue.id, Venue.vendor_profile_id), spaces, _owned(Menu.id, Menu.vendor_profile_id),
+                       _owned(FoodItem.id, FoodItem.vendor_profile_id))
+                .where(*criteria))
+
+    @classmethod
+    def load(cls, session, *criteria):
+        row = session.execute(cls.statement(*criteria)).first()
+        if row is None:
+            return None
+        vendor_profile_id, industry_id, is_verified, venue_ids, spaces, menu_ids, food_item_ids = row
+        return VendorContext(vendor_profile_id, industry_id, bool(is_verified), frozenset(venue_ids or ()),
+                             frozenset(tuple(pair) for pair in spaces or ()), frozenset(menu_ids or ()),
+                             frozenset(food_item_ids or ()))
+
+    def get(self, user_id, session):
+        """Context of the user's vendor profile, None when the user has none."""
+        vendor_profile_id = self.cache.get(user_key(user_id))
+        if vendor_profile_id is None:
+            # users without a profile aren't remembered, their profile may be created any time
+            context = self.load(session, VendorProfile.user_id == user_id)
+            if context is not None:
+                self.cache.set(user_key(user_id), context.vendor_profile_id, VENDOR_USER_TTL)
+                self.cache.set(context_key(context.vendor_profile_id), context, self.ttl)
+            return context
+        return self.cache.get_or_load(context_key(vendor_profile_id),
+                                      lambda: self.load(session, VendorProfile.id == vendor_profile_id), self.ttl)
+
+    def invalidate(self, *vendor_profile_ids):
+        self.cache.delete(*[context_key(vendor_profile_id) for vendor_profile_id in vendor_profile_ids])
+
+
+vendor_contexts = VendorContexts()
+
+
+def _drop_changed(change):
+    if change.vendor_profile_id is not None:
+        vendor_contexts.invalidate(change.vendor_profile_id)
+
+
+invalidation_bus.on_commit(_drop_changed)
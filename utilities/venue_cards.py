@@ -0,0 +1,76 @@
+"""
+The ``venue_card`` read model behind the consumer venue listing.
+
+A card holds what a listing shows of a venue, its industry name and the totals over its spaces, so listing pages
+read one narrow table instead of grouping every venue's spaces per request. The vendor views call
+``refresh_venue_card`` in the transaction changing a venue or its spaces; ``rebuild_venue_cards`` recomputes every
+card, for backfills and after bulk changes made outside the views::
+
+    python -m utilities.venue_cards rebuild
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import select, insert, delete, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+
+from utilities.schemas.models import Venue, VenueSpace, VendorIndustry, VenueCard
+
+CARD_COLUMNS = ('venue_id', 'vendor_profile_id', 'venue_name', 'location', 'venue_type', 'parking_capacity',
+                'industry_id', 'industry_name', 'total_capacity', 'space_count', 'min_rate', 'max_rate',
+                'updated_at')
+# INSERT ... ON CONFLICT of the dialects the cards are kept on
+UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def card_select():
+    """SELECT computing the cards of venues, in ``CARD_COLUMNS`` order; venues without spaces get zero totals."""
+    capacity = func.coalesce(VenueSpace.seating_capacity, 0) + func.coalesce(VenueSpace.floating_capacity, 0)
+    return (select(Venue.id, Venue.vendor_profile_id, func.coalesce(Venue.venue_name, ''), Venue.location,
+                   Venue.venue_type, func.coalesce(Venue.parking_capacity, 0), Venue.industry_id,
+                   VendorIndustry.industry_name, func.coalesce(func.sum(capacity), 0), func.count(VenueSpace.id),
+                   func.coalesce(func.min(VenueSpace.rate), 0), func.coalesce(func.max(VenueSpace.rate), 0),
+                   literal(datetime.utcnow()))
+            .join(VendorIndustry, Venue.industry_id == VendorIndustry.id)
+            .outerjoin(VenueSpace, Venue.id == VenueSpace.venue_id)
+            .group_by(Venue.id, VendorIndustry.industry_name))
+
+
+def refresh_venue_card(session, venue_id):
+    """
+    Recompute the card of one venue inside the session's transaction, so it commits or rolls back with the change
+    it reflects. The session is flushed first for the card to see pending changes; a deleted venue loses its card.
+
+    The card is written with one upsert, two transactions refreshing the same venue can't both insert it.
+    """
+    session.flush()
+    upsert = UPSERTS[session.get_bind().dialect.name](VenueCard)
+    upsert = upsert.from_select(CARD_COLUMNS, card_select().where(Venue.id == venue_id))
+    upsert = upsert.on_conflict_do_update(
+        index_elements=[VenueCard.venue_id],
+        set_={column: upsert.excluded[column] for column in CARD_COLUMNS if column != 'venue_id'})
+    if not session.execute(upsert).rowcount:
+        session.execute(delete(VenueCard).where(VenueCard.venue_id == venue_id))
+
+
+def rebuild_venue_cards(session):
+    """Recompute every card in one transaction, returns the number of cards."""
+    session.execute(delete(VenueCard))
+    session.execute(insert(VenueCard).from_select(CARD_COLUMNS, card_select()))
+    session.commit()
+    return session.query(func.count(VenueCard.venue_id)).scalar()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Venue card read model')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    subcommands.add_parser('rebuild', help='recompute the card of every venue')
+    args = parser.parse_args()
+
+    from utilities.db_getter import get_session
+
+    session = get_session()
+    try:
+        print(f'Rebuilt {rebuild_venue_cards(session)} venue cards')
+    finally:
+        session.remove()
@@ -0,0 +1,119 @@
+"""
+Search over the venue cards: text matching, range filters, sorting and relevance ranking.
+
+Text matching runs on the cards' ``search_vector``, a postgresql full text vector of the venue name, location and
+venue type behind a GIN index; every word of ``q`` has to match the start of a word of the venue, so ``q=kath
+ban`` finds "Kathmandu banquet". Range filters and sorts run on btree indexes of (column, venue_id), which keeps
+keyset pagination over any sort an index range scan. Ranking by relevance scores every matching venue, so a word
+most venues share (say "banquet") costs a few hundred milliseconds at 100k venues; with a sort it doesn't.
+
+Query arguments::
+
+    q                             words to match, results are ranked by relevance unless a sort is given
+    location, venue_type          exact match
+    min_capacity, max_capacity    total seating and floating capacity of the spaces
+    min_parking                   parking capacity
+    min_price, max_price          rates of the spaces, a venue matches when one of its spaces' rates fits
+    date                          YYYY-MM-DD, only venues with a space free that day, joined from ``venue_free_day``
+    sort                          name, capacity, parking or price, prefixed with '-' for descending order
+"""
+import operator
+import re
+from datetime import date
+
+from sqlalchemy import func, cast, Float, and_
+
+from utilities.schemas.models import VenueCard
+from utilities.schemas.schedule_availability_models import VenueFreeDay
+
+RANK_ATTR = 'rank'
+SORTS = {
+    'name': VenueCard.venue_name,
+    'capacity': VenueCard.total_capacity,
+    'parking': VenueCard.parking_capacity,
+    'price': VenueCard.min_rate,
+}
+# query argument: (column, compare)
+RANGE_FILTERS = {
+    'min_capacity': (VenueCard.total_capacity, operator.ge),
+    'max_capacity': (VenueCard.total_capacity, operator.le),
+    'min_parking': (VenueCard.parking_capacity, operator.ge),
+    'min_price': (VenueCard.max_rate, operator.ge),
+    'max_price': (VenueCard.min_rate, operator.le),
+}
+EXACT_FILTERS = {
+    'location': VenueCard.location,
+    'venue_type': VenueCard.venue_type,
+}
+# words beyond this are ignored, every word is one more index lookup
+MAX_QUERY_WORDS = 8
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+def text_query(q):
+    """tsquery text matching every word of ``q`` as a prefix, None when ``q`` holds no word."""
+    words = re.findall(r'\w+', (q or '').lower())[:MAX_QUERY_WORDS]
+    if not words:
+        return None
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+class VenueSearch(object):
+    """
+    A venue search parsed from query arguments, raises ``InvalidSearch`` for arguments it can't use.
+
+    ``apply`` adds the filters to a query over the cards; ``sort_column``, ``sort_attr`` and ``descending`` are
+    what ``DobatoApi.paginate`` needs to page through the results in order.
+    """
+
+    def __init__(self, args):
+        self.text = text_query(args.get('q'))
+        self.exact = {name: args[name] for name in EXACT_FILTERS if args.get(name)}
+        self.ranges = dict()
+        for name in RANGE_FILTERS:
+            value = args.get(name)
+            if value in (None, ''):
+                continue
+            try:
+                self.ranges[name] = float(value)
+            except ValueError:
+                raise InvalidSearch(f"'{name}' must be a number")
+        try:
+            self.day = date.fromisoformat(args['date']) if args.get('date') else None
+        except ValueError:
+            raise InvalidSearch("'date' must be YYYY-MM-DD")
+
+        sort = args.get('sort') or ''
+        self.descending = sort.startswith('-')
+        sort = sort.lstrip('-')
+        if sort and sort not in SORTS:
+            raise InvalidSearch(f"'sort' must be one of {', '.join(SORTS)}")
+        self.rank = None
+        if self.text is not None:
+            # double precision: a real is rounded on its way to python and the cursor would never match it again
+            self.rank = cast(func.ts_rank_cd(VenueCard.search_vector, func.to_tsquery('simple', self.text)), Float)
+        if sort:
+            self.sort_column, self.sort_attr = SORTS[sort], SORTS[sort].key
+        elif self.rank is not None:
+            # best matches first
+            self.sort_column, self.sort_attr, self.descending = self.rank, RANK_ATTR, True
+        else:
+            self.sort_column, self.sort_attr = None, None
+
+    def apply(self, query):
+        if self.text is not None:
+            query = (query.filter(VenueCard.search_vector.op('@@')(func.to_tsquery('simple', self.text)))
+                     .add_columns(self.rank.label(RANK_ATTR)))
+        if self.day is not None:
+            query = (query.join(VenueFreeDay, and_(VenueFreeDay.venue_id == VenueCard.venue_id,
+                                                   VenueFreeDay.day == self.day))
+                     .add_columns(VenueFreeDay.free_spaces))
+        for name, value in self.exact.items():
+            query = query.filter(EXACT_FILTERS[name] == value)
+        for name, value in self.ranges.items():
+            column, compare = RANGE_FILTERS[name]
+            query = query.filter(compare(column, value))
+        return query
@@ -4,10 +4,14 @@ from flask import Flask, g
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 
+from utilities.availability_bitmaps import bitmap_tracking
 from utilities.encoders import DobatoEncoder
+from utilities.instrumentation import instrumentation
+from utilities.query_recorder import n_plus_one
+from utilities.reference_data import reference_data
 from vendor_app.callbacks import user_views, venue_views
 from utilities.db_getter import get_session
-from utilities.schemas.models import User
+from utilities.user_cache import user_cache
 
 
 app = flask.Flask(__name__)
@@ -17,6 +21,10 @@ jwt_manager = JWTManager(app)
 app.config['JWT_USER_CLAIM'] = 'identity'
 
 CORS(app)
+instrumentation.init_app(app)
+n_plus_one.init_app(app)
+# vendors write shifts, availability and bookings
+bitmap_tracking.init_app(app)
 @app.before_request
 def before_request():
     g.db_session = get_session()
@@ -33,12 +41,11 @@ def teardown_request(exception=None):
 
 
 def user_loader_callback(jwt_header, jwt_payload):
-    identity = jwt_payload["sub"]
-    user = g.db_session.get(User, identity)
-    return user
+    return user_cache.get(jwt_payload["sub"], g.db_session)
 
 
 jwt_manager.user_lookup_loader(user_loader_callback)
+reference_data.warm()
 
 app.add_url_rule('/vendor-api/register', view_func=user_views.Register.as_view('register'))
 app.add_url_rule('/vendor-api/verify-email', view_func=user_views.VerifyEmail.as_view('verify-email'))
@@ -222,7 +222,6 @@ class MenuSchema(Schema):
     cuisine = CleanedString(required=False)
     rate = fields.Float(required=True)
     description = CleanedString(required=False)
-    vendor_profile_id = fields.Integer(required=True)
 
 
 class FoodItemSchema(Schema):
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 import re
 import string, random
@@ -24,6 +23,7 @@ from utilities.db_getter import get_session
 
 from utilities.responses import *
 from utilities.dobato import DobatoApi  # TODO: change to dobato api for vendors as well
+from utilities.user_cache import user_cache
 
 from utilities.schemas.models import User, VendorProfile, UserLogs
 
@@ -97,11 +97,11 @@ class Register(DobatoApi):
             self.db.add(new_user)
             self.db.commit()
             # Send verification email
-            asyncio.run(self.send_message({'event': 'SEND_VERIFICATION_EMAIL',
-                                           'params': {'sender_email': EMAIL,
-                                                      'receiver_email': email,
-                                                      'verification_code': verification_code,
-                                                      'password': EMAIL_APP_PASSWORD}}, port=8888))
+            self.send_message({'event': 'SEND_VERIFICATION_EMAIL',
+                               'params': {'sender_email': EMAIL,
+                                          'receiver_email': email,
+                                          'verification_code': verification_code,
+                                          'password': EMAIL_APP_PASSWORD}})
             return success_response('User registered successfully')
         except Exception as e:
             print(e)
@@ -278,13 +278,13 @@ class ForgotPassword(DobatoApi):
             if not self.is_vendor(user.user_type_id):
                 return bad_request_error(msg='User not registered as a vendor.')
             reset_token = user.generate_reset_token()
-            asyncio.run(self.send_message({'event': 'SEND_PASSWORD_RESET_LINK',
-                                           'params': {'sender_email': EMAIL,
-                                                      'receiver_email': email,
-                                                      'password': EMAIL_APP_PASSWORD,
-                                                      'token': reset_token,
-                                                      'reset_url': reset_url
-                                                      }}, port=8888))
+            self.send_message({'event': 'SEND_PASSWORD_RESET_LINK',
+                               'params': {'sender_email': EMAIL,
+                                          'receiver_email': email,
+                                          'password': EMAIL_APP_PASSWORD,
+                                          'token': reset_token,
+                                          'reset_url': reset_url
+                                          }})
             return success_response(msg='Password reset link sent to your email')
         else:
             return not_found_error(msg='Email not found')
@@ -343,9 +343,7 @@ class RefreshTokenApi(DobatoApi):
         """
         try:
             _, data = verify_jwt_in_request(refresh=True)
-            user = self.db.query(User) \
-                .filter(User.id == data['sub']) \
-                .first()
+            user = user_cache.get(data['sub'], self.db)
 
             if user is None:
                 return unauthorized_response(msg='User Not Found')
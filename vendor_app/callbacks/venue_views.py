@@ -1,20 +1,31 @@
 from flask import request
 from marshmallow import validate
-from sqlalchemy import and_
 from sqlalchemy.exc import SQLAlchemyError
 
 from vendor_app.callbacks.user_validators import SpacesSchema, VenueSchema, MenuSchema, FoodItemSchema, MenuItemSchema
 
-from vendor_app.utils.authentication_utils import load_current_user
-
 from utilities.responses import *
 from utilities.dobato import DobatoApi  # TODO: change to dobato api for vendors as well
-
-from utilities.schemas.models import VendorProfile, Venue, FoodItem, VendorIndustry, Menu, MenuItemTable, \
+from utilities.invalidation_bus import record_change, VENUE, SPACE, MENU, FOOD_ITEM, MENU_ITEM
+from utilities.mixins import VendorContextMixin
+from utilities.owned_writes import update_owned, delete_owned
+from utilities.query_recorder import max_queries
+from utilities.reference_data import reference_data
+from utilities.response_cache import response_cache, vendor_tag
+from utilities.venue_cards import refresh_venue_card
+
+from utilities.schemas.models import Venue, FoodItem, VendorIndustry, Menu, MenuItemTable, \
     VenueSpace
 
+# statements one vendor request may run: user and vendor context (cached, loaded on a miss), target row, write, the
+# owner lookup of the change event, the venue card refresh and the reload after commit; updates and deletes write
+# the row they check in one statement
+VENDOR_QUERY_BUDGET = 8
+
+
+class VenueListApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
 
-class VenueListApi(DobatoApi):
     def post(self):
         """
         API endpoint to add new venue.
@@ -29,43 +40,38 @@ class VenueListApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
         data = request.get_json()
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        # vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        # if not vendor_profile:
-        #     return bad_request_error(msg="Vendor Profile doesn't exists")
-
-        venue = (self.db.query(Venue).
-                 join(VendorProfile, VendorProfile.id == Venue.vendor_profile_id).
-                 filter(VendorProfile.user_id == user.id).first())
-        if venue:
+        if vendor.venue_ids:
             return bad_request_error(msg="Venue already exists")
 
-        venue_industry = self.db.query(VendorIndustry).filter_by(industry_name='Venue').first().id
-        if vendor_profile.industry_id != venue_industry:
+        venue_industry = reference_data.industry_by_name('Venue')
+        if not venue_industry or vendor.industry_id != venue_industry.id:
             return bad_request_error("Vendor not registered as a venue")
 
         # for industry id if not sent in request by frontend
         # if vendor_type_id:
         #     industry_id = vendor_profile.industry_id
-        data['industry_id'] = vendor_profile.industry_id
+        data['industry_id'] = vendor.industry_id
         venue_schema = VenueSchema()
 
         try:
             validated_data = venue_schema.load(data)
-            validated_data['vendor_profile_id'] = vendor_profile.id
+            validated_data['vendor_profile_id'] = vendor.vendor_profile_id
         except validate.ValidationError as err:
             return validation_error(err)
         try:
             new_venue = Venue(**validated_data)
             self.db.add(new_venue)
+            self.db.flush()
+            refresh_venue_card(self.db, new_venue.id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -88,15 +94,17 @@ class VenueListApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-        venue = (self.db.query(Venue).
-                 join(VendorProfile, VendorProfile.id == Venue.vendor_profile_id).
-                 filter(VendorProfile.user_id == user.id).all())
+        vendor = self.vendor
+        if not vendor:
+            return self.list_response([])
+        venue = self.db.query(Venue).filter(Venue.vendor_profile_id == vendor.vendor_profile_id).all()
         rows = self.make_obj_serializable(venue)
         return self.list_response(rows)
 
 
-class VenueDetailApi(DobatoApi):
+class VenueDetailApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     def get(self, venue_id):
         """
         API endpoint to get venue detail.
@@ -110,10 +118,8 @@ class VenueDetailApi(DobatoApi):
         Returns:
             JSON response with venue data.
         """
-        user = load_current_user()
-        venue = (self.db.query(Venue).
-                 join(VendorProfile, VendorProfile.id == Venue.vendor_profile_id).
-                 filter(and_(VendorProfile.user_id == user.id, Venue.id == venue_id)).first())
+        vendor = self.vendor
+        venue = self.db.get(Venue, venue_id) if vendor and vendor.owns_venue(venue_id) else None
 
         if venue:
             rows = self.make_obj_serializable(venue)
@@ -130,45 +136,37 @@ class VenueDetailApi(DobatoApi):
 
         Usage:
             Send a put request to '/vendor-api/venue/<venue_id>' with logged-in user and venue data
-            containing 'venue_name', 'location', 'parking_capacity', 'venue_type', 'mandatory_parking'
+            containing any of 'venue_name', 'location', 'parking_capacity', 'venue_type', 'mandatory_catering'
 
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
         data = request.get_json()
 
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified.")
 
-        venue = (self.db.query(Venue).
-                 join(VendorProfile, VendorProfile.id == Venue.vendor_profile_id).
-                 filter(and_(VendorProfile.user_id == user.id, Venue.id == venue_id)).first())
-
-        if not venue:
+        if not vendor.owns_venue(venue_id):
             return not_found_error(msg="Venue doesn't exists")
 
-        # vendor_type_id = self.get_vendor_type_id()
-        # for industry id if not sent in request by frontend
-        # if vendor_type_id:
-        #     rows = self.db.query(VendorProfile).filter(VendorProfile.user_id == user.id).with_entities(
-        #         VendorProfile.industry_id).first()
-        #     industry_id = rows[0]
-
-        data['industry_id'] = venue.industry_id
-        venue_schema = VenueSchema()
+        # a venue keeps the industry of its vendor
+        data.pop('industry_id', None)
+        venue_schema = VenueSchema(partial=True)
 
         try:
             validated_data = venue_schema.load(data)
         except validate.ValidationError as err:
             return validation_error(err)
         try:
-            for key, value in validated_data.items():
-                setattr(venue, key, value)
+            if not update_owned(self.db, Venue, venue_id, vendor.vendor_profile_id, validated_data):
+                return not_found_error(msg="Venue doesn't exists")
+            record_change(self.db, VENUE, venue_id, vendor.vendor_profile_id)
+            refresh_venue_card(self.db, venue_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
         except SQLAlchemyError as e:
             self.db.rollback()
@@ -179,7 +177,9 @@ class VenueDetailApi(DobatoApi):
         return success_response(msg='Venue Updated successfully')
 
 
-class VenueSpaceListApi(DobatoApi):
+class VenueSpaceListApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     def get(self, venue_id):
         """
         API endpoint to get venue spaces.
@@ -193,12 +193,10 @@ class VenueSpaceListApi(DobatoApi):
         Returns:
             JSON response with venue space data.
         """
-        user = load_current_user()
-        #TODO : check for logged in and valid user
-        venue_space = (self.db.query(VenueSpace)
-                       .join(Venue, Venue.id == VenueSpace.venue_id)
-                       .filter(Venue.id == venue_id))
-        data = venue_space.all()
+        vendor = self.vendor
+        if not vendor or not vendor.owns_venue(venue_id):
+            return self.list_response([])
+        data = self.db.query(VenueSpace).filter(VenueSpace.venue_id == venue_id).all()
         return self.list_response(data)
 
     def post(self, venue_id):
@@ -216,17 +214,14 @@ class VenueSpaceListApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        venue = self.db.query(Venue).filter_by(id=venue_id).first()
-        if not venue:
+        if not vendor.owns_venue(venue_id):
             return forbidden_error(msg="Venue doesn't exists")
         # TODO: images model needs to be finalized to save images.
 
@@ -245,12 +240,14 @@ class VenueSpaceListApi(DobatoApi):
 
         try:
             validated_data = spaces_schema.load(data)
-            validated_data['venue_id'] = venue.id
+            validated_data['venue_id'] = venue_id
         except validate.ValidationError as err:
             return validation_error(err)
         try:
             space_obj = VenueSpace(**validated_data)
             self.db.add(space_obj)
+            refresh_venue_card(self.db, venue_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Spaces added for venue successfully')
         except SQLAlchemyError as e:
@@ -261,7 +258,9 @@ class VenueSpaceListApi(DobatoApi):
             self.db.close()
 
 
-class VenueSpaceDetailApi(DobatoApi):
+class VenueSpaceDetailApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     def get(self, venue_id, space_id):
         """
         API endpoint to get venue-space detail.
@@ -275,14 +274,8 @@ class VenueSpaceDetailApi(DobatoApi):
         Returns:
             JSON response with venue data.
         """
-        user = load_current_user()
-        space_detail = (self.db.query(VenueSpace)
-                        .join(Venue, Venue.id == VenueSpace.venue_id)
-                        .join(VendorProfile, VendorProfile.id == Venue.vendor_profile_id)
-                        .filter(VendorProfile.user_id == user.id)
-                        .filter(VenueSpace.id == space_id)
-                        .filter(Venue.id == venue_id))
-        data = space_detail.first()
+        vendor = self.vendor
+        data = self.db.get(VenueSpace, space_id) if vendor and vendor.owns_space(venue_id, space_id) else None
         if data:
             return self.detail_response(data)
         else:
@@ -297,31 +290,24 @@ class VenueSpaceDetailApi(DobatoApi):
 
         Usage:
             Send a put request to '/vendor-api/venue/<int:venue_id>/venue-space/<int:space_id>' with logged-in user
-            and venue space data containing 'space_name', 'space_type, ''description', 'rate', 'type_of_charge',
+            and venue space data containing any of 'space_name', 'space_type, ''description', 'rate', 'type_of_charge',
             'seating_capacity' and 'floating_capacity'
 
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        space = (self.db.query(VenueSpace)
-                 .join(Venue, Venue.id == VenueSpace.venue_id)
-                 .join(VendorProfile, VendorProfile.id == Venue.vendor_profile_id)
-                 .filter(VendorProfile.user_id == user.id)
-                 .filter(VenueSpace.id == space_id)
-                 .filter(Venue.id == venue_id)).first()
-        if not space:
+        if not vendor.owns_space(venue_id, space_id):
             return forbidden_error(msg="Space doesn't exists")
         # TODO: images model needs to be finalized to save images.
         data = request.get_json()
-        spaces_schema = SpacesSchema()
+        spaces_schema = SpacesSchema(partial=True)
 
         # try:
         #     rate = int(data.get('rate'))
@@ -336,12 +322,15 @@ class VenueSpaceDetailApi(DobatoApi):
 
         try:
             validated_data = spaces_schema.load(data)
-            validated_data['venue_id'] = venue_id
         except validate.ValidationError as err:
             return validation_error(err)
         try:
-            for key, value in validated_data.items():
-                setattr(space, key, value)
+            if not update_owned(self.db, VenueSpace, space_id, vendor.vendor_profile_id, validated_data,
+                                VenueSpace.venue_id == venue_id):
+                return forbidden_error(msg="Space doesn't exists")
+            record_change(self.db, SPACE, space_id, vendor.vendor_profile_id)
+            refresh_venue_card(self.db, venue_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Space details for venue updated successfully')
         except SQLAlchemyError as e:
@@ -364,20 +353,23 @@ class VenueSpaceDetailApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user_id = self.user.id
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user_id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        space = self.db.query(VenueSpace).filter_by(id=space_id, venue_id=venue_id)
-        if not space.first():
+        if not vendor.owns_space(venue_id, space_id):
             return forbidden_error(msg="Space doesn't exists")
 
         try:
-            space.delete()
+            if not delete_owned(self.db, VenueSpace, space_id, vendor.vendor_profile_id,
+                                VenueSpace.venue_id == venue_id):
+                return forbidden_error(msg="Space doesn't exists")
+            record_change(self.db, SPACE, space_id, vendor.vendor_profile_id)
+            refresh_venue_card(self.db, venue_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Space deleted successfully')
         except SQLAlchemyError as e:
@@ -387,7 +379,9 @@ class VenueSpaceDetailApi(DobatoApi):
             self.db.close()
 
 
-class MenuListApi(DobatoApi):
+class MenuListApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     #pass
     def post(self):
         """
@@ -403,18 +397,17 @@ class MenuListApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
         data = request.get_json()
         menu_schema = MenuSchema()
 
-        if not user:
+        if not self.user:
             return bad_request_error(msg="User doesn't exists")
 
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error(msg="Vendor Profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
         # try:
@@ -423,16 +416,19 @@ class MenuListApi(DobatoApi):
         # except ValueError:
         #     return bad_request_error(msg='Invalid input. Please ensure numbers are integers.')
         #
-        # data['vendor_profile_id'] = vendor_profile.id
         # data['rate'] = rate
         # data['no_of_items'] = no_of_items
+        # a menu belongs to the vendor creating it
+        data.pop('vendor_profile_id', None)
         try:
             validated_data = menu_schema.load(data)
+            validated_data['vendor_profile_id'] = vendor.vendor_profile_id
         except validate.ValidationError as err:
             return validation_error(err)
         try:
             new_data = Menu(**validated_data)
             self.db.add(new_data)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Menu added successfully')
         except SQLAlchemyError as e:
@@ -454,12 +450,11 @@ class MenuListApi(DobatoApi):
         Returns:
             JSON response with vendor menu data.
         """
-        user = load_current_user()
+        vendor = self.vendor
         #TODO : need to check if user exists, plus if user is verified and vendor, i.e. check if current user is customer or vendor as well(recreate by sending empty bearer token)
-        menu_data = (self.db.query(Menu)
-                     .join(VendorProfile, VendorProfile.id == Menu.vendor_profile_id)
-                     .filter(VendorProfile.user_id == user.id)
-                     .filter(VendorProfile.id == Menu.vendor_profile_id)).all()
+        menu_data = []
+        if vendor and vendor.menu_ids:
+            menu_data = self.db.query(Menu).filter(Menu.vendor_profile_id == vendor.vendor_profile_id).all()
 
         if menu_data:
             return self.list_response(menu_data)
@@ -467,7 +462,9 @@ class MenuListApi(DobatoApi):
             return not_found_error(msg="No menu for this vendor")
 
 
-class MenuDetailApi(DobatoApi):
+class MenuDetailApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     def get(self, menu_id):
         """
         API endpoint to get menu detail.
@@ -481,13 +478,9 @@ class MenuDetailApi(DobatoApi):
         Returns:
             JSON response with venue data.
         """
-        user = load_current_user()
+        vendor = self.vendor
         #TODO : need to check if user exists, plus if user is verified and vendor, i.e. check if current user is customer or vendor(recreate by sending empty bearer token)
-        menu_detail = (self.db.query(Menu)
-                       .join(VendorProfile, VendorProfile.id == Menu.vendor_profile_id)
-                       .filter(VendorProfile.user_id == user.id)
-                       .filter(Menu.id == menu_id))
-        data = menu_detail.first()
+        data = self.db.get(Menu, menu_id) if vendor and vendor.owns_menu(menu_id) else None
         if data:
             return self.detail_response(data)
         else:
@@ -503,28 +496,25 @@ class MenuDetailApi(DobatoApi):
 
         Usage:
             Send a put request to '/vendor-api/menu/<int:menu_id>' with logged-in user
-            and menu data containing 'name', 'description', 'cuisine', 'no_of_items', 'rate'
+            and menu data containing any of 'name', 'description', 'cuisine', 'no_of_items', 'rate'
 
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        menu = (self.db.query(Menu)
-                .join(VendorProfile, VendorProfile.id == Menu.vendor_profile_id)
-                .filter(VendorProfile.user_id == user.id)
-                .filter(Menu.id == menu_id)).first()
-        if not menu:
+        if not vendor.owns_menu(menu_id):
             return forbidden_error(msg="Menu doesn't exists")
 
         data = request.get_json()
-        menu_schema = MenuSchema()
+        # a menu stays with its vendor
+        data.pop('vendor_profile_id', None)
+        menu_schema = MenuSchema(partial=True)
         # try:
         #     rate = float(data.get('rate'))
         #     no_of_items = int(data.get('no_of_items'))
@@ -540,8 +530,10 @@ class MenuDetailApi(DobatoApi):
         except validate.ValidationError as err:
             return validation_error(err)
         try:
-            for key, value in validated_data.items():
-                setattr(menu, key, value)
+            if not update_owned(self.db, Menu, menu_id, vendor.vendor_profile_id, validated_data):
+                return forbidden_error(msg="Menu doesn't exists")
+            record_change(self.db, MENU, menu_id, vendor.vendor_profile_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Menu updated for venue successfully')
         except SQLAlchemyError as e:
@@ -563,20 +555,21 @@ class MenuDetailApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        menu = self.db.query(Menu).filter_by(id=menu_id)
-        if not menu.first():
+        if not vendor.owns_menu(menu_id):
             return forbidden_error(msg="Menu doesn't exists")
 
         try:
-            menu.delete()
+            if not delete_owned(self.db, Menu, menu_id, vendor.vendor_profile_id):
+                return forbidden_error(msg="Menu doesn't exists")
+            record_change(self.db, MENU, menu_id, vendor.vendor_profile_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Menu deleted successfully')
         except SQLAlchemyError as e:
@@ -586,7 +579,9 @@ class MenuDetailApi(DobatoApi):
             self.db.close()
 
 
-class FoodItemListApi(DobatoApi):
+class FoodItemListApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     def post(self):
         """
         API endpoint to add new food-item.
@@ -601,18 +596,17 @@ class FoodItemListApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-        if not user:
+        if not self.user:
             return bad_request_error(msg="User doesn't exists")
 
         data = request.get_json()
         food_item_schema = FoodItemSchema()
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
+        vendor = self.vendor
 
-        if not vendor_profile:
+        if not vendor:
             return bad_request_error(msg="Vendor Profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
         # try:
@@ -623,12 +617,13 @@ class FoodItemListApi(DobatoApi):
 
         try:
             validated_data = food_item_schema.load(data)
-            validated_data['vendor_profile_id'] = vendor_profile.id
+            validated_data['vendor_profile_id'] = vendor.vendor_profile_id
         except validate.ValidationError as err:
             return validation_error(err)
         try:
             new_data = FoodItem(**validated_data)
             self.db.add(new_data)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Food item added successfully')
         except SQLAlchemyError as e:
@@ -650,11 +645,11 @@ class FoodItemListApi(DobatoApi):
         Returns:
             JSON response with vendor food-items.
         """
-        user = load_current_user()
-        food_item_data = (self.db.query(FoodItem)
-                          .join(VendorProfile, VendorProfile.id == FoodItem.vendor_profile_id)
-                          .filter(VendorProfile.user_id == user.id)
-                          .filter(VendorProfile.id == FoodItem.vendor_profile_id)).all()
+        vendor = self.vendor
+        food_item_data = []
+        if vendor and vendor.food_item_ids:
+            food_item_data = (self.db.query(FoodItem)
+                              .filter(FoodItem.vendor_profile_id == vendor.vendor_profile_id).all())
 
         if food_item_data:
             return self.list_response(food_item_data)
@@ -662,7 +657,9 @@ class FoodItemListApi(DobatoApi):
             return not_found_error(msg="No food item data for this vendor")
 
 
-class FoodItemDetailApi(DobatoApi):
+class FoodItemDetailApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     def get(self, item_id):
         """
         API endpoint to get food-item detail.
@@ -676,13 +673,9 @@ class FoodItemDetailApi(DobatoApi):
         Returns:
             JSON response with venue data.
         """
-        user = load_current_user()
+        vendor = self.vendor
         #TODO : need to check if user exists, plus if user is verified and vendor, i.e. check if current user is customer or vendor as well(recreate by sending empty bearer token)
-        food_item_detail = (self.db.query(FoodItem)
-                            .join(VendorProfile, VendorProfile.id == FoodItem.vendor_profile_id)
-                            .filter(VendorProfile.user_id == user.id)
-                            .filter(FoodItem.id == item_id))
-        data = food_item_detail.first()
+        data = self.db.get(FoodItem, item_id) if vendor and vendor.owns_food_item(item_id) else None
         if data:
             return self.detail_response(data)
         else:
@@ -697,29 +690,24 @@ class FoodItemDetailApi(DobatoApi):
 
         Usage:
             Send a put request to '/vendor-api/food-items/<int:item_id>' with logged-in user
-            and food-item data containing 'item_name', 'item_description', 'item_price', 'type'
+            and food-item data containing any of 'item_name', 'item_description', 'item_price', 'type'
 
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
+        vendor = self.vendor
 
-        if not vendor_profile:
+        if not vendor:
             return bad_request_error(msg="Vendor Profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        food_item = (self.db.query(FoodItem)
-                     .join(VendorProfile, VendorProfile.id == FoodItem.vendor_profile_id)
-                     .filter(VendorProfile.user_id == user.id)
-                     .filter(Menu.id == item_id)).first()
-        if not food_item:
+        if not vendor.owns_food_item(item_id):
             return forbidden_error(msg="Food item doesn't exists")
 
         data = request.get_json()
-        food_item_schema = FoodItemSchema()
+        food_item_schema = FoodItemSchema(partial=True)
         # try:
         #     item_price = float(data.get('item_price'))
         #     data['item_price'] = item_price
@@ -728,12 +716,13 @@ class FoodItemDetailApi(DobatoApi):
 
         try:
             validated_data = food_item_schema.load(data)
-            validated_data['vendor_profile_id'] = food_item.vendor_profile_id
         except validate.ValidationError as err:
             return validation_error(err)
         try:
-            for key, value in validated_data.items():
-                setattr(food_item, key, value)
+            if not update_owned(self.db, FoodItem, item_id, vendor.vendor_profile_id, validated_data):
+                return forbidden_error(msg="Food item doesn't exists")
+            record_change(self.db, FOOD_ITEM, item_id, vendor.vendor_profile_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Food itme updated successfully')
         except SQLAlchemyError as e:
@@ -755,20 +744,21 @@ class FoodItemDetailApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
-        user = load_current_user()
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        food_item = self.db.query(FoodItem).filter_by(id=item_id)
-        if not food_item.first():
+        if not vendor.owns_food_item(item_id):
             return forbidden_error(msg="Food item doesn't exists")
 
         try:
-            food_item.delete()
+            if not delete_owned(self.db, FoodItem, item_id, vendor.vendor_profile_id):
+                return forbidden_error(msg="Food item doesn't exists")
+            record_change(self.db, FOOD_ITEM, item_id, vendor.vendor_profile_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Food item deleted successfully')
         except SQLAlchemyError as e:
@@ -778,7 +768,9 @@ class FoodItemDetailApi(DobatoApi):
             self.db.close()
 
 
-class MenuFoodItemApi(DobatoApi):
+class MenuFoodItemApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     # TODO: few steps needed for completion and error handling, check user missing as well?
     def get(self, menu_id):
         """
@@ -793,8 +785,8 @@ class MenuFoodItemApi(DobatoApi):
         Returns:
             JSON response with menu food-items.
         """
-        menu = self.db.query(Menu).filter_by(id=menu_id).first()
-        if not menu:
+        vendor = self.vendor
+        if not vendor or not vendor.owns_menu(menu_id):
             return bad_request_error("Menu doesn't exists")
 
         query = (self.db.query(MenuItemTable)
@@ -814,41 +806,47 @@ class MenuFoodItemApi(DobatoApi):
 
         Usage:
             Send a post request to '/vendor-api/menu/<int:menu_id>/menu-items' with logged-in user and data
-            like {'menu_items': [{'item_id':0, 'menu_id':menu_id}]}
+            like {'menu_items': [{'item_id':0}]}, the vendor's own food items only
 
         Returns:
             JSON response with success message.
         """
-        user = self.user
-        #TODO : need to check if user exists, plus if user is verified and vendor, i.e. check if current user is customer or vendor as well(recreate by sending empty bearer token)
-        vendor_profile = self.db.query(VendorProfile).filter_by(user_id=user.id).first()
-        if not vendor_profile:
+        vendor = self.vendor
+        if not vendor:
             return bad_request_error("Vendor profile doesn't exists")
 
-        if not self.is_vendor_verified(vendor_profile):
+        if not vendor.is_verified:
             return unauthorized_response(msg="Vendor is not verified yet.")
 
-        menu_exists = self.db.query(Menu).filter_by(id=menu_id).first()
-        if not menu_exists:
+        if not vendor.owns_menu(menu_id):
             return bad_request_error("Menu doesn't exists")
 
         data = request.get_json()
-        menu_items = data.get('menu_items')
-        for item_data in menu_items:
-            item_data['menu_id'] = menu_id
-            try:
-                new_data = MenuItemTable(**item_data)
-                self.db.add(new_data)
-                self.db.commit()
-            except SQLAlchemyError as e:
-                self.db.rollback()
-                return server_error(msg='Cannot add new food item')
-            finally:
-                self.db.close()
-        return success_response(msg='Food item added successfully')
-
-
-class MenuFoodItemDetailApi(DobatoApi):
+        # menu_id comes from the url
+        menu_item_schema = MenuItemSchema(many=True, partial=('menu_id',))
+        try:
+            menu_items = menu_item_schema.load(data.get('menu_items') or [])
+        except validate.ValidationError as err:
+            return validation_error(err)
+
+        if not all(vendor.owns_food_item(item['item_id']) for item in menu_items):
+            return forbidden_error(msg="Food item doesn't exists")
+
+        try:
+            self.db.add_all([MenuItemTable(menu_id=menu_id, item_id=item['item_id']) for item in menu_items])
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
+            self.db.commit()
+            return success_response(msg='Food item added successfully')
+        except SQLAlchemyError as e:
+            self.db.rollback()
+            return server_error(msg='Cannot add new food item')
+        finally:
+            self.db.close()
+
+
+class MenuFoodItemDetailApi(VendorContextMixin, DobatoApi):
+    decorators = [max_queries(VENDOR_QUERY_BUDGET)]
+
     def delete(self, menu_id, menu_food_item_id):
         """
         API endpoint to delete a menu food-item.
@@ -863,17 +861,22 @@ class MenuFoodItemDetailApi(DobatoApi):
         Returns:
             JSON response with success message.
         """
+        vendor = self.vendor
+        if not vendor:
+            return bad_request_error("Vendor profile doesn't exists")
 
-        menu = self.db.query(Menu).filter_by(id=menu_id).first()
-        if not menu:
-            return bad_request_error("Menu doesn't exists")
+        if not vendor.is_verified:
+            return unauthorized_response(msg="Vendor is not verified yet.")
 
-        food_item = self.db.query(MenuItemTable).filter_by(id=menu_food_item_id)
-        if not food_item.first():
-            return forbidden_error(msg="Menu Food item doesn't exists")
+        if not vendor.owns_menu(menu_id):
+            return bad_request_error("Menu doesn't exists")
 
         try:
-            food_item.delete()
+            if not delete_owned(self.db, MenuItemTable, menu_food_item_id, vendor.vendor_profile_id,
+                                MenuItemTable.menu_id == menu_id):
+                return forbidden_error(msg="Menu Food item doesn't exists")
+            record_change(self.db, MENU_ITEM, menu_food_item_id, vendor.vendor_profile_id)
+            response_cache.invalidate_on_commit(self.db, vendor_tag(vendor.vendor_profile_id))
             self.db.commit()
             return success_response(msg='Food item deleted successfully from menu')
         except SQLAlchemyError as e:
@@ -907,5 +910,5 @@ class VendorIndustryList(DobatoApi):
         """
         # get list of vendor industries eg: venues, photography etc.
         # TODO: try-catch here
-        rows = self.db.query(VendorIndustry.id, VendorIndustry.industry_name).all()
+        rows = reference_data.industries()
         return self.list_response(rows)
\ No newline at end of file
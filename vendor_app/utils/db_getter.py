@@ -1,12 +1,10 @@
-from sqlalchemy.orm import sessionmaker, scoped_session
-
 from vendor_app.config import DB_URL
 from utilities.db_setup import database_factory
 
 Session = database_factory(DB_URL)
-scoped_session = scoped_session(Session)
+scoped = Session.scoped
 
 def get_session():
     """ Get a scoped session # simply gets the scope session and returns it to the
     methods or class where it has been called."""
-    return scoped_session()
\ No newline at end of file
+    return scoped()
\ No newline at end of file